@@ -1,44 +1,153 @@
-from flask import Flask, request, jsonify, render_template
+import time
+_startup_begin = time.perf_counter()
+
+from flask import Flask, request, jsonify, render_template, g
 import os
 from flask_cors import CORS, cross_origin
-from kidneyDiseaseClassifier.utils.common import decodeImage
+from kidneyDiseaseClassifier.utils.common import decodeImageToBytes
+from kidneyDiseaseClassifier.config.configuration import ConfigurationManager
+from kidneyDiseaseClassifier.components.model_holder import ModelHolder
+from kidneyDiseaseClassifier.components.batch_scheduler import BatchScheduler
+from kidneyDiseaseClassifier.components.training_jobs import TrainingJobManager
+from kidneyDiseaseClassifier.components.serving_metrics import ServingMetrics, MetricsRegistry
 from kidneyDiseaseClassifier.pipeline.stage_05_prediction import PredictionPipeline
+from kidneyDiseaseClassifier import logger
+
+# TensorFlow is only imported when the model is loaded, so this stays small
+_import_seconds = time.perf_counter() - _startup_begin
 
 os.putenv('LANG', 'en_US.UTF-8')
 os.putenv('LC_ALL', 'en_US.UTF-8')
 
 app = Flask(__name__)
 CORS(app)
+# request, step and model metrics scraped from /metrics
+metrics = ServingMetrics()
 
 class ClientApp:
     def __init__(self) -> None:
-        self.filename = "inputImage.jpg"
-        self.classifier = PredictionPipeline(self.filename)
+        # load the model once and keep watching for newly trained versions
+        start = time.perf_counter()
+        config = ConfigurationManager().get_prediction_config()
+        config_seconds = time.perf_counter() - start
+        # loads, pre-traces and warms up the model before the app serves
+        self.model_holder = ModelHolder(config=config)
+        self.model_holder.start()
+        # batch concurrent /predict calls into a single forward pass
+        self.batch_scheduler = BatchScheduler(
+            model_holder=self.model_holder,
+            max_batch_size=config.max_batch_size,
+            max_wait_ms=config.max_wait_ms
+        )
+        self.batch_scheduler.start()
+        metrics.bind(self.model_holder, self.batch_scheduler)
+        self.classifier = PredictionPipeline(
+            model_holder=self.model_holder,
+            batch_scheduler=self.batch_scheduler
+        )
+        # retraining runs in a background process, one job at a time
+        self.training_jobs = TrainingJobManager(config=ConfigurationManager().get_training_jobs_config())
+
+        self.startup_timings = {
+            "imports": _import_seconds,
+            "config": config_seconds,
+            **{f"model_{name}": seconds for name, seconds in self.model_holder.load_timings.items()},
+        }
+        self.startup_timings["total"] = time.perf_counter() - _startup_begin
+        for name, seconds in self.startup_timings.items():
+            logger.info(f"Startup {name}: {seconds:.3f}s")
+
 
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    metrics.in_flight.inc()
+
+@app.after_request
+def record_request(response):
+    # label by route template, not path, so the number of series stays bounded
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    metrics.requests.inc(route, request.method, str(response.status_code))
+    metrics.request_duration.observe(time.perf_counter() - g.request_start, route)
+    return response
+
+@app.teardown_request
+def end_request(exception=None):
+    metrics.in_flight.dec()
 
 @app.route("/", methods=['GET'])
 @cross_origin()
 def home():
     return render_template('index.html')
 
+@app.route("/health", methods=["GET"])
+@cross_origin()
+def health():
+    ready = clientApp.model_holder.ready
+    return jsonify({
+        "ready": ready,
+        "model_version": clientApp.model_holder.version,
+        "startup_seconds": clientApp.startup_timings
+    }), 200 if ready else 503
+
 @app.route("/train", methods=["GET", "POST"])
 @cross_origin()
 def train():
-    os.system("dvc repro")
-    # os.system("python main.py")
-    return "Training completed successfully."
+    # training_jobs.command in config.yaml selects "dvc repro" or "python main.py"
+    job, created = clientApp.training_jobs.submit()
+    return jsonify(job.to_dict()), 202 if created else 409
+
+@app.route("/train/<job_id>", methods=["GET"])
+@cross_origin()
+def train_status(job_id):
+    job = clientApp.training_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown training job {job_id}"}), 404
+    return jsonify(job.to_dict())
+
+@app.route("/train/<job_id>/logs", methods=["GET"])
+@cross_origin()
+def train_logs(job_id):
+    job = clientApp.training_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown training job {job_id}"}), 404
+    lines = request.args.get("lines", default=100, type=int)
+    return clientApp.training_jobs.tail(job.log_path, lines), 200, {"Content-Type": "text/plain; charset=utf-8"}
 
 @app.route("/predict", methods=["POST"])
 @cross_origin()
 def predict():
-    image = request.json['image']
-    decodeImage(image, clientApp.filename)
-    result = clientApp.classifier.predict()
+    start = time.perf_counter()
+    # decode in memory so concurrent requests never share a file
+    image = decodeImageToBytes(request.json['image'])
+    decoded = time.perf_counter()
+    version = request.json.get('model_version')
+    try:
+        # resize to the input size of the model that will score the image
+        test_image = PredictionPipeline.preprocess(image, clientApp.classifier.target_size(version))
+        preprocessed = time.perf_counter()
+        result = clientApp.classifier.predict_array(test_image, version=version)
+    except KeyError as e:
+        return jsonify({"error": str(e)}), 404
+    metrics.predict_step_duration.observe(decoded - start, "decode")
+    metrics.predict_step_duration.observe(preprocessed - decoded, "preprocess")
+    metrics.predict_step_duration.observe(time.perf_counter() - preprocessed, "inference")
     return jsonify(result)
 
+@app.route("/stats", methods=["GET"])
+@cross_origin()
+def stats():
+    return jsonify({
+        "model_version": clientApp.model_holder.version,
+        "batching": clientApp.batch_scheduler.stats()
+    })
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    return metrics.render(), 200, {"Content-Type": MetricsRegistry.CONTENT_TYPE}
 
 
 if __name__ == "__main__":
     clientApp = ClientApp()
-    # app.run(host="0.0.0.0", port=80) for Microsoft Azure
-    app.run(host="0.0.0.0", port=5000) # Amazon Web Services and localhost
\ No newline at end of file
+    # app.run(host="0.0.0.0", port=80, threaded=True) for Microsoft Azure
+    app.run(host="0.0.0.0", port=5000, threaded=True) # Amazon Web Services and localhost
\ No newline at end of file
@@ -1,57 +1,30 @@
+import argparse
+import atexit
 from kidneyDiseaseClassifier import logger
-from kidneyDiseaseClassifier.pipeline.stage_01_data_ingestion import DataIngestionTrainingPipeline
-from kidneyDiseaseClassifier.pipeline.stage_02_prepare_base_model import PrepareBaseModelTrainingPipeline
-from kidneyDiseaseClassifier.pipeline.stage_03_model_training import ModelTrainingPipeline
-from kidneyDiseaseClassifier.pipeline.stage_04_model_evaluation import ModelEvaluationPipeline
-
-STAGE_NAME = "Data Ingestion Stage"
-
-try:
-    logger.info("*********************************\n")
-    logger.info(f">>>>>> {STAGE_NAME} started <<<<<<")
-    data_ingestion = DataIngestionTrainingPipeline()
-    data_ingestion.main()
-    logger.info(
-        f">>>>>> {STAGE_NAME} completed <<<<<<<\n**********************************")
-except Exception as e:
-    logger.exception(e)
-    raise e
-
-STAGE_NAME = "Prepare Base Model Stage"
-
-try:
-    logger.info("*********************************\n")
-    logger.info(f">>>>>> {STAGE_NAME} started <<<<<<")
-    obj = PrepareBaseModelTrainingPipeline()
-    obj.main()
-    logger.info(
-        f">>>>>> {STAGE_NAME} completed <<<<<<<\n **********************************")
-except Exception as e:
-    logger.exception(e)
-    raise e
-
-STAGE_NAME = "Training"
-
-try:
-    logger.info("*********************************\n")
-    logger.info(f">>>>>> {STAGE_NAME} started <<<<<<")
-    obj = ModelTrainingPipeline()
-    obj.main()
-    logger.info(
-        f">>>>>> {STAGE_NAME} completed <<<<<<<\n **********************************")
-except Exception as e:
-    logger.exception(e)
-    raise e
-
-STAGE_NAME = "Model Evaluation"
-
-try:
-    logger.info("*********************************\n")
-    logger.info(f">>>>>> {STAGE_NAME} started <<<<<<")
-    obj = ModelEvaluationPipeline()
-    obj.main()
-    logger.info(
-        f">>>>>> {STAGE_NAME} completed <<<<<<<\n **********************************")
-except Exception as e:
-    logger.exception(e)
-    raise e
+from kidneyDiseaseClassifier.pipeline.dag_runner import DagRunner
+from kidneyDiseaseClassifier.utils.profiling import save_timeline
+
+# write the per-stage timeline even when a stage fails
+atexit.register(save_timeline)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Run the dvc.yaml stages in-process, concurrently where independent, "
+                    "skipping stages whose inputs, params and code are unchanged."
+    )
+    parser.add_argument("stages", nargs="*", help="Stages to bring up to date, with their upstream stages. Defaults to all.")
+    parser.add_argument("--force", action="store_true", help="Run the selected stages even if they are up to date.")
+    parser.add_argument("--jobs", type=int, default=None, help="Stages run at the same time.")
+    parser.add_argument("--dry-run", action="store_true", help="Only show which stages would run.")
+    args = parser.parse_args()
+
+    try:
+        runner = DagRunner(max_workers=args.jobs)
+        results = runner.run(targets=args.stages, force=args.force, dry_run=args.dry_run)
+        if args.dry_run:
+            for name, status in results.items():
+                logger.info(f"{name}: {status}")
+    except Exception as e:
+        logger.exception(e)
+        raise e
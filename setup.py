@@ -23,5 +23,13 @@ setuptools.setup(
         "Bug Tracker": f"https://github.com/{AUTHOR_USER_NAME}/{REPO_NAME}/issues"
     },
     package_dir={"": "src"},
-    packages=setuptools.find_packages(where="src")
+    packages=setuptools.find_packages(where="src"),
+    entry_points={
+        "console_scripts": [
+            "kidney-predict=kidneyDiseaseClassifier.pipeline.bulk_prediction:main",
+            "kidney-benchmark=kidneyDiseaseClassifier.pipeline.benchmark:main",
+            "kidney-sweep=kidneyDiseaseClassifier.pipeline.sweep:main",
+            "kidney-train-distributed=kidneyDiseaseClassifier.pipeline.distributed_training:main",
+        ]
+    }
 )
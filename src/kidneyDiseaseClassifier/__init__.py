@@ -12,7 +12,8 @@ logging.basicConfig(
     level=logging.INFO,
     format=logging_str, 
     handlers=[
-        logging.FileHandler(log_file_path),
+        # delay opening the log file until the first record is written
+        logging.FileHandler(log_file_path, delay=True),
         logging.StreamHandler(sys.stdout) 
     ]
 )
@@ -0,0 +1,84 @@
+import os
+import tensorflow as tf
+from pathlib import Path
+
+
+# BACKBONE -> (tf.keras.applications module, model constructor)
+BACKBONES = {
+    "VGG16": ("vgg16", "VGG16"),
+    "ResNet50": ("resnet50", "ResNet50"),
+    "MobileNetV2": ("mobilenet_v2", "MobileNetV2"),
+    "EfficientNetB0": ("efficientnet", "EfficientNetB0"),
+}
+
+
+def _application(backbone: str):
+    if backbone not in BACKBONES:
+        raise ValueError(f"Unknown BACKBONE: {backbone}, expected one of {', '.join(BACKBONES)}")
+    return getattr(tf.keras.applications, BACKBONES[backbone][0])
+
+
+@tf.keras.utils.register_keras_serializable(package="kidneyDiseaseClassifier")
+class BackbonePreprocessing(tf.keras.layers.Layer):
+    """Maps RGB images scaled to [0, 1] to the input a backbone's weights were trained on.
+
+    Every input pipeline (ImageDataGenerator, tf.data, the tensor cache and
+    PredictionPipeline) delivers bilinear-resized RGB images in [0, 1]. This
+    layer, the first one of every prepared model, applies the backbone's own
+    `preprocess_input` to them, so a saved model carries its preprocessing and
+    training, evaluation and serving cannot disagree on it.
+
+    Attributes:
+        backbone (str): The BACKBONE whose `preprocess_input` is applied.
+    """
+
+    def __init__(self, backbone: str, **kwargs):
+        super().__init__(**kwargs)
+        self.backbone = backbone
+        self._preprocess_input = _application(backbone).preprocess_input
+
+    def call(self, inputs):
+        return self._preprocess_input(inputs * 255.0)
+
+    def get_config(self):
+        return {**super().get_config(), "backbone": self.backbone}
+
+
+def build_backbone(backbone: str, input_shape: list, weights: str = "imagenet",
+                   include_top: bool = False) -> tf.keras.Model:
+    """Builds a Keras application model with its preprocessing layer in front.
+
+    Args:
+        backbone (str): One of BACKBONES.
+        input_shape (list): The image shape, e.g. [224, 224, 3].
+        weights (str, optional): "imagenet", None for random initialization, or the path of a
+            local weights file (e.g. the `_notop.h5` file when `include_top` is False), for
+            machines without internet access. Defaults to "imagenet".
+        include_top (bool, optional): Whether to keep the ImageNet classifier. Defaults to False.
+
+    Returns:
+        tf.keras.Model: A model taking images in [0, 1].
+
+    Raises:
+        ValueError: If the backbone is unknown.
+        FileNotFoundError: If `weights` is neither "imagenet" nor None and the file does not exist.
+    """
+    application = _application(backbone)
+    if weights not in (None, "imagenet"):
+        weights = str(weights)
+        if not os.path.exists(weights):
+            raise FileNotFoundError(f"WEIGHTS file {weights} does not exist")
+
+    inputs = tf.keras.Input(shape=input_shape)
+    x = BackbonePreprocessing(backbone, name="preprocessing")(inputs)
+    # with a non-Input `input_tensor` the application is built on top of `inputs`, as one flat model
+    return getattr(application, BACKBONES[backbone][1])(
+        input_tensor=x,
+        weights=weights,
+        include_top=include_top
+    )
+
+
+def load_keras_model(path: Path, **kwargs) -> tf.keras.Model:
+    """Loads a saved model; importing this module registers `BackbonePreprocessing` for it."""
+    return tf.keras.models.load_model(path, **kwargs)
@@ -0,0 +1,163 @@
+import time
+import queue
+import threading
+from collections import Counter
+from concurrent.futures import Future
+import numpy as np
+from kidneyDiseaseClassifier import logger
+from kidneyDiseaseClassifier.components.model_holder import ModelHolder
+
+
+class BatchScheduler:
+    """Dynamic micro-batching in front of the served model.
+
+    Concurrent callers submit their preprocessed images and block on a future.
+    A single worker thread collects queued requests until either
+    `max_batch_size` images are waiting or the first request has waited
+    `max_wait_ms`, runs one forward pass and hands each caller its own rows.
+
+    Attributes:
+        model_holder (ModelHolder): The holder of the model to predict with.
+        max_batch_size (int): The largest number of images run in one forward pass.
+        max_wait_ms (float): How long the first request in a batch waits for others to join it.
+    """
+
+    def __init__(self, model_holder: ModelHolder, max_batch_size: int, max_wait_ms: float):
+        """Initializes the BatchScheduler.
+
+        Args:
+            model_holder (ModelHolder): The holder of the model to predict with.
+            max_batch_size (int): The largest number of images run in one forward pass.
+            max_wait_ms (float): How long the first request in a batch waits for others to join it.
+        """
+        self.model_holder = model_holder
+        self.max_batch_size = max(int(max_batch_size), 1)
+        self.max_wait_ms = max(float(max_wait_ms), 0.0)
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._requests = 0
+        self._max_queue_depth = 0
+        self._worker = None
+        # a request that did not fit in the previous batch; it starts the next one
+        self._carry = None
+
+    def start(self):
+        """Starts the batching worker thread."""
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="batch-scheduler", daemon=True)
+            self._worker.start()
+
+    def stop(self):
+        """Stops the worker after the requests already queued are served."""
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join()
+            self._worker = None
+
+    def submit(self, images: np.ndarray, version: str = None) -> Future:
+        """Queues a batch of preprocessed images for prediction.
+
+        Args:
+            images (np.ndarray): Images shaped (n, height, width, channels).
+            version (str, optional): Pin a previously loaded model version.
+
+        Returns:
+            Future: Resolves to the model output rows for `images`.
+        """
+        future = Future()
+        self._queue.put((images, version, future))
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            self._requests += 1
+            self._max_queue_depth = max(self._max_queue_depth, depth)
+        return future
+
+    def predict(self, images: np.ndarray, version: str = None) -> np.ndarray:
+        """Predicts `images` as part of the next batch and waits for the result."""
+        return self.submit(images, version=version).result()
+
+    def _collect(self, first):
+        """Gathers queued requests behind `first` until the batch is full or the wait expires.
+
+        A request that would take the batch past `max_batch_size` is held back
+        to start the next batch. Only a single request larger than
+        `max_batch_size` runs on its own in a bigger batch.
+        """
+        items = [first]
+        size = len(first[0])
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+        stop = False
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                stop = True
+                break
+            if size + len(item[0]) > self.max_batch_size:
+                self._carry = item
+                break
+            items.append(item)
+            size += len(item[0])
+        return items, stop
+
+    def _run_batch(self, items):
+        by_version = {}
+        for item in items:
+            by_version.setdefault(item[1], []).append(item)
+
+        for version, group in by_version.items():
+            futures = [future for _, _, future in group]
+            try:
+                _, model = self.model_holder.get(version)
+                batch = np.concatenate([images for images, _, _ in group], axis=0)
+                outputs = model.predict(batch, verbose=0)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            with self._stats_lock:
+                self._batch_sizes[len(batch)] += 1
+
+            start = 0
+            for images, _, future in group:
+                future.set_result(outputs[start:start + len(images)])
+                start += len(images)
+
+    def _run(self):
+        stop = False
+        while not stop:
+            if self._carry is not None:
+                first, self._carry = self._carry, None
+            else:
+                first = self._queue.get()
+            if first is None:
+                break
+            items, stop = self._collect(first)
+            try:
+                self._run_batch(items)
+            except Exception as e:
+                logger.exception(f"Batch prediction failed: {e}")
+
+    def stats(self) -> dict:
+        """Returns queue-depth and batch-size statistics.
+
+        Returns:
+            dict: Current and peak queue depth, request and batch counts, and the batch-size histogram.
+        """
+        with self._stats_lock:
+            batches = sum(self._batch_sizes.values())
+            images = sum(size * count for size, count in self._batch_sizes.items())
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self._max_queue_depth,
+                "requests": self._requests,
+                "batches": batches,
+                "mean_batch_size": images / batches if batches else 0.0,
+                "max_batch_size": max(self._batch_sizes, default=0),
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+            }
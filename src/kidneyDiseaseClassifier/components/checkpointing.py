@@ -0,0 +1,117 @@
+import json
+import shutil
+import tensorflow as tf
+from pathlib import Path
+from kidneyDiseaseClassifier import logger
+
+
+def monitor_mode(monitor: str) -> str:
+    """Whether a Keras metric improves upwards ("max") or downwards ("min", for losses)."""
+    return "min" if "loss" in monitor else "max"
+
+
+class TrainingCheckpoint:
+    """Periodic checkpoints of a model's weights and optimizer state, for resuming a run.
+
+    Checkpoints belong to one training setup, identified by a fingerprint of
+    the base model, data and training params. A directory holding checkpoints
+    of another setup is cleared, so a run only resumes its own progress.
+
+    Attributes:
+        directory (Path): Where the checkpoints and their fingerprint are kept.
+        manager (tf.train.CheckpointManager): Writes numbered checkpoints and prunes old ones.
+    """
+
+    def __init__(self, directory: Path, model: tf.keras.Model, fingerprint: str, max_to_keep: int = 2):
+        """Initializes the TrainingCheckpoint.
+
+        Args:
+            directory (Path): Where the checkpoints are kept.
+            model (tf.keras.Model): The compiled model; its optimizer is checkpointed with it.
+            fingerprint (str): Identifies the training setup the checkpoints belong to.
+            max_to_keep (int, optional): The number of most recent checkpoints kept. Defaults to 2.
+        """
+        self.directory = Path(directory)
+        meta_path = self.directory / "meta.json"
+        meta = {}
+        if meta_path.exists():
+            with open(meta_path) as f:
+                meta = json.load(f)
+        if meta.get("fingerprint") != fingerprint:
+            if self.directory.exists():
+                logger.info(f"Discarding checkpoints of a different training setup in {self.directory}")
+                shutil.rmtree(self.directory)
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(meta_path, "w") as f:
+                json.dump({"fingerprint": fingerprint}, f)
+
+        self.epoch = tf.Variable(0, dtype=tf.int64, trainable=False)
+        self.checkpoint = tf.train.Checkpoint(model=model, optimizer=model.optimizer, epoch=self.epoch)
+        self.manager = tf.train.CheckpointManager(self.checkpoint, str(self.directory), max_to_keep=max_to_keep)
+
+    def restore(self) -> int:
+        """Restores the latest checkpoint, if any.
+
+        Returns:
+            int: The number of epochs already completed, used as `initial_epoch` for fitting.
+        """
+        if self.manager.latest_checkpoint is None:
+            return 0
+        # optimizer slots are created on the first step, so their restore is deferred until then
+        self.checkpoint.restore(self.manager.latest_checkpoint).expect_partial()
+        epoch = int(self.epoch.numpy())
+        logger.info(f"Resuming training after epoch {epoch} from {self.manager.latest_checkpoint}")
+        return epoch
+
+    def save(self, epoch: int):
+        self.epoch.assign(epoch)
+        path = self.manager.save(checkpoint_number=epoch)
+        logger.info(f"Checkpoint for epoch {epoch} saved to {path}")
+
+    def callback(self, every_epochs: int = 1) -> tf.keras.callbacks.Callback:
+        """A Keras callback saving a checkpoint every `every_epochs` epochs."""
+        def on_epoch_end(epoch, logs=None):
+            if (epoch + 1) % every_epochs == 0:
+                self.save(epoch + 1)
+
+        return tf.keras.callbacks.LambdaCallback(on_epoch_end=on_epoch_end)
+
+    def clear(self):
+        """Removes the checkpoints once the trained model has been saved."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class RestoreBestWeights(tf.keras.callbacks.Callback):
+    """Keeps the weights of the best epoch by a validation metric and restores them when training ends.
+
+    Unlike `EarlyStopping(restore_best_weights=True)`, the best weights are
+    restored whether or not training stopped early. After a resume, the best
+    epoch is tracked from the resumed epoch on.
+
+    Attributes:
+        monitor (str): The Keras log compared across epochs, e.g. "val_loss".
+        best (float): The best value seen so far.
+        best_epoch (int): The epoch it was seen at, counting from 1.
+    """
+
+    def __init__(self, monitor: str = "val_loss"):
+        super().__init__()
+        self.monitor = monitor
+        self.mode = monitor_mode(monitor)
+        self.best = None
+        self.best_epoch = None
+        self._best_weights = None
+
+    def on_epoch_end(self, epoch, logs=None):
+        value = (logs or {}).get(self.monitor)
+        if value is None:
+            return
+        if self.best is None or (value < self.best if self.mode == "min" else value > self.best):
+            self.best = float(value)
+            self.best_epoch = epoch + 1
+            self._best_weights = self.model.get_weights()
+
+    def on_train_end(self, logs=None):
+        if self._best_weights is not None:
+            logger.info(f"Restoring the weights of epoch {self.best_epoch} ({self.monitor}={self.best:.4f})")
+            self.model.set_weights(self._best_weights)
@@ -1,9 +1,49 @@
 import os
+import json
+import time
+import shutil
 import zipfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import urllib.request as request
+from urllib.error import HTTPError, URLError
+from http.client import IncompleteRead
+from pathlib import Path
 import gdown
 from kidneyDiseaseClassifier import logger
-# from kidneyDiseaseClassifier.utils.common import get_size
+from kidneyDiseaseClassifier.utils.common import get_file_hash
 from kidneyDiseaseClassifier.entity.config_entity import DataIngestionConfig
+from kidneyDiseaseClassifier.components.dataset_manifest import DatasetManifest
+
+
+def _member_path(unzip_dir: str, name: str) -> str:
+    """Resolves a zip member inside `unzip_dir`, rejecting names that would escape it."""
+    root = os.path.realpath(unzip_dir)
+    path = os.path.realpath(os.path.join(root, name))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(f"Refusing to extract {name} outside {unzip_dir}")
+    return path
+
+
+def _extract_members(zip_path: str, names: list, unzip_dir: str) -> int:
+    """Extracts `names` from the zip, writing each to a temporary file and renaming it into place.
+
+    Runs in a worker process, which opens its own handle on the archive.
+
+    Returns:
+        int: The number of bytes written.
+    """
+    written = 0
+    with zipfile.ZipFile(zip_path, "r") as zip_ref:
+        for name in names:
+            path = _member_path(unzip_dir, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+            with zip_ref.open(name) as src, open(tmp_path, "wb") as dst:
+                shutil.copyfileobj(src, dst, 1 << 20)
+            os.replace(tmp_path, path)
+            written += zip_ref.getinfo(name).file_size
+    return written
 
 
 class DataIngestion:
@@ -16,23 +56,160 @@ class DataIngestion:
         """
         self.config = config
 
+    def _expected(self) -> dict:
+        """Returns the size and hash the local file must match, from the config pins or the last download."""
+        record = {}
+        if Path(self.config.download_record).exists():
+            with open(self.config.download_record) as f:
+                record = json.load(f)
+        return {
+            "size": self.config.expected_size or record.get("size"),
+            "sha256": self.config.expected_sha256 or record.get("sha256"),
+        }
+
+    def is_downloaded(self) -> bool:
+        """Checks whether the local zip already matches the expected size and hash.
+
+        Returns:
+            bool: True if the download can be skipped.
+        """
+        path = Path(self.config.local_data_file)
+        expected = self._expected()
+        if not path.exists() or expected["sha256"] is None:
+            return False
+        if expected["size"] is not None and path.stat().st_size != expected["size"]:
+            return False
+        return get_file_hash(path) == expected["sha256"]
+
+    @staticmethod
+    def _validator_path(part_path: Path) -> Path:
+        """The file holding the ETag or Last-Modified of the remote file a partial download was started from."""
+        return part_path.with_name(part_path.name + ".validator")
+
+    @staticmethod
+    def _discard_partial(part_path: Path):
+        for path in (part_path, DataIngestion._validator_path(part_path)):
+            if path.exists():
+                path.unlink()
+
+    @staticmethod
+    def _download_with_resume(url: str, part_path: Path, retries: int = 3):
+        """Downloads `url` into `part_path`, continuing a partial file with an HTTP range request.
+
+        A partial file is only continued when it has a recorded ETag or
+        Last-Modified, which is sent as `If-Range` so a changed remote file
+        comes back whole, and the returned range starts where the partial file
+        ends. Anything else starts the download over.
+
+        Args:
+            url (str): The URL to download.
+            part_path (Path): The partial download file.
+            retries (int, optional): Attempts to resume after a dropped connection. Defaults to 3.
+        """
+        validator_path = DataIngestion._validator_path(part_path)
+        attempt = 1
+        while True:
+            offset = part_path.stat().st_size if part_path.exists() else 0
+            validator = validator_path.read_text() if validator_path.exists() else None
+            headers = {"Range": f"bytes={offset}-", "If-Range": validator} if offset and validator else {}
+            try:
+                with request.urlopen(request.Request(url, headers=headers), timeout=60) as response:
+                    if headers and response.status == 206:
+                        if not response.headers.get("Content-Range", "").startswith(f"bytes {offset}-"):
+                            logger.warning(f"Server sent another range than bytes {offset}-, starting over")
+                            DataIngestion._discard_partial(part_path)
+                            continue
+                        logger.info(f"Resuming download at byte {offset}")
+                        mode = "ab"
+                    else:
+                        if offset:
+                            logger.info("Remote file changed or the server ignored the range, starting over")
+                        mode = "wb"
+                        # weak ETags cannot be used in If-Range
+                        etag = response.headers.get("ETag")
+                        validator = etag if etag and not etag.startswith("W/") else response.headers.get("Last-Modified")
+                        if validator:
+                            validator_path.write_text(validator)
+                        elif validator_path.exists():
+                            validator_path.unlink()
+                    received = 0
+                    with open(part_path, mode) as f:
+                        for chunk in iter(lambda: response.read(1 << 20), b""):
+                            f.write(chunk)
+                            received += len(chunk)
+                    # a connection closed early ends the body without an error
+                    length = response.headers.get("Content-Length")
+                    if length is not None and received < int(length):
+                        raise IncompleteRead(b"", int(length) - received)
+                return
+            except HTTPError as e:
+                if e.code == 416 and headers:
+                    if e.headers.get("Content-Range") == f"bytes */{offset}":
+                        # nothing left to fetch: the partial file is already complete
+                        return
+                    logger.warning("Partial download does not fit the remote file, starting over")
+                    DataIngestion._discard_partial(part_path)
+                    continue
+                raise e
+            except (URLError, IncompleteRead, ConnectionError, TimeoutError) as e:
+                if attempt == retries:
+                    raise e
+                attempt += 1
+                logger.warning(f"Download interrupted ({e}), resuming (attempt {attempt}/{retries})")
+
     def download_file(self):
         """Fetch data from a URL.
 
+        The download is skipped when the local file already matches the expected
+        size and SHA-256. Otherwise it is fetched into a `.part` file, resuming any
+        earlier partial download, verified against the pinned size and hash, and
+        moved into place. The verified size and hash are recorded for the next run.
+
         Raises:
             Exception: If an error occurs during the download process.
+            ValueError: If the downloaded file does not match the pinned size or hash.
         """
         try:
-            dataset_url = self.config.source_URL
-            zip_download_dir = self.config.local_data_file
+            dataset_url = self.config.mirror_URL or self.config.source_URL
+            zip_download_dir = Path(self.config.local_data_file)
             os.makedirs("artifacts/data_ingestion", exist_ok=True)
 
+            if self.is_downloaded():
+                logger.info(f"{zip_download_dir} matches the recorded size and hash, skipping download")
+                return
+
             logger.info(
                 f"Downloading data from {dataset_url} into file {zip_download_dir}")
 
-            file_id = dataset_url.split("/")[-2]
-            prefix = "https://drive.google.com/uc?/export=download&id="
-            gdown.download(prefix + file_id, zip_download_dir)
+            part_path = zip_download_dir.with_name(zip_download_dir.name + ".part")
+            start_offset = part_path.stat().st_size if part_path.exists() else 0
+            start = time.perf_counter()
+
+            if self.config.mirror_URL:
+                self._download_with_resume(self.config.mirror_URL, part_path)
+            else:
+                file_id = dataset_url.split("/")[-2]
+                prefix = "https://drive.google.com/uc?/export=download&id="
+                gdown.download(prefix + file_id, str(part_path), resume=True)
+
+            elapsed = time.perf_counter() - start
+            size = part_path.stat().st_size
+            fetched = size - start_offset
+            logger.info(
+                f"Fetched {fetched / 1e6:.1f} MB in {elapsed:.1f}s ({fetched / 1e6 / max(elapsed, 1e-9):.1f} MB/s)")
+
+            sha256 = get_file_hash(part_path)
+            if self.config.expected_size is not None and size != self.config.expected_size:
+                self._discard_partial(part_path)
+                raise ValueError(f"Downloaded {size} bytes, expected {self.config.expected_size}")
+            if self.config.expected_sha256 is not None and sha256 != self.config.expected_sha256:
+                self._discard_partial(part_path)
+                raise ValueError(f"Downloaded file has SHA-256 {sha256}, expected {self.config.expected_sha256}")
+
+            os.replace(part_path, zip_download_dir)
+            self._discard_partial(part_path)
+            with open(self.config.download_record, "w") as f:
+                json.dump({"source": dataset_url, "size": size, "sha256": sha256}, f)
 
             logger.info(
                 f"Downloaded data from {dataset_url} into file {zip_download_dir}")
@@ -40,11 +217,20 @@ class DataIngestion:
         except Exception as e:
             raise e
 
+    def _read_extract_manifest(self) -> dict:
+        if not Path(self.config.extract_manifest).exists():
+            return {}
+        with open(self.config.extract_manifest) as f:
+            return json.load(f)
+
     def extract_zip_file(self):
         """Extract a zip file.
 
             This method extracts the contents of a zip file specified in the configuration
-            to the directory specified in the configuration.
+            to the directory specified in the configuration. Members whose CRC and size
+            match the extraction manifest and whose file is still on disk are left
+            alone, changed and added members are extracted across a process pool, and
+            members removed from the archive are deleted.
 
             Raises:
                 Exception: If an error occurs during the extraction process.
@@ -52,13 +238,76 @@ class DataIngestion:
         try:
             unzip_path = self.config.unzip_dir
             os.makedirs(unzip_path, exist_ok=True)
+            start = time.perf_counter()
 
+            previous = self._read_extract_manifest()
             with zipfile.ZipFile(self.config.local_data_file, "r") as zip_ref:
-                zip_ref.extractall(unzip_path)
+                members = {
+                    info.filename: {"crc": info.CRC, "size": info.file_size}
+                    for info in zip_ref.infolist() if not info.is_dir()
+                }
+
+            changed = []
+            for name, entry in members.items():
+                path = _member_path(unzip_path, name)
+                if previous.get(name) != entry or not os.path.isfile(path) or os.path.getsize(path) != entry["size"]:
+                    changed.append(name)
+
+            removed = [name for name in previous if name not in members]
+            for name in removed:
+                path = _member_path(unzip_path, name)
+                if os.path.isfile(path):
+                    os.remove(path)
 
-            logger.info(f"Extracted zip file into: {unzip_path}")
+            written = 0
+            if changed:
+                workers = min(self.config.extract_workers or os.cpu_count() or 1, len(changed))
+                # Deal members round-robin by size so every worker gets a similar share of bytes
+                changed.sort(key=lambda name: members[name]["size"], reverse=True)
+                chunks = [changed[i::workers] for i in range(workers)]
+                if workers == 1:
+                    written = _extract_members(str(self.config.local_data_file), changed, str(unzip_path))
+                else:
+                    # spawn, not fork: under main.py other stages may be running TensorFlow in this process
+                    context = multiprocessing.get_context("spawn")
+                    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                        futures = [
+                            executor.submit(_extract_members, str(self.config.local_data_file), chunk, str(unzip_path))
+                            for chunk in chunks
+                        ]
+                        written = sum(future.result() for future in futures)
+
+            tmp_manifest = Path(self.config.extract_manifest).with_suffix(".tmp")
+            with open(tmp_manifest, "w") as f:
+                json.dump(members, f)
+            os.replace(tmp_manifest, self.config.extract_manifest)
+
+            logger.info(
+                f"Extracted zip file into: {unzip_path} ({len(changed)} extracted, "
+                f"{len(members) - len(changed)} unchanged, {len(removed)} removed, "
+                f"{written / 1e6:.1f} MB in {time.perf_counter() - start:.1f}s)"
+            )
 
         except Exception as e:
             logger.error(
                 f"Error extracting zip file: {self.config.local_data_file}")
             raise e
+
+    def write_manifest(self) -> DatasetManifest:
+        """Indexes the extracted images into the dataset manifest.
+
+        Images whose size and modification time are unchanged since the last
+        manifest keep their recorded hash and dimensions.
+
+        Returns:
+            DatasetManifest: The manifest that was written.
+        """
+        source_dir = Path(self.config.unzip_dir) / "kidney-ct-scan-image"
+        previous = None
+        if Path(self.config.manifest_path).exists():
+            previous = DatasetManifest.load(self.config.manifest_path)
+
+        manifest = DatasetManifest.build(source_dir, previous=previous)
+        manifest.save(self.config.manifest_path)
+        logger.info(f"Wrote dataset manifest {self.config.manifest_path} ({len(manifest)} images, {manifest.dataset_hash[:12]})")
+        return manifest
@@ -0,0 +1,148 @@
+import time
+import tensorflow as tf
+from pathlib import Path
+from kidneyDiseaseClassifier import logger
+from kidneyDiseaseClassifier.components.dataset_manifest import list_image_files
+from kidneyDiseaseClassifier.components.distributed import whole_batches, in_shard
+
+
+def augmentation_layers(image_size: list) -> tf.keras.Sequential:
+    """Random transforms matching the ImageDataGenerator augmentation used for training.
+
+    Shear has no preprocessing-layer equivalent and is left out.
+    """
+    height, width = image_size[0], image_size[1]
+    return tf.keras.Sequential([
+        tf.keras.layers.RandomRotation(40 / 360, fill_mode="nearest"),
+        tf.keras.layers.RandomTranslation(20 / height, 20 / width, fill_mode="nearest"),
+        tf.keras.layers.RandomZoom(0.2, fill_mode="nearest"),
+        tf.keras.layers.RandomFlip("horizontal"),
+    ])
+
+
+def build_tf_dataset(directory: Path, image_size: list, batch_size: int, subset: str,
+                     validation_split: float, shuffle: bool, augment: bool = False,
+                     repeat: bool = False, seed: int = None, manifest=None,
+                     num_shards: int = 1, shard_index: int = 0):
+    """Builds a tf.data pipeline equivalent to `flow_from_directory` for one subset.
+
+    Files are read and JPEG-decoded in parallel, resized, rescaled to [0, 1],
+    batched and prefetched with autotuned parallelism. With a dataset manifest
+    the file list is taken from it instead of scanning `directory`.
+
+    A repeated or sharded dataset yields whole batches only, so every pass has
+    the same number of steps. When sharded, the files are shuffled with the
+    same seed in every shard, and shard `i` reads only the `i`-th
+    `batch_size` slice of each global batch of `batch_size * num_shards` files.
+    Together, the shards then see exactly the global batches that a single
+    unsharded pipeline with the global batch size would yield.
+
+    Args:
+        directory (Path): The dataset directory with one sub-directory per class.
+        image_size (list): The model input size as [height, width, channels].
+        batch_size (int): The batch size.
+        subset (str): Either "training" or "validation".
+        validation_split (float): The fraction of each class held out for validation.
+        shuffle (bool): Whether to reshuffle the files every epoch.
+        augment (bool, optional): Whether to apply random augmentation. Defaults to False.
+        repeat (bool, optional): Whether to repeat the dataset indefinitely. Defaults to False.
+        seed (int, optional): The shuffle and augmentation seed.
+        manifest (DatasetManifest, optional): The dataset index to take the files from.
+        num_shards (int, optional): The number of input pipelines sharing the data, e.g. one per worker. Defaults to 1.
+        shard_index (int, optional): This pipeline's shard. Defaults to 0.
+
+    Returns:
+        tuple: The dataset, the number of samples and the class indices mapping.
+    """
+    if manifest is not None:
+        paths, labels, class_indices = manifest.files(subset, validation_split)
+    else:
+        paths, labels, class_indices = list_image_files(directory, validation_split, subset)
+    num_classes = len(class_indices)
+    target_size = image_size[:-1]
+    autotune = tf.data.AUTOTUNE
+
+    def load(path, label):
+        data = tf.io.read_file(path)
+        img = tf.io.decode_image(data, channels=3, expand_animations=False)
+        img = tf.image.resize(img, target_size, method="bilinear")
+        img = tf.cast(img, tf.float32) / 255.0
+        return img, tf.one_hot(label, num_classes)
+
+    if num_shards > 1 and shuffle and seed is None:
+        raise ValueError("Sharded datasets need a shuffle seed shared by every shard")
+
+    dataset = tf.data.Dataset.from_tensor_slices((paths, labels))
+    if shuffle:
+        dataset = dataset.shuffle(len(paths), seed=seed, reshuffle_each_iteration=True)
+    if repeat or num_shards > 1:
+        dataset = dataset.take(whole_batches(len(paths), batch_size, num_shards))
+    if num_shards > 1:
+        dataset = dataset.enumerate().filter(
+            lambda index, _: in_shard(index, batch_size, num_shards, shard_index)
+        ).map(lambda _, element: element)
+    dataset = dataset.map(load, num_parallel_calls=autotune, deterministic=not shuffle)
+    dataset = dataset.batch(batch_size)
+    if augment:
+        augmenter = augmentation_layers(image_size)
+        dataset = dataset.map(lambda x, y: (augmenter(x, training=True), y), num_parallel_calls=autotune)
+    if repeat:
+        dataset = dataset.repeat()
+    dataset = dataset.prefetch(autotune)
+
+    logger.info(f"Found {len(paths)} images belonging to {num_classes} classes ({subset}, tf.data)")
+    return dataset, len(paths), class_indices
+
+
+def iterate_batches(data):
+    """Yields every (images, labels) batch of a Keras generator, Sequence or tf.data dataset once."""
+    if hasattr(data, "__len__") and hasattr(data, "__getitem__"):
+        for i in range(len(data)):
+            yield data[i]
+    else:
+        yield from data
+
+
+def measure_throughput(data, steps: int) -> float:
+    """Measures how many images per second an input pipeline delivers.
+
+    Args:
+        data: A Keras generator or tf.data dataset yielding (images, labels) batches.
+        steps (int): The number of batches to draw after one warm-up batch.
+
+    Returns:
+        float: Images per second.
+    """
+    iterator = iter(data)
+    next(iterator)
+    images = 0
+    start = time.perf_counter()
+    for _ in range(steps):
+        batch, _ = next(iterator)
+        images += len(batch)
+    images_per_sec = images / (time.perf_counter() - start)
+    logger.info(f"Input pipeline delivered {images_per_sec:.1f} images/sec over {steps} batches")
+    return images_per_sec
+
+
+class ThroughputCallback(tf.keras.callbacks.Callback):
+    """Logs training images/sec at the end of every epoch."""
+
+    def __init__(self, batch_size: int):
+        super().__init__()
+        self.batch_size = batch_size
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+        self._steps = 0
+
+    def on_train_batch_end(self, batch, logs=None):
+        # with steps_per_execution > 1 this runs once per call, so count by batch index
+        self._steps = batch + 1
+
+    def on_epoch_end(self, epoch, logs=None):
+        elapsed = time.perf_counter() - self._start
+        images_per_sec = self._steps * self.batch_size / elapsed if elapsed else 0.0
+        if logs is not None:
+            logs["images_per_sec"] = images_per_sec
+        logger.info(f"Epoch {epoch + 1}: {images_per_sec:.1f} training images/sec")
@@ -0,0 +1,274 @@
+import os
+import hashlib
+from pathlib import Path
+import numpy as np
+from PIL import Image
+from kidneyDiseaseClassifier import logger
+
+
+WHITE_LIST_FORMATS = ("png", "jpg", "jpeg", "bmp", "ppm", "tif", "tiff")
+
+
+def list_image_files(directory: Path, validation_split: float, subset: str):
+    """Lists image files and labels exactly as `flow_from_directory` does.
+
+    Classes are the sorted sub-directories of `directory`. Within each class the
+    files are sorted and the first `int(validation_split * n)` of them form the
+    validation subset, the rest the training subset.
+
+    Args:
+        directory (Path): The dataset directory with one sub-directory per class.
+        validation_split (float): The fraction of each class held out for validation.
+        subset (str): Either "training" or "validation".
+
+    Returns:
+        tuple: File paths, integer labels and the class indices mapping.
+    """
+    class_names = sorted(
+        name for name in os.listdir(directory) if os.path.isdir(os.path.join(directory, name))
+    )
+    class_indices = dict(zip(class_names, range(len(class_names))))
+
+    paths, labels = [], []
+    for class_name in class_names:
+        class_dir = os.path.join(directory, class_name)
+        files = [
+            os.path.join(root, name)
+            for root, _, names in sorted(os.walk(class_dir), key=lambda x: x[0])
+            for name in sorted(names)
+            if name.lower().endswith(WHITE_LIST_FORMATS)
+        ]
+        split_at = int(validation_split * len(files))
+        files = files[:split_at] if subset == "validation" else files[split_at:]
+        paths.extend(files)
+        labels.extend([class_indices[class_name]] * len(files))
+
+    return paths, labels, class_indices
+
+
+def _file_sha1(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DatasetManifest:
+    """A columnar index of the extracted dataset, stored as a single `.npz` file.
+
+    Each column is a NumPy array with one row per image: relative path, class
+    label, byte size, modification time, SHA-1 of the content, height and width.
+    Rows are ordered by class and then by file name, the order
+    `flow_from_directory` uses. `rank` is a row's position within its class and
+    `class_count` the size of that class, so the train/validation assignment for
+    any split fraction is `rank < int(validation_split * class_count)`, the same
+    split `flow_from_directory` makes, without touching the file system.
+
+    Attributes:
+        source_dir (Path): The dataset directory with one sub-directory per class.
+        class_names (list): The sorted class names; a label indexes into this list.
+        columns (dict): The per-image arrays keyed by column name.
+        dataset_hash (str): A hash of every relative path, label and content hash.
+    """
+
+    COLUMNS = ("path", "label", "size", "mtime_ns", "sha1", "height", "width", "rank", "class_count")
+
+    def __init__(self, source_dir: Path, class_names: list, columns: dict, dataset_hash: str):
+        self.source_dir = Path(source_dir)
+        self.class_names = list(class_names)
+        self.columns = columns
+        self.dataset_hash = dataset_hash
+
+    def __len__(self):
+        return len(self.columns["path"])
+
+    @property
+    def class_indices(self) -> dict:
+        return dict(zip(self.class_names, range(len(self.class_names))))
+
+    @classmethod
+    def build(cls, source_dir: Path, previous: "DatasetManifest" = None) -> "DatasetManifest":
+        """Indexes every image under `source_dir`.
+
+        Files whose size and modification time match a row of `previous` reuse
+        its hash and dimensions; only new or changed files are read.
+
+        Args:
+            source_dir (Path): The dataset directory with one sub-directory per class.
+            previous (DatasetManifest, optional): The last manifest of the same directory.
+
+        Returns:
+            DatasetManifest: The new manifest.
+        """
+        paths, labels, class_indices = list_image_files(source_dir, validation_split=0.0, subset="training")
+        old_rows = {}
+        if previous is not None:
+            old_rows = {path: row for row, path in enumerate(previous.columns["path"])}
+
+        rows = {name: [] for name in cls.COLUMNS}
+        counts = np.bincount(np.asarray(labels, dtype=np.int64), minlength=len(class_indices))
+        rank, last_label, read = 0, None, 0
+        for path, label in zip(paths, labels):
+            rel_path = os.path.relpath(path, source_dir)
+            stat = os.stat(path)
+            row = old_rows.get(rel_path)
+            if (row is not None and previous.columns["size"][row] == stat.st_size
+                    and previous.columns["mtime_ns"][row] == stat.st_mtime_ns):
+                sha1 = str(previous.columns["sha1"][row])
+                height, width = int(previous.columns["height"][row]), int(previous.columns["width"][row])
+            else:
+                sha1 = _file_sha1(path)
+                # Only the header is parsed to get the dimensions
+                with Image.open(path) as img:
+                    width, height = img.size
+                read += 1
+
+            rank = rank + 1 if label == last_label else 0
+            last_label = label
+            for name, value in (("path", rel_path), ("label", label), ("size", stat.st_size),
+                                ("mtime_ns", stat.st_mtime_ns), ("sha1", sha1), ("height", height),
+                                ("width", width), ("rank", rank), ("class_count", counts[label])):
+                rows[name].append(value)
+
+        columns = {
+            "path": np.asarray(rows["path"], dtype=str),
+            "label": np.asarray(rows["label"], dtype=np.int32),
+            "size": np.asarray(rows["size"], dtype=np.int64),
+            "mtime_ns": np.asarray(rows["mtime_ns"], dtype=np.int64),
+            "sha1": np.asarray(rows["sha1"], dtype="<U40"),
+            "height": np.asarray(rows["height"], dtype=np.int32),
+            "width": np.asarray(rows["width"], dtype=np.int32),
+            "rank": np.asarray(rows["rank"], dtype=np.int32),
+            "class_count": np.asarray(rows["class_count"], dtype=np.int32),
+        }
+        class_names = sorted(class_indices, key=class_indices.get)
+        dataset_hash = hashlib.sha1(
+            "\n".join(f"{p}:{l}:{h}" for p, l, h in zip(rows["path"], rows["label"], rows["sha1"])).encode()
+        ).hexdigest()
+
+        logger.info(f"Indexed {len(paths)} images in {len(class_names)} classes ({read} read, {len(paths) - read} reused)")
+        return cls(source_dir, class_names, columns, dataset_hash)
+
+    def save(self, path: Path):
+        """Writes the manifest atomically."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.stem}.tmp{path.suffix}")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                source_dir=np.asarray(str(self.source_dir)),
+                class_names=np.asarray(self.class_names, dtype=str),
+                dataset_hash=np.asarray(self.dataset_hash),
+                **self.columns
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "DatasetManifest":
+        """Reads a manifest written by `save`.
+
+        Args:
+            path (Path): The `.npz` manifest file.
+
+        Returns:
+            DatasetManifest: The manifest.
+
+        Raises:
+            FileNotFoundError: If the manifest does not exist.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            columns = {name: data[name] for name in cls.COLUMNS}
+            return cls(
+                source_dir=Path(str(data["source_dir"])),
+                class_names=[str(name) for name in data["class_names"]],
+                columns=columns,
+                dataset_hash=str(data["dataset_hash"])
+            )
+
+    def subset_rows(self, subset: str, validation_split: float) -> np.ndarray:
+        """Returns the row numbers of one subset.
+
+        Args:
+            subset (str): Either "training" or "validation".
+            validation_split (float): The fraction of each class held out for validation.
+
+        Returns:
+            np.ndarray: The rows, in manifest order.
+        """
+        split_at = (validation_split * self.columns["class_count"]).astype(np.int64)
+        is_validation = self.columns["rank"] < split_at
+        return np.flatnonzero(is_validation if subset == "validation" else ~is_validation)
+
+    def files(self, subset: str, validation_split: float):
+        """Lists the files and labels of one subset, like `list_image_files`.
+
+        Args:
+            subset (str): Either "training" or "validation".
+            validation_split (float): The fraction of each class held out for validation.
+
+        Returns:
+            tuple: File paths, integer labels and the class indices mapping.
+        """
+        rows = self.subset_rows(subset, validation_split)
+        paths = [os.path.join(self.source_dir, path) for path in self.columns["path"][rows]]
+        return paths, self.columns["label"][rows].tolist(), self.class_indices
+
+    def subset_hash(self, subset: str, validation_split: float) -> str:
+        """Hashes the relative paths, labels and content hashes of one subset."""
+        rows = self.subset_rows(subset, validation_split)
+        return hashlib.sha1("\n".join(
+            f"{p}:{l}:{h}" for p, l, h in
+            zip(self.columns["path"][rows], self.columns["label"][rows], self.columns["sha1"][rows])
+        ).encode()).hexdigest()
+
+    def flow(self, datagenerator, subset: str, validation_split: float, shuffle: bool, **dataflow_kwargs):
+        """Builds an ImageDataGenerator flow over one subset without scanning the directory.
+
+        Args:
+            datagenerator (ImageDataGenerator): A generator created without `validation_split`.
+            subset (str): Either "training" or "validation".
+            validation_split (float): The fraction of each class held out for validation.
+            shuffle (bool): Whether to shuffle every epoch.
+            **dataflow_kwargs: Passed to `flow_from_dataframe`, e.g. target_size and batch_size.
+
+        Returns:
+            DataFrameIterator: Batches equivalent to `flow_from_directory` on the same subset.
+        """
+        import pandas as pd
+
+        rows = self.subset_rows(subset, validation_split)
+        dataframe = pd.DataFrame({
+            "filename": self.columns["path"][rows],
+            "class": [self.class_names[label] for label in self.columns["label"][rows]],
+        })
+        return datagenerator.flow_from_dataframe(
+            dataframe,
+            directory=str(self.source_dir),
+            x_col="filename",
+            y_col="class",
+            classes=self.class_names,
+            class_mode="categorical",
+            shuffle=shuffle,
+            validate_filenames=False,
+            **dataflow_kwargs
+        )
+
+
+def load_manifest(manifest_path: Path, source_dir: Path) -> DatasetManifest:
+    """Loads the ingestion manifest, or indexes `source_dir` in memory if there is none.
+
+    Args:
+        manifest_path (Path): The manifest written by the data ingestion stage.
+        source_dir (Path): The dataset directory the manifest describes.
+
+    Returns:
+        DatasetManifest: The manifest, with paths resolved against `source_dir`.
+    """
+    if manifest_path is not None and Path(manifest_path).exists():
+        manifest = DatasetManifest.load(manifest_path)
+        manifest.source_dir = Path(source_dir)
+        return manifest
+    logger.warning(f"No dataset manifest at {manifest_path}, scanning {source_dir}")
+    return DatasetManifest.build(source_dir)
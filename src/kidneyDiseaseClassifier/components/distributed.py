@@ -0,0 +1,115 @@
+import os
+import json
+from kidneyDiseaseClassifier import logger
+from kidneyDiseaseClassifier.entity.config_entity import DistributedConfig
+
+
+# distributed.communication -> tf.distribute.experimental.CommunicationImplementation; TensorFlow is
+# imported inside the functions, so the launcher can build TF_CONFIG without starting it
+COMMUNICATION = {"auto": "AUTO", "ring": "RING", "nccl": "NCCL"}
+
+
+def tf_config(workers: list, index: int) -> str:
+    """The TF_CONFIG of worker `index` in a cluster of `workers` (host:port each)."""
+    return json.dumps({"cluster": {"worker": list(workers)}, "task": {"type": "worker", "index": index}})
+
+
+def whole_batches(num_samples: int, batch_size: int, num_shards: int = 1) -> int:
+    """The number of samples kept so every shard gets the same number of full batches."""
+    global_batch_size = batch_size * num_shards
+    return num_samples // global_batch_size * global_batch_size
+
+
+def in_shard(index, batch_size: int, num_shards: int, shard_index: int):
+    """Whether sample `index` falls in shard `shard_index`'s slice of its global batch.
+
+    Works on ints and on TensorFlow integer tensors alike, so the input
+    pipeline filters with the same rule the tests check.
+    """
+    return (index // batch_size) % num_shards == shard_index
+
+
+def get_strategy(config: DistributedConfig) -> "tf.distribute.Strategy":
+    """Returns the distribution strategy training runs under.
+
+    A process started with TF_CONFIG, e.g. by `kidney-train-distributed`, or
+    with `distributed.enabled` set joins its cluster with a
+    MultiWorkerMirroredStrategy. Otherwise the default single-process strategy
+    is returned and training is unchanged. The cluster is passed to the
+    strategy directly, so the process environment is left as it was.
+
+    This must be called before any other TensorFlow op runs in the process.
+
+    Args:
+        config (DistributedConfig): The cluster and collective settings.
+
+    Returns:
+        tf.distribute.Strategy: The strategy to build and train the model under.
+
+    Raises:
+        ValueError: If distributed training is enabled with fewer than two workers, or with an
+            unknown communication, or TensorFlow already ran in this process, e.g. when
+            main.py runs the training stage in-process after the earlier stages.
+    """
+    import tensorflow as tf
+
+    if "TF_CONFIG" in os.environ:
+        cluster_resolver = tf.distribute.cluster_resolver.TFConfigClusterResolver()
+    elif config.enabled:
+        if len(config.workers) < 2:
+            raise ValueError("Distributed training needs at least two entries in distributed.workers")
+        cluster_resolver = tf.distribute.cluster_resolver.SimpleClusterResolver(
+            tf.train.ClusterSpec({"worker": list(config.workers)}),
+            task_type="worker",
+            task_id=config.task_index,
+            rpc_layer="grpc"
+        )
+    else:
+        return tf.distribute.get_strategy()
+
+    if config.communication not in COMMUNICATION:
+        raise ValueError(f"Unknown distributed communication: {config.communication}")
+    try:
+        strategy = tf.distribute.MultiWorkerMirroredStrategy(
+            cluster_resolver=cluster_resolver,
+            communication_options=tf.distribute.experimental.CommunicationOptions(
+                implementation=getattr(tf.distribute.experimental.CommunicationImplementation,
+                                       COMMUNICATION[config.communication])
+            )
+        )
+    except RuntimeError as e:
+        # collective ops can only be configured before the TensorFlow runtime starts
+        raise ValueError(
+            "Distributed training has to start in a fresh process, but TensorFlow already ran in this one. "
+            "Run the training stage on its own (`kidney-train-distributed`, or "
+            "`python src/kidneyDiseaseClassifier/pipeline/stage_03_model_training.py` on each worker) "
+            "rather than from main.py."
+        ) from e
+    logger.info(
+        f"Worker {worker_index(strategy)} of {num_workers(strategy)} joined the cluster, "
+        f"{strategy.num_replicas_in_sync} replicas in sync"
+    )
+    return strategy
+
+
+def is_multi_worker(strategy: "tf.distribute.Strategy") -> bool:
+    import tensorflow as tf
+
+    return isinstance(strategy, tf.distribute.MultiWorkerMirroredStrategy)
+
+
+def num_workers(strategy: "tf.distribute.Strategy") -> int:
+    if not is_multi_worker(strategy):
+        return 1
+    return strategy.cluster_resolver.cluster_spec().num_tasks("worker")
+
+
+def worker_index(strategy: "tf.distribute.Strategy") -> int:
+    if not is_multi_worker(strategy):
+        return 0
+    return strategy.cluster_resolver.task_id or 0
+
+
+def is_chief(strategy: "tf.distribute.Strategy") -> bool:
+    """Whether this process saves the model and logs the run; worker 0, as there is no separate chief task."""
+    return worker_index(strategy) == 0
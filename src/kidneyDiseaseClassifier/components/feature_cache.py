@@ -0,0 +1,134 @@
+import os
+import json
+import hashlib
+from pathlib import Path
+import numpy as np
+import tensorflow as tf
+from kidneyDiseaseClassifier import logger
+
+
+def split_backbone_head(model: tf.keras.Model, noise_stddev: float = 0.0):
+    """Splits a prepared model at its Flatten layer.
+
+    The head reuses the full model's layer objects, so training the head
+    trains the full model's weights in place.
+
+    Args:
+        model (tf.keras.Model): The full model built by PrepareBaseModel.
+        noise_stddev (float, optional): Standard deviation of Gaussian noise added to
+            the features while training the head. Defaults to 0.0 (no noise).
+
+    Returns:
+        tuple: The backbone model (images to features) and the head model (features to predictions).
+    """
+    flatten_index = next(
+        i for i, layer in enumerate(model.layers) if isinstance(layer, tf.keras.layers.Flatten)
+    )
+    flatten = model.layers[flatten_index]
+    backbone = tf.keras.Model(inputs=model.input, outputs=flatten.input)
+
+    feature_input = tf.keras.Input(shape=backbone.output_shape[1:])
+    x = feature_input
+    if noise_stddev > 0:
+        # Feature-space stand-in for image augmentation, active only during fit
+        x = tf.keras.layers.GaussianNoise(noise_stddev)(x)
+    for layer in model.layers[flatten_index:]:
+        x = layer(x)
+    head = tf.keras.Model(inputs=feature_input, outputs=x)
+    return backbone, head
+
+
+class FeatureCache:
+    """Backbone features computed once per image and stored as memory-mapped arrays.
+
+    Features for each subset are written to `<root_dir>/<subset>_features.npy`
+    with one-hot labels in `<subset>_labels.npy`. `meta.json` records the key
+    they were computed for; a different key recomputes them.
+
+    Attributes:
+        root_dir (Path): The directory holding the cached features.
+    """
+
+    def __init__(self, root_dir: Path):
+        self.root_dir = Path(root_dir)
+
+    @staticmethod
+    def make_key(**parts) -> str:
+        """Builds a cache key from the model file, data source and input settings."""
+        return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _paths(self, subset: str):
+        return self.root_dir / f"{subset}_features.npy", self.root_dir / f"{subset}_labels.npy"
+
+    def _read_meta(self) -> dict:
+        meta_path = self.root_dir / "meta.json"
+        if not meta_path.exists():
+            return {}
+        with open(meta_path) as f:
+            return json.load(f)
+
+    def _write_meta(self, meta: dict):
+        tmp_meta_path = self.root_dir / "meta.tmp.json"
+        with open(tmp_meta_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta_path, self.root_dir / "meta.json")
+
+    def load_or_compute(self, key: str, subset: str, backbone: tf.keras.Model, flow, samples: int):
+        """Returns the cached features for `subset`, computing them if the key changed.
+
+        Args:
+            key (str): The cache key from `make_key`.
+            subset (str): Either "training" or "validation".
+            backbone (tf.keras.Model): The model mapping images to features.
+            flow: An unshuffled, unaugmented iterable of (images, one-hot labels) batches.
+            samples (int): The number of images in the subset.
+
+        Returns:
+            tuple: Memory-mapped features and labels.
+
+        Raises:
+            ValueError: If the subset has no images, or `flow` yields fewer than `samples` images.
+        """
+        if samples == 0:
+            raise ValueError(f"No {subset} images to compute features for")
+        features_path, labels_path = self._paths(subset)
+        meta = self._read_meta()
+        if meta.get(subset) == key and features_path.exists() and labels_path.exists():
+            logger.info(f"Using cached {subset} features from {features_path}")
+            return np.load(features_path, mmap_mode="r"), np.load(labels_path, mmap_mode="r")
+
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        # Invalidate first so an interrupted run never leaves a half-written subset marked valid
+        meta.pop(subset, None)
+        self._write_meta(meta)
+        logger.info(f"Computing {subset} features for {samples} images")
+        features = labels = None
+        row = 0
+        for x, y in flow:
+            take = min(len(x), samples - row)
+            batch_features = backbone.predict_on_batch(x[:take])
+            if features is None:
+                features = np.lib.format.open_memmap(
+                    features_path, mode="w+", dtype=np.float32, shape=(samples,) + batch_features.shape[1:]
+                )
+                labels = np.lib.format.open_memmap(
+                    labels_path, mode="w+", dtype=np.float32, shape=(samples,) + tuple(y.shape[1:])
+                )
+            features[row:row + take] = batch_features
+            labels[row:row + take] = np.asarray(y[:take])
+            row += take
+            if row >= samples:
+                break
+
+        if features is not None:
+            features.flush()
+            labels.flush()
+            del features, labels
+        if row != samples:
+            # the subset stays unmarked in meta, so the next run computes it again
+            raise ValueError(f"The {subset} flow yielded {row} of {samples} images")
+
+        meta[subset] = key
+        self._write_meta(meta)
+
+        return np.load(features_path, mmap_mode="r"), np.load(labels_path, mmap_mode="r")
@@ -0,0 +1,289 @@
+import os
+import json
+import time
+import queue
+import shutil
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+from urllib.parse import urlparse
+from kidneyDiseaseClassifier import logger
+from kidneyDiseaseClassifier.entity.config_entity import MlflowConfig
+
+
+# Largest number of each entity MLflow accepts in one log_batch call
+MAX_METRICS_PER_BATCH = 1000
+MAX_PARAMS_PER_BATCH = 100
+MAX_TAGS_PER_BATCH = 100
+
+
+def flatten_metrics(metrics: dict, prefix: str = "") -> dict:
+    """Keeps the numeric values of a (possibly nested) metrics dict, e.g. {"recall": {"Tumor": x}} -> {"recall_Tumor": x}."""
+    flat = {}
+    for name, value in metrics.items():
+        key = f"{prefix}{name}"
+        if isinstance(value, dict):
+            flat.update(flatten_metrics(value, prefix=f"{key}_"))
+        elif isinstance(value, bool) or value is None:
+            continue
+        else:
+            try:
+                flat[key] = float(value)
+            except (TypeError, ValueError):
+                continue
+    return flat
+
+
+def is_reachable(uri: str, timeout: float) -> bool:
+    """Whether an HTTP tracking server answers at all; any HTTP status, even 401, counts."""
+    try:
+        urllib.request.urlopen(uri, timeout=timeout).close()
+        return True
+    except urllib.error.HTTPError:
+        return True
+    except (urllib.error.URLError, OSError, ValueError):
+        return False
+
+
+class MlflowTracker:
+    """Records params, metrics and artifacts to MLflow from a background thread.
+
+    Calls on the tracker only put items on a queue, so they cost microseconds
+    on the training or evaluation thread. The background thread resolves the
+    tracking URI (falling back to a local file store when the remote server is
+    unreachable), opens the run, and every `flush_interval` seconds sends what
+    has accumulated with one `log_batch` call. Artifacts are snapshotted when
+    they are logged and uploaded after the pending metrics. A batch that fails
+    to send is kept and retried on the next flush.
+
+    The thread is not a daemon: `finish()` returns at once, and the process
+    waits for the last flush and uploads before it exits.
+
+    Attributes:
+        config (MlflowConfig): Tracking server, fallback store and batching settings.
+        run_id (str): The MLflow run, once the background thread has opened it.
+        tracking_uri (str): The tracking URI in use, once resolved.
+    """
+
+    def __init__(self, config: MlflowConfig):
+        self.config = config
+        self.run_id = None
+        self.tracking_uri = None
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def start(self, run_name: str = None, resume: bool = False, tags: dict = None) -> "MlflowTracker":
+        """Starts the background thread, which opens the run.
+
+        Args:
+            run_name (str, optional): The name of a new run.
+            resume (bool, optional): Continue the run recorded in `run_path` (e.g. the training run) if
+                it was logged to the same tracking URI. Defaults to False.
+            tags (dict, optional): Tags set on a new run.
+        """
+        self._thread = threading.Thread(
+            target=self._worker, args=(run_name, resume, dict(tags or {})), name="mlflow-tracker"
+        )
+        self._thread.start()
+        return self
+
+    def log_params(self, params: dict):
+        self._queue.put(("params", {name: str(value) for name, value in params.items()}))
+
+    def log_metrics(self, metrics: dict, step: int = 0):
+        self._queue.put(("metrics", (flatten_metrics(metrics), step, int(time.time() * 1000))))
+
+    def set_tags(self, tags: dict):
+        self._queue.put(("tags", {name: str(value) for name, value in tags.items()}))
+
+    def log_artifact(self, path: Path, artifact_path: str = None, registered_model_name: str = None):
+        """Queues a file for upload.
+
+        The file is hard-linked into a staging directory next to it first, so
+        a later atomic replace of `path`, e.g. by the next training run, never
+        changes what gets uploaded. The staging directory is on the same
+        filesystem as the file, so the link is instant; a copy is only made
+        where the filesystem has no hard links.
+
+        Args:
+            path (Path): The file to upload.
+            artifact_path (str, optional): The directory within the run's artifacts.
+            registered_model_name (str, optional): Register the uploaded file as a version of this
+                model, on tracking servers with a model registry.
+        """
+        path = Path(path)
+        snapshot_dir = Path(tempfile.mkdtemp(prefix=".mlflow-upload-", dir=path.parent))
+        snapshot = snapshot_dir / path.name
+        try:
+            os.link(path, snapshot)
+        except OSError:
+            shutil.copy2(path, snapshot)
+        self._queue.put(("artifact", (snapshot, artifact_path, registered_model_name)))
+
+    def keras_callback(self, prefix: str = "epoch_"):
+        """A Keras callback logging every epoch's training and validation metrics, stepped by epoch.
+
+        Args:
+            prefix (str, optional): Prepended to the Keras metric names, so per-epoch curves do not mix
+                with the evaluation scores logged to the same run. Defaults to "epoch_".
+        """
+        import tensorflow as tf
+
+        return tf.keras.callbacks.LambdaCallback(
+            on_epoch_end=lambda epoch, logs: self.log_metrics(
+                {f"{prefix}{name}": value for name, value in (logs or {}).items()}, step=epoch
+            )
+        )
+
+    def finish(self, status: str = "FINISHED", wait: bool = False, timeout: float = None):
+        """Ends the run after everything queued so far has been sent.
+
+        Args:
+            status (str, optional): The final run status, e.g. "FINISHED" or "FAILED".
+            wait (bool, optional): Block until the background thread is done. Defaults to False.
+            timeout (float, optional): The longest time to block when waiting.
+        """
+        self._queue.put(("finish", status))
+        if wait and self._thread is not None:
+            self._thread.join(timeout)
+
+    def _resolve_tracking_uri(self) -> str:
+        uri = os.environ.get("MLFLOW_TRACKING_URI") or self.config.tracking_uri
+        fallback = Path(self.config.fallback_dir).resolve().as_uri()
+        if not uri:
+            return fallback
+        if urlparse(uri).scheme in ("http", "https") and not is_reachable(uri, self.config.connect_timeout):
+            logger.warning(f"MLflow server {uri} is unreachable, tracking to {fallback} instead")
+            return fallback
+        return uri
+
+    def _read_run_record(self) -> dict:
+        if not self.config.run_path.exists():
+            return {}
+        with open(self.config.run_path) as f:
+            return json.load(f)
+
+    def _write_run_record(self, experiment_id: str):
+        record = {"run_id": self.run_id, "tracking_uri": self.tracking_uri, "experiment_id": experiment_id}
+        self.config.run_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.config.run_path.with_name(f".{self.config.run_path.name}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(record, f)
+        os.replace(tmp_path, self.config.run_path)
+
+    def _open_run(self, client, run_name: str, resume: bool, tags: dict) -> str:
+        if resume:
+            record = self._read_run_record()
+            if record.get("tracking_uri") == self.tracking_uri:
+                try:
+                    client.get_run(record["run_id"])
+                    self.run_id = record["run_id"]
+                    return self.run_id
+                except Exception as e:
+                    logger.warning(f"Cannot resume MLflow run {record['run_id']}, starting a new one: {e}")
+
+        experiment = client.get_experiment_by_name(self.config.experiment_name)
+        experiment_id = experiment.experiment_id if experiment else client.create_experiment(self.config.experiment_name)
+        run = client.create_run(experiment_id, run_name=run_name, tags=tags)
+        self.run_id = run.info.run_id
+        self._write_run_record(experiment_id)
+        return self.run_id
+
+    def _send(self, client, pending: dict) -> bool:
+        """Sends the pending metrics, params and tags in batches within MLflow's limits.
+
+        Entries the server rejects as invalid (e.g. a param re-logged with a
+        different value) are dropped; anything else that fails stays pending.
+        """
+        from mlflow.entities import Metric, Param, RunTag
+        from mlflow.exceptions import MlflowException
+
+        batches = (("metrics", Metric, MAX_METRICS_PER_BATCH), ("params", Param, MAX_PARAMS_PER_BATCH),
+                   ("tags", RunTag, MAX_TAGS_PER_BATCH))
+        for kind, entity, limit in batches:
+            items = pending[kind]
+            while items:
+                try:
+                    client.log_batch(self.run_id, **{kind: [entity(*item) for item in items[:limit]]})
+                except MlflowException as e:
+                    if e.error_code != "INVALID_PARAMETER_VALUE":
+                        logger.warning(f"MLflow log_batch failed, retrying on the next flush: {e}")
+                        return False
+                    logger.warning(f"MLflow rejected {kind}, dropping them: {e}")
+                except Exception as e:
+                    logger.warning(f"MLflow log_batch failed, retrying on the next flush: {e}")
+                    return False
+                del items[:limit]
+        return True
+
+    def _upload(self, client, snapshot: Path, artifact_path: str, registered_model_name: str):
+        try:
+            client.log_artifact(self.run_id, str(snapshot), artifact_path)
+            if registered_model_name and urlparse(self.tracking_uri).scheme not in ("", "file"):
+                from mlflow.exceptions import MlflowException
+
+                try:
+                    client.create_registered_model(registered_model_name)
+                except MlflowException:
+                    pass  # already registered
+                source = f"{client.get_run(self.run_id).info.artifact_uri}/{artifact_path or ''}".rstrip("/")
+                client.create_model_version(registered_model_name, source, self.run_id)
+        except Exception as e:
+            logger.warning(f"MLflow upload of {snapshot.name} failed: {e}")
+        finally:
+            shutil.rmtree(snapshot.parent, ignore_errors=True)
+
+    def _worker(self, run_name: str, resume: bool, tags: dict):
+        from mlflow.tracking import MlflowClient
+
+        try:
+            self.tracking_uri = self._resolve_tracking_uri()
+            client = MlflowClient(tracking_uri=self.tracking_uri)
+            self._open_run(client, run_name, resume, tags)
+            logger.info(f"MLflow run {self.run_id} at {self.tracking_uri}")
+        except Exception as e:
+            logger.warning(f"MLflow tracking disabled for this run: {e}")
+            client = None
+
+        pending = {"metrics": [], "params": [], "tags": []}
+        artifacts = []
+        status = None
+        last_flush = time.monotonic()
+        while status is None:
+            try:
+                kind, payload = self._queue.get(timeout=self.config.flush_interval)
+                if kind == "metrics":
+                    metrics, step, timestamp = payload
+                    pending["metrics"].extend((name, value, timestamp, step) for name, value in metrics.items())
+                elif kind in ("params", "tags"):
+                    pending[kind].extend(payload.items())
+                elif kind == "artifact":
+                    artifacts.append(payload)
+                elif kind == "finish":
+                    status = payload
+            except queue.Empty:
+                pass
+
+            if client is None:
+                pending = {"metrics": [], "params": [], "tags": []}
+                for snapshot, _, _ in artifacts:
+                    shutil.rmtree(snapshot.parent, ignore_errors=True)
+                artifacts = []
+                continue
+            if status or time.monotonic() - last_flush >= self.config.flush_interval \
+                    or len(pending["metrics"]) >= MAX_METRICS_PER_BATCH:
+                self._send(client, pending)
+                while artifacts:
+                    self._upload(client, *artifacts.pop(0))
+                last_flush = time.monotonic()
+
+        if client is not None:
+            unsent = sum(len(items) for items in pending.values())
+            if unsent:
+                logger.warning(f"Dropped {unsent} MLflow metrics, params and tags that could not be sent")
+            try:
+                client.set_terminated(self.run_id, status=status)
+            except Exception as e:
+                logger.warning(f"Could not end MLflow run {self.run_id}: {e}")
@@ -1,16 +1,34 @@
+import os
+import json
+import hashlib
+import numpy as np
 import tensorflow as tf
 from pathlib import Path
-import mlflow
-import mlflow.keras
-from mlflow.models import infer_signature
-from urllib.parse import urlparse
-from kidneyDiseaseClassifier.entity.config_entity import EvaluationConfig
-from kidneyDiseaseClassifier.utils.common import save_json
+from kidneyDiseaseClassifier.entity.config_entity import EvaluationConfig, TensorCacheConfig
+from kidneyDiseaseClassifier.components.tensor_cache import TensorCache
+from kidneyDiseaseClassifier.components.mlflow_tracker import MlflowTracker
+from kidneyDiseaseClassifier import logger
+from kidneyDiseaseClassifier.utils.common import save_json, load_json, get_file_hash
+from kidneyDiseaseClassifier.utils.classification_metrics import classification_metrics
+from kidneyDiseaseClassifier.components.data_loader import build_tf_dataset, iterate_batches
+from kidneyDiseaseClassifier.components.backbones import load_keras_model
+from kidneyDiseaseClassifier.components.dataset_manifest import DatasetManifest, load_manifest
 
 
 class Evaluation:
+    VALIDATION_SPLIT = 0.30
+    CACHE_ENTRIES = 10
+
     def __init__(self, config: EvaluationConfig) -> None:
         self.config = config
+        self.manifest = None
+        self.from_cache = False
+
+    def dataset_manifest(self) -> DatasetManifest:
+        """Loads the dataset manifest written at ingestion, once per Evaluation object."""
+        if self.manifest is None:
+            self.manifest = load_manifest(self.config.manifest_path, Path(self.config.training_data))
+        return self.manifest
 
     def valid_generator(self):
         """
@@ -18,10 +36,42 @@ class Evaluation:
 
         This method prepares data generators for training and validation using the specified parameters
         in the training configuration. It applies data augmentation techniques if enabled.
+
+        Raises:
+            ValueError: If DATA_LOADER names no known input pipeline.
         """
+        if self.config.params_data_loader not in ("tf_data", "tensor_cache", "generator"):
+            raise ValueError(f"Unknown DATA_LOADER: {self.config.params_data_loader}")
+
+        if self.config.params_data_loader == "tf_data":
+            self.validation_data, _, _ = build_tf_dataset(
+                directory=self.config.training_data,
+                image_size=self.config.params_image_size,
+                batch_size=self.config.params_batch_size,
+                subset='validation',
+                validation_split=self.VALIDATION_SPLIT,
+                shuffle=False,
+                manifest=self.dataset_manifest()
+            )
+            return
+
+        if self.config.params_data_loader == "tensor_cache":
+            cache = TensorCache(config=TensorCacheConfig(
+                root_dir=self.config.tensor_cache_dir,
+                source_data=Path(self.config.training_data),
+                manifest_path=self.config.manifest_path,
+                params_image_size=self.config.params_image_size
+            ))
+            self.validation_data = cache.sequence(
+                subset='validation',
+                validation_split=self.VALIDATION_SPLIT,
+                batch_size=self.config.params_batch_size,
+                shuffle=False
+            )
+            return
+
         datagenerator_kwargs = dict(
-            rescale=1./255,
-            validation_split=0.30
+            rescale=1./255
         )
         dataflow_kwargs = dict(
             target_size=self.config.params_image_size[:-1],
@@ -32,38 +82,107 @@ class Evaluation:
         valid_datagenerator = tf.keras.preprocessing.image.ImageDataGenerator(
             **datagenerator_kwargs
         )
-        self.validation_data = valid_datagenerator.flow_from_directory(
-            directory=self.config.training_data,
+        self.validation_data = self.dataset_manifest().flow(
+            valid_datagenerator,
             subset='validation',
+            validation_split=self.VALIDATION_SPLIT,
             shuffle=False,
             **dataflow_kwargs
         )
 
     @staticmethod
     def load_model(path: Path) -> tf.keras.Model:
-        return tf.keras.models.load_model(path)
+        return load_keras_model(path)
     
-    def evaluation(self):
+    def fingerprint(self) -> str:
+        """Hashes everything the scores depend on.
+
+        The key covers the model file content, the content hash of every validation
+        image from the dataset manifest and the input settings.
+
+        Returns:
+            str: The evaluation cache key.
+        """
+        manifest = self.dataset_manifest()
+        key = {
+            "model": get_file_hash(Path(self.config.path_of_model)),
+            "validation_data": manifest.subset_hash('validation', self.VALIDATION_SPLIT),
+            "class_indices": manifest.class_indices,
+            "image_size": list(self.config.params_image_size),
+            "data_loader": self.config.params_data_loader,
+            "validation_split": self.VALIDATION_SPLIT,
+        }
+        return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+    def _read_cache(self) -> dict:
+        if not self.config.cache_path.exists():
+            return {}
+        with open(self.config.cache_path) as f:
+            return json.load(f)
+
+    def _compute_metrics(self) -> dict:
+        """Runs one prediction pass over the validation data and derives every metric from it."""
         self.model = self.load_model(self.config.path_of_model)
         self.valid_generator()
-        self.score = self.model.evaluate(self.validation_data)
+
+        probabilities, labels = [], []
+        for images, batch_labels in iterate_batches(self.validation_data):
+            probabilities.append(np.asarray(self.model.predict_on_batch(images)))
+            labels.append(np.asarray(batch_labels))
+        probabilities = np.concatenate(probabilities)
+        labels = np.concatenate(labels)
+
+        return classification_metrics(probabilities, labels, self.dataset_manifest().class_names)
+
+    def evaluation(self):
+        """Scores the model on the validation split, reusing cached scores when nothing changed."""
+        self.model = None
+        key = self.fingerprint()
+        cache = self._read_cache()
+        self.from_cache = key in cache
+
+        if self.from_cache:
+            logger.info(f"Model and validation data unchanged, reusing cached scores ({key[:12]})")
+            self.metrics = cache[key]
+        else:
+            self.metrics = self._compute_metrics()
+            cache[key] = self.metrics
+            # bound the cache to the most recent model/data pairs
+            for old_key in list(cache)[:-self.CACHE_ENTRIES]:
+                del cache[old_key]
+            tmp_path = self.config.cache_path.with_name(f".{self.config.cache_path.name}.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(cache, f)
+            os.replace(tmp_path, self.config.cache_path)
+
+        self.score = [self.metrics["loss"], self.metrics["accuracy"]]
         self.save_score()
 
     def save_score(self):
-        scores = {"loss": self.score[0], "accuracy": self.score[1]}
+        scores = dict(self.metrics)
+        if self.config.quantization_report_path.exists():
+            # carry the quantized models' accuracy drop into the tracked metrics
+            report = load_json(path=self.config.quantization_report_path)
+            for variant in ("int8", "float16"):
+                if variant in report:
+                    scores[f"{variant}_accuracy"] = report[variant]["accuracy"]
+                    scores[f"{variant}_accuracy_drop"] = report[variant]["accuracy_drop"]
         save_json(path=Path("scores.json"), data=scores)
 
-    def log_into_mlflow(self):
-        mlflow.set_registry_uri(self.config.mlflow_uri)
-        tracking_url_type_store= urlparse(mlflow.get_tracking_uri()).scheme
+    def log_into_mlflow(self, tracker: MlflowTracker):
+        """Queues the params, scores and model file on a tracker; nothing here waits on the server.
 
-        with mlflow.start_run():
-            mlflow.log_params(self.config.all_params)
-            mlflow.log_metrics(
-                {"loss": self.score[0], "accuracy": self.score[1]}
-            )
-            
-            if tracking_url_type_store != "file":
-                mlflow.keras.log_model(self.model, "model", registered_model_name="VGG16Model")
-            else:
-                mlflow.keras.log_model(self.model, "model")
\ No newline at end of file
+        The model file is only uploaded when it was just scored. Cached scores
+        mean this exact file (same hash) was evaluated and uploaded before.
+
+        Args:
+            tracker (MlflowTracker): A started tracker, usually continuing the training run.
+        """
+        tracker.log_params(self.config.all_params)
+        tracker.log_metrics(self.metrics)
+        if self.from_cache:
+            logger.info("Model unchanged since it was last evaluated, not uploading it again")
+            return
+        tracker.log_artifact(
+            self.config.path_of_model, "model", registered_model_name=tracker.config.registered_model_name
+        )
@@ -0,0 +1,223 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+import numpy as np
+from kidneyDiseaseClassifier import logger
+from kidneyDiseaseClassifier.entity.config_entity import PredictionConfig
+from kidneyDiseaseClassifier.components.model_store import read_ref
+
+TFLITE_VARIANTS = {"tflite_int8": "int8", "tflite_float16": "float16"}
+
+
+class TracedKerasModel:
+    """A Keras model whose inference function is traced once for its fixed input shape.
+
+    `predict` calls the concrete function directly, so no request pays for
+    tracing or for the per-call setup of `Model.predict`.
+    """
+
+    def __init__(self, model):
+        import tensorflow as tf
+        self.model = model
+        self.input_shape = model.input_shape
+        spec = tf.TensorSpec(shape=(None,) + tuple(model.input_shape[1:]), dtype=tf.float32)
+        self._function = tf.function(
+            lambda x: model(x, training=False), input_signature=[spec]
+        ).get_concrete_function()
+
+    def predict(self, x, verbose=0):
+        import tensorflow as tf
+        return self._function(tf.convert_to_tensor(x, dtype=tf.float32)).numpy()
+
+
+class ModelHolder:
+    """Process-wide owner of the model served by the prediction pipeline.
+
+    The model is loaded once and shared by every request. A background thread
+    watches the model store ref named by `model_ref` (or, without one, the
+    model file) and loads and swaps in each newly published version. A ref is
+    updated atomically, so its new version is loaded on the next poll; a
+    plain file is loaded once it has settled. Requests already holding the previous model keep using it
+    until they finish, so no request is dropped during a swap. A small LRU of
+    previously loaded versions lets a request pin a specific version.
+
+    Attributes:
+        config (PredictionConfig): The configuration for serving predictions.
+    """
+
+    def __init__(self, config: PredictionConfig, loader=None):
+        """Initializes the ModelHolder and loads the current model.
+
+        Args:
+            config (PredictionConfig): The configuration for serving predictions.
+            loader (callable, optional): Function that loads a model from a path.
+                Defaults to the loader for the configured backend.
+        """
+        self.config = config
+        self._loader = loader or self._default_loader()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._models = OrderedDict()
+        self._current_version = None
+        self._pending_signature = None
+        self._stop_event = threading.Event()
+        self._watcher = None
+        self.load_timings = {}
+        self.reload()
+
+    def _default_loader(self):
+        if self.config.backend == "keras":
+            return self._load_keras_model
+        if self.config.backend in TFLITE_VARIANTS:
+            return self._load_tflite_model
+        raise ValueError(f"Unknown prediction backend: {self.config.backend}")
+
+    @staticmethod
+    def _load_keras_model(path: Path):
+        from kidneyDiseaseClassifier.components.backbones import load_keras_model
+        return load_keras_model(path)
+
+    def _load_tflite_model(self, path: Path):
+        from kidneyDiseaseClassifier.components.tflite_model import load_checked_tflite_model
+        return load_checked_tflite_model(
+            model_path=path,
+            variant=TFLITE_VARIANTS[self.config.backend],
+            report_path=self.config.quantization_report_path,
+            max_accuracy_drop=self.config.max_accuracy_drop,
+            num_threads=self.config.tflite_threads
+        )
+
+    def _warmup(self, model):
+        """Runs synthetic batches so the first real request does not pay for kernel setup."""
+        input_shape = getattr(model, "input_shape", None)
+        if input_shape is None:
+            return
+        for batch_size in self.config.warmup_batch_sizes:
+            model.predict(np.zeros((batch_size,) + tuple(input_shape[1:]), dtype=np.float32), verbose=0)
+
+    def _locate(self) -> tuple:
+        """Finds the model to serve.
+
+        Returns:
+            tuple: The version identifier, the model file, and whether the version was published
+                atomically (through a model store ref) rather than read off a file that may still be written.
+        """
+        if self.config.model_ref:
+            record = read_ref(self.config.model_store_dir, self.config.model_ref)
+            if record is not None:
+                return record["digest"][:12], self.config.model_store_dir / record["object"], True
+        stat = os.stat(self.config.model_path)
+        key = f"{os.path.abspath(self.config.model_path)}:{stat.st_mtime_ns}:{stat.st_size}"
+        return hashlib.sha1(key.encode()).hexdigest()[:12], self.config.model_path, False
+
+    @property
+    def version(self) -> str:
+        """The version identifier of the model currently being served."""
+        return self._current_version
+
+    @property
+    def ready(self) -> bool:
+        """Whether a model is loaded and warmed up, as it only becomes current after its warm-up."""
+        return self._current_version is not None
+
+    @property
+    def versions(self) -> list:
+        """Version identifiers held in memory, least recently used first."""
+        with self._lock:
+            return list(self._models)
+
+    def get(self, version: str = None):
+        """Returns the model to predict with.
+
+        Args:
+            version (str, optional): Pin a previously loaded version. Defaults to the current one.
+
+        Returns:
+            tuple: The version identifier and the model.
+
+        Raises:
+            KeyError: If the requested version is not held in memory.
+        """
+        with self._lock:
+            version = version or self._current_version
+            if version not in self._models:
+                raise KeyError(f"Model version {version} is not loaded")
+            self._models.move_to_end(version)
+            return version, self._models[version]
+
+    def reload(self) -> bool:
+        """Loads the model file if it changed since the last load and makes it current.
+
+        Returns:
+            bool: True if a new version was swapped in.
+        """
+        with self._load_lock:
+            version, path, _ = self._locate()
+            if version == self._current_version:
+                return False
+
+            logger.info(f"Loading model {path} as version {version}")
+            timings = {}
+            start = time.perf_counter()
+            model = self._loader(path)
+            timings["load"] = time.perf_counter() - start
+
+            if self.config.pretrace and self.config.backend == "keras":
+                start = time.perf_counter()
+                model = TracedKerasModel(model)
+                timings["trace"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            self._warmup(model)
+            timings["warmup"] = time.perf_counter() - start
+
+            with self._lock:
+                self._models[version] = model
+                self._models.move_to_end(version)
+                self._current_version = version
+                while len(self._models) > max(self.config.cache_size, 1):
+                    evicted, _ = self._models.popitem(last=False)
+                    logger.info(f"Evicted model version {evicted} from the cache")
+            self.load_timings = timings
+
+        logger.info(f"Serving model version {version}")
+        return True
+
+    def _poll(self):
+        """Swaps in a newly published ref at once, or a changed model file once its signature is stable across two polls."""
+        try:
+            signature, _, atomic = self._locate()
+        except FileNotFoundError:
+            return
+
+        if signature == self._current_version:
+            self._pending_signature = None
+        elif not atomic and signature != self._pending_signature:
+            # The file may still be being written; wait for it to settle.
+            self._pending_signature = signature
+        else:
+            try:
+                self.reload()
+            except Exception as e:
+                logger.exception(f"Failed to load new model version, keeping {self._current_version}: {e}")
+            self._pending_signature = None
+
+    def _watch(self):
+        while not self._stop_event.wait(self.config.poll_interval):
+            self._poll()
+
+    def start(self):
+        """Starts watching the model file in a background thread."""
+        if self._watcher is None and self.config.poll_interval > 0:
+            self._watcher = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+            self._watcher.start()
+
+    def stop(self):
+        """Stops the background watcher."""
+        self._stop_event.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
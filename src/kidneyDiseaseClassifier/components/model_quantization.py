@@ -0,0 +1,170 @@
+import os
+import numpy as np
+import tensorflow as tf
+from pathlib import Path
+from kidneyDiseaseClassifier import logger
+from kidneyDiseaseClassifier.entity.config_entity import QuantizationConfig
+from kidneyDiseaseClassifier.components.tflite_model import TFLiteModel
+from kidneyDiseaseClassifier.components.data_loader import iterate_batches
+from kidneyDiseaseClassifier.components.backbones import load_keras_model
+from kidneyDiseaseClassifier.utils.common import save_json
+
+
+class ModelQuantization:
+    """Converts the trained model to int8 and float16 TFLite models and measures their accuracy.
+
+    Int8 quantization is calibrated on a seeded random sample of the Evaluation
+    validation split, stratified by class. Every model, including the float
+    one, is scored on the rest of the split, so the accuracy drop written to
+    the report that serving checks is measured on images the calibration never
+    saw.
+
+    Attributes:
+        config (QuantizationConfig): The configuration for model quantization.
+    """
+
+    def __init__(self, config: QuantizationConfig):
+        """Initializes the ModelQuantization.
+
+        Args:
+            config (QuantizationConfig): The configuration for model quantization.
+        """
+        self.config = config
+
+    CALIBRATION_SEED = 42
+
+    @staticmethod
+    def calibration_indices(labels: np.ndarray, samples: int, seed: int) -> np.ndarray:
+        """Picks the calibration images: a seeded random sample with each class in its share of the split.
+
+        At most half of the images are picked, so the rest can score the quantized models.
+
+        Args:
+            labels (np.ndarray): The class of every validation image, in order.
+            samples (int): The number of calibration images wanted.
+            seed (int): The sampling seed.
+
+        Returns:
+            np.ndarray: The sorted positions of the calibration images.
+        """
+        rng = np.random.default_rng(seed)
+        samples = min(samples, len(labels) // 2)
+        chosen = []
+        for label in np.unique(labels):
+            positions = np.flatnonzero(labels == label)
+            share = min(len(positions), int(round(samples * len(positions) / len(labels))))
+            chosen.append(rng.choice(positions, size=share, replace=False))
+        return np.sort(np.concatenate(chosen)) if chosen else np.array([], dtype=np.int64)
+
+    @staticmethod
+    def _representative_dataset(validation_data, indices: np.ndarray):
+        def generator():
+            selected = set(int(i) for i in indices)
+            last = max(selected, default=-1)
+            position = 0
+            for images, _ in iterate_batches(validation_data):
+                for image in np.asarray(images, dtype=np.float32):
+                    if position > last:
+                        return
+                    if position in selected:
+                        yield [image[np.newaxis]]
+                    position += 1
+        return generator
+
+    def convert(self, model: tf.keras.Model, variant: str, validation_data=None,
+                calibration_indices: np.ndarray = None) -> bytes:
+        """Converts a Keras model to a quantized TFLite flatbuffer.
+
+        Args:
+            model (tf.keras.Model): The trained float model.
+            variant (str): Either "int8" or "float16".
+            validation_data: Validation batches used to calibrate int8 quantization.
+            calibration_indices (np.ndarray, optional): Positions of the calibration images in
+                `validation_data`, from `calibration_indices`.
+
+        Returns:
+            bytes: The TFLite model.
+        """
+        converter = tf.lite.TFLiteConverter.from_keras_model(model)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if variant == "int8":
+            converter.representative_dataset = self._representative_dataset(validation_data, calibration_indices)
+        elif variant == "float16":
+            converter.target_spec.supported_types = [tf.float16]
+        else:
+            raise ValueError(f"Unknown quantization variant: {variant}")
+        return converter.convert()
+
+    @staticmethod
+    def predict_classes(model, validation_data) -> tuple:
+        """Runs a Keras or TFLite model over every validation batch.
+
+        Args:
+            model: An object with a Keras-style `predict` method.
+            validation_data: The validation batches.
+
+        Returns:
+            tuple: The predicted and the true class of every image, in order.
+        """
+        predicted, labels = [], []
+        for images, batch_labels in iterate_batches(validation_data):
+            predictions = model.predict(np.asarray(images, dtype=np.float32), verbose=0)
+            predicted.append(np.argmax(predictions, axis=1))
+            labels.append(np.argmax(np.asarray(batch_labels), axis=1))
+        return np.concatenate(predicted), np.concatenate(labels)
+
+    @staticmethod
+    def accuracy(predicted: np.ndarray, labels: np.ndarray, mask: np.ndarray) -> float:
+        """The accuracy over the images selected by `mask`."""
+        return float(np.mean(predicted[mask] == labels[mask])) if mask.any() else 0.0
+
+    def quantize(self, validation_data) -> dict:
+        """Writes the quantized models and the accuracy report.
+
+        Args:
+            validation_data: The Evaluation validation batches.
+
+        Returns:
+            dict: The report with the accuracy, accuracy drop and size of each model.
+        """
+        model = load_keras_model(self.config.path_of_model)
+        float_predicted, labels = self.predict_classes(model, validation_data)
+        calibration = self.calibration_indices(labels, self.config.params_calibration_samples, self.CALIBRATION_SEED)
+        held_out = np.ones(len(labels), dtype=bool)
+        held_out[calibration] = False
+        float_accuracy = self.accuracy(float_predicted, labels, held_out)
+        report = {
+            "calibration_samples": int(len(calibration)),
+            "evaluation_samples": int(held_out.sum()),
+            "float": {
+                "accuracy": float_accuracy,
+                "size_bytes": os.path.getsize(self.config.path_of_model)
+            }
+        }
+        logger.info(
+            f"Float model accuracy: {float_accuracy:.4f} on {report['evaluation_samples']} images "
+            f"not used for calibration ({report['calibration_samples']} calibration images)"
+        )
+
+        for variant, path in (("int8", self.config.int8_model_path), ("float16", self.config.float16_model_path)):
+            tflite_model = self.convert(model, variant, validation_data, calibration)
+            path = Path(path)
+            tmp_path = path.with_name(f".{path.name}.tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(tflite_model)
+            os.replace(tmp_path, path)
+
+            variant_predicted, _ = self.predict_classes(TFLiteModel(path), validation_data)
+            variant_accuracy = self.accuracy(variant_predicted, labels, held_out)
+            report[variant] = {
+                "accuracy": variant_accuracy,
+                "accuracy_drop": float_accuracy - variant_accuracy,
+                "size_bytes": len(tflite_model)
+            }
+            logger.info(
+                f"{variant} model accuracy: {variant_accuracy:.4f} "
+                f"(drop {report[variant]['accuracy_drop']:.4f}, {len(tflite_model)} bytes)"
+            )
+
+        save_json(path=Path(self.config.report_path), data=report)
+        return report
@@ -0,0 +1,211 @@
+import os
+import json
+import stat
+import time
+import shutil
+import hashlib
+from datetime import datetime, timezone
+from pathlib import Path
+from kidneyDiseaseClassifier import logger
+from kidneyDiseaseClassifier.entity.config_entity import ModelStoreConfig
+from kidneyDiseaseClassifier.utils.profiling import profile
+
+
+def model_digest(model) -> str:
+    """Hashes a Keras model's architecture, weights and optimizer settings.
+
+    Two models with the same digest save to equivalent files, so the digest
+    is known before anything is written and an identical model is never
+    saved twice.
+    """
+    digest = hashlib.sha256(model.to_json().encode())
+    for weights in model.get_weights():
+        digest.update(str(weights.dtype).encode())
+        digest.update(str(weights.shape).encode())
+        digest.update(weights.tobytes())
+    if getattr(model, "optimizer", None) is not None:
+        digest.update(json.dumps(model.optimizer.get_config(), sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def link_or_copy(source: Path, target: Path):
+    """Atomically places `source` at `target`, as a hard link where the filesystem allows it."""
+    target = Path(target)
+    if target.exists() and os.path.samefile(source, target):
+        # already in place; renaming a link over another link to the same file would be a no-op
+        return
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        shutil.copy2(source, tmp_path)
+    os.replace(tmp_path, target)
+
+
+def read_ref(root_dir: Path, name: str) -> dict:
+    """The current record of a ref in the store at `root_dir`, or None if it was never published."""
+    try:
+        with open(Path(root_dir) / "refs" / f"{name}.json") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+class ModelStore:
+    """A content-addressed store of saved Keras models with named, atomically updated refs.
+
+    Each model is saved once, as `objects/<digest>.h5`, where the digest covers
+    its architecture, weights and optimizer settings; saving a model that is
+    already stored writes nothing. Objects are read-only. A ref such as
+    "model" is a small JSON file naming the current object; publishing
+    rewrites it with a rename, so readers see either the old or the new version,
+    never a partial one. Every publish is appended to the ref's history, and
+    `prune` deletes objects that are neither current nor among the last
+    `keep_versions` versions of any ref.
+
+    Paths the rest of the pipeline reads, such as `artifacts/training/model.h5`,
+    are hard links to the object rather than copies.
+
+    Attributes:
+        config (ModelStoreConfig): The store location and retention policy.
+    """
+
+    SUFFIX = ".h5"
+    # objects this recent are never pruned, so a concurrent put is not deleted before its publish
+    GRACE_SECONDS = 600
+
+    def __init__(self, config: ModelStoreConfig):
+        self.config = config
+        self.root_dir = Path(config.root_dir)
+        self.objects_dir = self.root_dir / "objects"
+        self.refs_dir = self.root_dir / "refs"
+        for directory in (self.objects_dir, self.refs_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+
+    def object_path(self, digest: str) -> Path:
+        return self.objects_dir / f"{digest}{self.SUFFIX}"
+
+    def _ref_path(self, name: str) -> Path:
+        return self.refs_dir / f"{name}.json"
+
+    def _history_path(self, name: str) -> Path:
+        return self.refs_dir / f"{name}.history.jsonl"
+
+    def put(self, model) -> str:
+        """Saves a model unless an identical one is already stored.
+
+        Returns:
+            str: The model's digest.
+        """
+        digest = model_digest(model)
+        path = self.object_path(digest)
+        if path.exists():
+            logger.info(f"Model {digest[:12]} is already stored, not saving it again")
+            return digest
+
+        tmp_path = self.objects_dir / f".{digest}.{os.getpid()}.tmp{self.SUFFIX}"
+        with profile("save_model"):
+            model.save(tmp_path)
+        os.chmod(tmp_path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        os.replace(tmp_path, path)
+        logger.info(f"Stored model {digest[:12]} ({path.stat().st_size / 1e6:.1f} MB)")
+        return digest
+
+    def publish(self, name: str, digest: str, links: list = ()):
+        """Points a ref at a stored model and links the model at each of `links`.
+
+        The links are placed first, so anything watching the ref only sees a
+        version whose files are all in place.
+        """
+        path = self.object_path(digest)
+        if not path.exists():
+            raise FileNotFoundError(f"Model {digest} is not in the store")
+        for link in links:
+            link_or_copy(path, link)
+
+        record = {
+            "name": name,
+            "digest": digest,
+            "object": str(path.relative_to(self.root_dir)),
+            "published": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        ref_path = self._ref_path(name)
+        tmp_path = ref_path.with_name(f".{ref_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(record, f)
+        os.replace(tmp_path, ref_path)
+        with open(self._history_path(name), "a") as f:
+            f.write(json.dumps(record) + "\n")
+        logger.info(f"Published model {digest[:12]} as {name}")
+
+    def save(self, model, name: str, links: list = ()) -> str:
+        """Stores a model, publishes it under `name` and prunes old versions.
+
+        Args:
+            model (tf.keras.Model): The model to save.
+            name (str): The ref to point at it, e.g. "model".
+            links (list, optional): Paths where the model file should also appear.
+
+        Returns:
+            str: The model's digest.
+        """
+        digest = self.put(model)
+        self.publish(name, digest, links)
+        self.prune()
+        return digest
+
+    def resolve(self, name: str) -> dict:
+        """The current record of a ref, or None if it was never published."""
+        return read_ref(self.root_dir, name)
+
+    def history(self, name: str) -> list:
+        """Every publish of a ref, oldest first."""
+        path = self._history_path(name)
+        if not path.exists():
+            return []
+        with open(path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def prune(self, keep: int = None) -> int:
+        """Deletes objects no ref needs any more.
+
+        Args:
+            keep (int, optional): Versions kept per ref, including the current one. Defaults to `keep_versions`.
+
+        Returns:
+            int: The number of objects deleted.
+        """
+        keep = max(1, keep or self.config.keep_versions)
+        retained = set()
+        for ref_path in self.refs_dir.glob("*.json"):
+            name = ref_path.name[:-len(".json")]
+            current = self.resolve(name)
+            if current:
+                retained.add(current["digest"])
+            recent = []
+            for record in reversed(self.history(name)):
+                if record["digest"] not in recent:
+                    recent.append(record["digest"])
+                if len(recent) == keep:
+                    break
+            retained.update(recent)
+
+        deleted, freed = 0, 0
+        cutoff = time.time() - self.GRACE_SECONDS
+        for path in self.objects_dir.glob(f"*{self.SUFFIX}"):
+            if path.name.startswith(".") or path.name[:-len(self.SUFFIX)] in retained:
+                continue
+            object_stat = path.stat()
+            if object_stat.st_mtime > cutoff:
+                continue
+            # a path still linked to the object keeps its data, so only the last link frees space
+            if object_stat.st_nlink == 1:
+                freed += object_stat.st_size
+            path.unlink()
+            deleted += 1
+        if deleted:
+            logger.info(f"Pruned {deleted} model versions from the store, {freed / 1e6:.1f} MB")
+        return deleted
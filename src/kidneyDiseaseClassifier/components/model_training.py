@@ -1,8 +1,24 @@
+import os
+import json
+import time
+import hashlib
 import urllib.request as request
 from zipfile import ZipFile
 import tensorflow as tf
 from pathlib import Path
-from kidneyDiseaseClassifier.entity.config_entity import TrainingConfig
+import numpy as np
+from kidneyDiseaseClassifier import logger
+from kidneyDiseaseClassifier.utils.common import save_json
+from kidneyDiseaseClassifier.utils.profiling import profile, epoch_profiler_callback
+from kidneyDiseaseClassifier.entity.config_entity import TrainingConfig, TensorCacheConfig
+from kidneyDiseaseClassifier.components.tensor_cache import TensorCache
+from kidneyDiseaseClassifier.components.feature_cache import FeatureCache, split_backbone_head
+from kidneyDiseaseClassifier.components.dataset_manifest import DatasetManifest, load_manifest
+from kidneyDiseaseClassifier.components.data_loader import build_tf_dataset, measure_throughput, ThroughputCallback
+from kidneyDiseaseClassifier.components.model_store import ModelStore
+from kidneyDiseaseClassifier.components.checkpointing import TrainingCheckpoint, RestoreBestWeights, monitor_mode
+from kidneyDiseaseClassifier.components.distributed import is_multi_worker, is_chief, worker_index
+from kidneyDiseaseClassifier.components.backbones import load_keras_model
 
 class Training:
     """
@@ -19,36 +35,106 @@ class Training:
         train_valid_generator(): Prepares data generators for training and validation.
 
     """
-    def __init__(self, config: TrainingConfig):
+    VALIDATION_SPLIT = 0.20
+    # every worker of a distributed run must shuffle alike to read disjoint slices of the same batches
+    SHUFFLE_SEED = 42
+
+    def __init__(self, config: TrainingConfig, model_store: ModelStore = None,
+                 strategy: tf.distribute.Strategy = None):
         """
         Initializes the Training object with the provided configuration.
 
         Args:
             config (TrainingConfig): The configuration for training the model.
+            model_store (ModelStore, optional): Stores the trained model once and publishes it as the
+                "model" ref. Without one, the model is saved to each path in full.
+            strategy (tf.distribute.Strategy, optional): The strategy from `get_strategy`. Under a
+                MultiWorkerMirroredStrategy each worker trains on its shard of every global batch,
+                and only the chief saves the model. Defaults to the single-process strategy.
         """
         self.config = config
+        self.model_store = model_store
+        self.strategy = strategy or tf.distribute.get_strategy()
+        self.manifest = None
+        self.checkpoint = None
+
+    def dataset_manifest(self) -> DatasetManifest:
+        """Loads the dataset manifest written at ingestion, once per Training object."""
+        if self.manifest is None:
+            self.manifest = load_manifest(self.config.manifest_path, self.config.training_data)
+        return self.manifest
 
     def get_base_model(self):
         """
         Loads the updated base model for training.
 
         This method loads the updated base model from the specified path in the training configuration.
+        The model is created under the training strategy, so with several workers its variables are
+        mirrored and kept in sync.
         """
-        self.model = tf.keras.models.load_model(
-            self.config.updated_base_model_path
+        with self.strategy.scope():
+            self.model = load_keras_model(
+                self.config.updated_base_model_path
+            )
+            self._compile(
+                self.model,
+                jit_compile=self.config.params_jit_compile,
+                steps_per_execution=self.config.params_steps_per_execution
+            )
+
+    @staticmethod
+    def _compile(model: tf.keras.Model, jit_compile: bool, steps_per_execution: int, optimizer=None):
+        """Recompiles a model with its own loss and optimizer and the given execution options.
+
+        Args:
+            model (tf.keras.Model): The model to compile.
+            jit_compile (bool): Whether to XLA-compile the train and test steps.
+            steps_per_execution (int): The number of batches run per compiled function call.
+            optimizer (tf.keras.optimizers.Optimizer, optional): Defaults to the model's current optimizer.
+        """
+        model.compile(
+            optimizer=optimizer or model.optimizer,
+            loss=model.loss,
+            metrics=["accuracy"],
+            jit_compile=jit_compile,
+            steps_per_execution=steps_per_execution
         )
-        
+
     def train_valid_generator(self):
         """
         Prepares data generators for training and validation.
 
         This method prepares data generators for training and validation using the specified parameters
-        in the training configuration. It applies data augmentation techniques if enabled.
+        in the training configuration. It applies data augmentation techniques if enabled. The input
+        pipeline is selected by the DATA_LOADER parameter.
+
+        Raises:
+            ValueError: If training on several workers with another loader than tf_data or another
+                TRAINING_MODE than full, which have no per-worker sharding.
+        """
+        if is_multi_worker(self.strategy) and (
+                self.config.params_data_loader != "tf_data" or self.config.params_training_mode != "full"):
+            raise ValueError("Distributed training needs DATA_LOADER tf_data and TRAINING_MODE full")
+
+        if self.config.params_data_loader == "tf_data":
+            self._tf_data_train_valid()
+        elif self.config.params_data_loader == "tensor_cache":
+            self._tensor_cache_train_valid()
+        elif self.config.params_data_loader == "generator":
+            self._generator_train_valid()
+        else:
+            raise ValueError(f"Unknown DATA_LOADER: {self.config.params_data_loader}")
+
+    def _generator_train_valid(self):
+        """Prepares ImageDataGenerator flows for training and validation.
+
+        The split is taken from the dataset manifest, so the flows match
+        `flow_from_directory` without scanning the dataset directory.
         """
+        manifest = self.dataset_manifest()
         # Data generator and flow configuration parameters
         datagenerator_kwargs = dict(
-            rescale=1./255,
-            validation_split=0.20
+            rescale=1./255
         )
         dataflow_kwargs = dict(
             target_size=self.config.params_image_size[:-1],
@@ -60,9 +146,10 @@ class Training:
         valid_datagenerator = tf.keras.preprocessing.image.ImageDataGenerator(
             **datagenerator_kwargs
         )
-        self.valid_generator = valid_datagenerator.flow_from_directory(
-            directory=self.config.training_data,
+        self.valid_generator = manifest.flow(
+            valid_datagenerator,
             subset='validation',
+            validation_split=self.VALIDATION_SPLIT,
             shuffle=False,
             **dataflow_kwargs
         )
@@ -81,13 +168,319 @@ class Training:
         else:
             train_datagenerator = valid_datagenerator
 
-        self.train_generator = train_datagenerator.flow_from_directory(
-            directory=self.config.training_data,
+        self.train_generator = manifest.flow(
+            train_datagenerator,
             subset='training',
+            validation_split=self.VALIDATION_SPLIT,
             shuffle=True,
             **dataflow_kwargs
         )
 
+        self.train_samples = self.train_generator.samples
+        self.valid_samples = self.valid_generator.samples
+
+    def _tf_data_train_valid(self):
+        """Prepares tf.data pipelines for training and validation with the same split and class indexing.
+
+        With several workers, BATCH_SIZE is the global batch size: every worker
+        builds the same shuffled file order and loads only its replicas' slice of
+        each global batch, so the workers together train on the batches a single
+        process would.
+        """
+        dataset_kwargs = dict(
+            directory=self.config.training_data,
+            image_size=self.config.params_image_size,
+            validation_split=self.VALIDATION_SPLIT,
+            repeat=True,
+            seed=self.SHUFFLE_SEED,
+            manifest=self.dataset_manifest()
+        )
+        subsets = {
+            "valid": dict(subset='validation', shuffle=False),
+            "train": dict(subset='training', shuffle=True, augment=self.config.params_is_augmentation),
+        }
+
+        if not is_multi_worker(self.strategy):
+            self.valid_generator, self.valid_samples, _ = build_tf_dataset(
+                batch_size=self.config.params_batch_size, **subsets["valid"], **dataset_kwargs
+            )
+            self.train_generator, self.train_samples, _ = build_tf_dataset(
+                batch_size=self.config.params_batch_size, **subsets["train"], **dataset_kwargs
+            )
+            return
+
+        samples = {}
+
+        def dataset_fn(name):
+            def build(input_context):
+                dataset, samples[name], _ = build_tf_dataset(
+                    batch_size=input_context.get_per_replica_batch_size(self.config.params_batch_size),
+                    num_shards=input_context.num_input_pipelines,
+                    shard_index=input_context.input_pipeline_id,
+                    **subsets[name],
+                    **dataset_kwargs
+                )
+                return dataset
+            return build
+
+        self.valid_generator = self.strategy.distribute_datasets_from_function(dataset_fn("valid"))
+        self.train_generator = self.strategy.distribute_datasets_from_function(dataset_fn("train"))
+        self.valid_samples, self.train_samples = samples["valid"], samples["train"]
+
+    def _tensor_cache_train_valid(self):
+        """Prepares batches for training and validation from the preprocessed tensor cache."""
+        cache = TensorCache(config=TensorCacheConfig(
+            root_dir=self.config.tensor_cache_dir,
+            source_data=self.config.training_data,
+            manifest_path=self.config.manifest_path,
+            params_image_size=self.config.params_image_size
+        ))
+
+        self.valid_generator = cache.sequence(
+            subset='validation',
+            validation_split=self.VALIDATION_SPLIT,
+            batch_size=self.config.params_batch_size,
+            shuffle=False
+        )
+        self.train_generator = cache.sequence(
+            subset='training',
+            validation_split=self.VALIDATION_SPLIT,
+            batch_size=self.config.params_batch_size,
+            shuffle=True,
+            augment=self.config.params_is_augmentation
+        )
+
+        self.train_samples = self.train_generator.samples
+        self.valid_samples = self.valid_generator.samples
+
+    def _feature_flows(self) -> dict:
+        """Prepares unshuffled, unaugmented flows over both subsets for feature extraction.
+
+        Returns:
+            dict: The flow for each subset, keyed by "training" and "validation".
+        """
+        flows = {}
+        for subset in ("training", "validation"):
+            if self.config.params_data_loader == "tf_data":
+                flows[subset], _, _ = build_tf_dataset(
+                    directory=self.config.training_data,
+                    image_size=self.config.params_image_size,
+                    batch_size=self.config.params_batch_size,
+                    subset=subset,
+                    validation_split=self.VALIDATION_SPLIT,
+                    shuffle=False,
+                    manifest=self.dataset_manifest()
+                )
+            elif self.config.params_data_loader == "tensor_cache":
+                cache = TensorCache(config=TensorCacheConfig(
+                    root_dir=self.config.tensor_cache_dir,
+                    source_data=self.config.training_data,
+                    manifest_path=self.config.manifest_path,
+                    params_image_size=self.config.params_image_size
+                ))
+                flows[subset] = cache.sequence(
+                    subset=subset,
+                    validation_split=self.VALIDATION_SPLIT,
+                    batch_size=self.config.params_batch_size,
+                    shuffle=False
+                )
+            else:
+                datagenerator = tf.keras.preprocessing.image.ImageDataGenerator(
+                    rescale=1./255
+                )
+                flows[subset] = self.dataset_manifest().flow(
+                    datagenerator,
+                    subset=subset,
+                    validation_split=self.VALIDATION_SPLIT,
+                    shuffle=False,
+                    target_size=self.config.params_image_size[:-1],
+                    batch_size=self.config.params_batch_size,
+                    interpolation="bilinear"
+                )
+        return flows
+
+    def _callbacks(self, callback_list: list = None) -> list:
+        callbacks = [ThroughputCallback(self.config.params_batch_size), epoch_profiler_callback()]
+        if self.checkpoint is not None:
+            callbacks.append(self.checkpoint.callback(self.config.params_checkpoint_every_epochs))
+        if self.config.params_early_stopping_patience > 0:
+            callbacks.append(tf.keras.callbacks.EarlyStopping(
+                monitor=self.config.params_monitor,
+                mode=monitor_mode(self.config.params_monitor),
+                patience=self.config.params_early_stopping_patience,
+                min_delta=self.config.params_early_stopping_min_delta
+            ))
+        if self.config.params_restore_best_weights:
+            callbacks.append(RestoreBestWeights(monitor=self.config.params_monitor))
+        return callbacks + list(callback_list or [])
+
+    def _checkpoint_dir(self) -> Path:
+        """Where this process checkpoints.
+
+        Every worker of a distributed run checkpoints, as saving reads the
+        mirrored variables collectively; the others write next to the chief's
+        directory so they never clobber it.
+        """
+        if is_chief(self.strategy):
+            return Path(self.config.checkpoint_dir)
+        return Path(f"{self.config.checkpoint_dir}_worker_{worker_index(self.strategy)}")
+
+    def _checkpoint_fingerprint(self) -> str:
+        """Identifies the setup checkpoints belong to. EPOCHS is left out, so an interrupted run can also be extended."""
+        model_stat = os.stat(self.config.updated_base_model_path)
+        key = {
+            "model": str(self.config.updated_base_model_path),
+            "model_mtime_ns": model_stat.st_mtime_ns,
+            "model_size": model_stat.st_size,
+            "dataset_hash": self.dataset_manifest().dataset_hash,
+            "image_size": list(self.config.params_image_size),
+            "batch_size": self.config.params_batch_size,
+            "augmentation": self.config.params_is_augmentation,
+            "data_loader": self.config.params_data_loader,
+            "training_mode": self.config.params_training_mode,
+            "feature_noise_stddev": self.config.params_feature_noise_stddev,
+        }
+        return hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+    def cached_features(self, backbone: tf.keras.Model) -> tuple:
+        """Returns the backbone features of both subsets, computing them once per image.
+
+        The features are cached under `root_dir/features` and reused for as long as
+        the base model file, the dataset and the input settings are unchanged.
+
+        Args:
+            backbone (tf.keras.Model): The frozen part of the model, from `split_backbone_head`.
+
+        Returns:
+            tuple: Training features, training labels, validation features and validation labels.
+        """
+        model_stat = os.stat(self.config.updated_base_model_path)
+        cache = FeatureCache(Path(self.config.root_dir) / "features")
+        key = FeatureCache.make_key(
+            model=str(self.config.updated_base_model_path),
+            model_mtime_ns=model_stat.st_mtime_ns,
+            model_size=model_stat.st_size,
+            training_data=str(self.config.training_data),
+            dataset_hash=self.dataset_manifest().dataset_hash,
+            data_loader=self.config.params_data_loader,
+            image_size=list(self.config.params_image_size),
+            samples=[self.train_samples, self.valid_samples]
+        )
+
+        flows = self._feature_flows()
+        with profile("feature_cache"):
+            train_features, train_labels = cache.load_or_compute(
+                key, "training", backbone, flows["training"], self.train_samples
+            )
+            valid_features, valid_labels = cache.load_or_compute(
+                key, "validation", backbone, flows["validation"], self.valid_samples
+            )
+        return train_features, train_labels, valid_features, valid_labels
+
+    def train_on_cached_features(self, callback_list: list = None, initial_epoch: int = 0) -> tf.keras.callbacks.History:
+        """Trains only the Flatten+Dense head on backbone features computed once per image.
+
+        The frozen backbone is run over every image a single time and its outputs are
+        cached under `root_dir/features`. The head shares its layers with `self.model`,
+        so after fitting, `self.model` is the full trained model with the same structure
+        as one trained end to end. When augmentation is enabled, Gaussian noise on the
+        features stands in for image augmentation.
+
+        Args:
+            callback_list (list, optional): Extra callbacks for fitting the head.
+            initial_epoch (int, optional): The epoch to start from when resuming. Defaults to 0.
+
+        Returns:
+            tf.keras.callbacks.History: The per-epoch training and validation metrics.
+        """
+        noise_stddev = self.config.params_feature_noise_stddev if self.config.params_is_augmentation else 0.0
+        backbone, head = split_backbone_head(self.model, noise_stddev=noise_stddev)
+        head.compile(
+            optimizer=self.model.optimizer,
+            loss=self.model.loss,
+            metrics=["accuracy"],
+            jit_compile=self.config.params_jit_compile,
+            steps_per_execution=self.config.params_steps_per_execution
+        )
+
+        train_features, train_labels, valid_features, valid_labels = self.cached_features(backbone)
+
+        with profile("fit"):
+            return head.fit(
+                train_features,
+                train_labels,
+                batch_size=self.config.params_batch_size,
+                epochs=self.config.params_epochs,
+                initial_epoch=initial_epoch,
+                shuffle=True,
+                validation_data=(valid_features, valid_labels),
+                callbacks=self._callbacks(callback_list)
+            )
+
+    def benchmark_input_pipeline(self, steps: int = 20) -> float:
+        """Measures the images/sec delivered by the training input pipeline.
+
+        Args:
+            steps (int, optional): The number of batches to time. Defaults to 20.
+
+        Returns:
+            float: Images per second.
+        """
+        return measure_throughput(self.train_generator, steps)
+
+    def benchmark_step_time(self, steps: int = None) -> dict:
+        """Compares training step time with and without XLA on the same batches.
+
+        A fixed set of batches is drawn from the training generator once. Each variant
+        trains a fresh copy of the model on them for one warm-up epoch, which includes
+        tracing and compilation, then for one timed epoch. Both variants run
+        STEPS_PER_EXECUTION batches per call, so the speedup is XLA's alone. The
+        report is saved to `root_dir/step_time_report.json`.
+
+        Args:
+            steps (int, optional): The number of batches per epoch. Defaults to STEP_TIME_BENCHMARK_STEPS.
+
+        Returns:
+            dict: The step-time report.
+        """
+        steps = steps or self.config.params_step_time_benchmark_steps
+        iterator = iter(self.train_generator)
+        batches = [next(iterator) for _ in range(steps)]
+        x = np.concatenate([np.asarray(batch[0]) for batch in batches])
+        y = np.concatenate([np.asarray(batch[1]) for batch in batches])
+
+        steps_per_execution = self.config.params_steps_per_execution
+        variants = {
+            "uncompiled": dict(jit_compile=False, steps_per_execution=steps_per_execution),
+            "xla": dict(jit_compile=True, steps_per_execution=steps_per_execution),
+        }
+        report = {"steps": steps, "batch_size": self.config.params_batch_size,
+                  "steps_per_execution": steps_per_execution}
+        for name, options in variants.items():
+            model = tf.keras.models.clone_model(self.model)
+            model.set_weights(self.model.get_weights())
+            optimizer = self.model.optimizer.__class__.from_config(self.model.optimizer.get_config())
+            model.compile(optimizer=optimizer, loss=self.model.loss, metrics=["accuracy"], **options)
+
+            fit_kwargs = dict(batch_size=self.config.params_batch_size, epochs=1, shuffle=False, verbose=0)
+            start = time.perf_counter()
+            model.fit(x, y, **fit_kwargs)
+            warmup = time.perf_counter() - start
+            start = time.perf_counter()
+            model.fit(x, y, **fit_kwargs)
+            elapsed = time.perf_counter() - start
+
+            report[name] = {
+                **options,
+                "first_epoch_seconds": warmup,
+                "mean_step_ms": 1000 * elapsed / steps,
+            }
+            logger.info(f"Step time ({name}): {report[name]['mean_step_ms']:.1f} ms/step, first epoch {warmup:.2f}s")
+
+        report["speedup"] = report["uncompiled"]["mean_step_ms"] / report["xla"]["mean_step_ms"]
+        save_json(path=Path(self.config.root_dir) / "step_time_report.json", data=report)
+        return report
+
     @staticmethod
     def save_model(path: Path, model: tf.keras.Model):
         """Save a TensorFlow Keras model to the specified path.
@@ -96,35 +489,94 @@ class Training:
             path (Path): The path where the model will be saved.
             model (tf.keras.Model): The TensorFlow Keras model to be saved.
         """
-        model.save(path)
+        # Write next to the target and rename so a watching server never sees a partial file
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.stem}.tmp{path.suffix}")
+        with profile("save_model"):
+            model.save(tmp_path)
+            os.replace(tmp_path, path)
 
-    def train(self):
-        """Train the model using the provided training generator and validation data.
+    def fit(self, callback_list: list = None) -> tf.keras.callbacks.History:
+        """Fits the model as selected by TRAINING_MODE, without saving it.
+
+        With CHECKPOINT_EVERY_EPOCHS set, the weights and optimizer state are
+        checkpointed to `checkpoint_dir` during fitting, and a run interrupted
+        before its model was saved resumes from its latest checkpoint. Early
+        stopping and best-weights restore follow the MONITOR metric.
 
         Args:
-            callback_list (list): A list of callbacks to be used during training.
+            callback_list (list, optional): Callbacks used during training in addition to the
+                throughput and per-epoch profiling callbacks.
+
+        Returns:
+            tf.keras.callbacks.History: The per-epoch training and validation metrics.
         """
-        # Calculate steps per epoch and validation steps based on generator samples and batch size
-        self.steps_per_epoch = self.train_generator.samples // self.train_generator.batch_size
-        self.validation_steps = self.valid_generator.samples // self.valid_generator.batch_size
+        initial_epoch = 0
+        if self.config.params_checkpoint_every_epochs > 0:
+            self.checkpoint = TrainingCheckpoint(
+                self._checkpoint_dir(),
+                self.model,
+                fingerprint=self._checkpoint_fingerprint(),
+                max_to_keep=self.config.params_checkpoints_to_keep
+            )
+            initial_epoch = self.checkpoint.restore()
+
+        if self.config.params_training_mode == "cached_features":
+            return self.train_on_cached_features(callback_list, initial_epoch=initial_epoch)
+        if self.config.params_training_mode != "full":
+            raise ValueError(f"Unknown TRAINING_MODE: {self.config.params_training_mode}")
+
+        # Calculate steps per epoch and validation steps based on the sample counts and batch size
+        self.steps_per_epoch = self.train_samples // self.config.params_batch_size
+        self.validation_steps = self.valid_samples // self.config.params_batch_size
 
         # Fit the model using the training generator and validation data
-        self.model.fit(
-            self.train_generator,
-            epochs=self.config.params_epochs,
-            steps_per_epoch=self.steps_per_epoch,
-            validation_steps=self.validation_steps,
-            validation_data=self.valid_generator
-        )
+        with profile("fit"):
+            return self.model.fit(
+                self.train_generator,
+                epochs=self.config.params_epochs,
+                initial_epoch=initial_epoch,
+                steps_per_epoch=self.steps_per_epoch,
+                validation_steps=self.validation_steps,
+                validation_data=self.valid_generator,
+                callbacks=self._callbacks(callback_list)
+            )
 
-        # Save the trained model
-        self.save_model(
-            path=self.config.trained_model_path,
-            model=self.model
-        )
+    def train(self, callback_list: list = None):
+        """Train the model using the provided training generator and validation data.
 
-        # Save the trained model to model folder in the root
-        self.save_model(
-            path=Path("model/model.h5"),
-            model=self.model
-        )
+        In a distributed run only the chief saves the model; the other workers
+        save to a scratch file next to their checkpoints and remove it.
+
+        Args:
+            callback_list (list, optional): Callbacks used during training in addition to the
+                throughput and per-epoch profiling callbacks.
+        """
+        self.fit(callback_list)
+
+        if not is_chief(self.strategy):
+            scratch_path = self._checkpoint_dir() / "model.h5"
+            self.save_model(path=scratch_path, model=self.model)
+            scratch_path.unlink()
+        elif self.model_store is not None:
+            # one write; the DVC output and the served model folder are links to it
+            self.model_store.save(
+                self.model, "model", links=[self.config.trained_model_path, Path("model/model.h5")]
+            )
+        else:
+            # Save the trained model
+            self.save_model(
+                path=self.config.trained_model_path,
+                model=self.model
+            )
+
+            # Save the trained model to model folder in the root
+            self.save_model(
+                path=Path("model/model.h5"),
+                model=self.model
+            )
+
+        # The run is complete, so there is nothing left to resume
+        if self.checkpoint is not None:
+            self.checkpoint.clear()
@@ -3,6 +3,9 @@ import urllib.request as request
 from zipfile import ZipFile
 import tensorflow as tf
 from kidneyDiseaseClassifier.entity.config_entity import PrepareBaseModelConfig
+from kidneyDiseaseClassifier.components.model_store import ModelStore
+from kidneyDiseaseClassifier.components.backbones import build_backbone
+from kidneyDiseaseClassifier.utils.profiling import profile
 from pathlib import Path
 
 
@@ -16,23 +19,28 @@ class PrepareBaseModel:
         config (PrepareBaseModelConfig): The configuration for preparing base models.
     """
 
-    def __init__(self, config: PrepareBaseModelConfig):
+    def __init__(self, config: PrepareBaseModelConfig, model_store: ModelStore = None):
         """Initializes the PrepareBaseModel.
 
         Args:
             config (PrepareBaseModelConfig): The configuration for preparing base models.
+            model_store (ModelStore, optional): Stores each model once and links it at the configured
+                paths. Without one, the models are saved to the paths directly.
         """
         self.config = config
+        self.model_store = model_store
 
     def get_base_model(self):
-        """Loads the base model and saves it to the specified path."""
-        self.model = tf.keras.applications.vgg16.VGG16(
-            input_shape=self.config.params_image_size,
-            weights=self.config.params_weights,
-            include_top=self.config.params_include_top
-        )
+        """Loads the BACKBONE model, with its input preprocessing, and saves it to the specified path."""
+        with profile("build_base_model"):
+            self.model = build_backbone(
+                self.config.params_backbone,
+                input_shape=self.config.params_image_size,
+                weights=self.config.params_weights,
+                include_top=self.config.params_include_top
+            )
 
-        self.save_model(path=self.config.base_model_path, model=self.model)
+        self._save(name="base_model", path=self.config.base_model_path, model=self.model)
 
     @staticmethod
     def _prepare_full_model(model, classes, freeze_all, freeze_till, learning_rate):
@@ -76,15 +84,22 @@ class PrepareBaseModel:
         return full_model
     
     def update_base_model(self):
-        self.full_model = self._prepare_full_model(
-            model=self.model,
-            classes=self.config.params_classes,
-            freeze_all=True,
-            freeze_till=None,
-            learning_rate=self.config.params_learning_rate
-        )
-
-        self.save_model(path=self.config.updated_base_model_path, model=self.full_model)
+        with profile("build_full_model"):
+            self.full_model = self._prepare_full_model(
+                model=self.model,
+                classes=self.config.params_classes,
+                freeze_all=True,
+                freeze_till=None,
+                learning_rate=self.config.params_learning_rate
+            )
+
+        self._save(name="base_model_updated", path=self.config.updated_base_model_path, model=self.full_model)
+
+    def _save(self, name: str, path: Path, model: tf.keras.Model):
+        if self.model_store is None:
+            self.save_model(path=path, model=model)
+        else:
+            self.model_store.save(model, name, links=[path])
 
     @staticmethod
     def save_model(path: Path, model: tf.keras.Model):
@@ -94,4 +109,9 @@ class PrepareBaseModel:
             path (Path): The path where the model will be saved.
             model (tf.keras.Model): The model to be saved.
         """
-        model.save(path)
+        # Write next to the target and rename, so a published (read-only) model is replaced rather than overwritten
+        path = Path(path)
+        tmp_path = path.with_name(f".{path.stem}.tmp{path.suffix}")
+        with profile("save_model"):
+            model.save(tmp_path)
+            os.replace(tmp_path, path)
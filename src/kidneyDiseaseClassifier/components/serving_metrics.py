@@ -0,0 +1,244 @@
+import os
+import bisect
+import resource
+import threading
+from kidneyDiseaseClassifier import logger
+
+
+# Prometheus' default latency buckets, in seconds
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+# Finer buckets for the decode, preprocess and inference steps of one request
+STEP_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(_Metric):
+    """A monotonically increasing count, one series per label combination."""
+    type_name = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, *labelvalues, amount: float = 1.0):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            values = dict(self._values)
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in sorted(values.items())
+        ]
+
+
+class Gauge(_Metric):
+    """A value that can go up and down, either set directly or read from a callback at scrape time."""
+    type_name = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        """Initializes the Gauge.
+
+        Args:
+            callback (callable, optional): Returns {label values tuple: value} when scraped.
+        """
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+        self._callback = callback
+
+    def set(self, value: float, *labelvalues):
+        with self._lock:
+            self._values[labelvalues] = float(value)
+
+    def inc(self, *labelvalues, amount: float = 1.0):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def dec(self, *labelvalues, amount: float = 1.0):
+        self.inc(*labelvalues, amount=-amount)
+
+    def render(self) -> list:
+        if self._callback is not None:
+            try:
+                values = self._callback()
+            except Exception as e:
+                logger.warning(f"Could not collect metric {self.name}: {e}")
+                values = {}
+        else:
+            with self._lock:
+                values = dict(self._values)
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in sorted(values.items())
+        ]
+
+
+class Histogram(_Metric):
+    """Bucketed observations with their count and sum, one series per label combination."""
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=REQUEST_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+
+    def observe(self, value: float, *labelvalues):
+        # Per-bucket counts here; they are made cumulative only when scraped
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> list:
+        with self._lock:
+            snapshot = {labels: (list(counts), total) for labels, (counts, total) in self._series.items()}
+        lines = self.header()
+        for labels, (counts, total) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """An in-process set of metrics rendered in the Prometheus text exposition format.
+
+    Recording is a dictionary update under a per-metric lock, cheap enough for
+    the request hot path; all formatting happens when /metrics is scraped.
+    """
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), callback=None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=REQUEST_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def process_rss_bytes() -> float:
+    """The current resident set size of this process, from /proc where available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # peak rather than current RSS; ru_maxrss is KB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class ServingMetrics:
+    """The metrics exposed by the serving app on /metrics.
+
+    Attributes:
+        registry (MetricsRegistry): The registry rendered on each scrape.
+    """
+
+    def __init__(self):
+        self.registry = MetricsRegistry()
+        self.requests = self.registry.counter(
+            "http_requests_total", "HTTP requests by route, method and status.", ("route", "method", "status")
+        )
+        self.request_duration = self.registry.histogram(
+            "http_request_duration_seconds", "HTTP request latency by route.", ("route",)
+        )
+        self.in_flight = self.registry.gauge(
+            "http_requests_in_flight", "HTTP requests currently being served."
+        )
+        self.predict_step_duration = self.registry.histogram(
+            "predict_step_duration_seconds", "Time spent in each step of a /predict request.", ("step",),
+            buckets=STEP_BUCKETS
+        )
+        self.registry.gauge(
+            "process_resident_memory_bytes", "Resident memory size in bytes.",
+            callback=lambda: {(): process_rss_bytes()}
+        )
+        self._model_holder = None
+        self._batch_scheduler = None
+        self.registry.gauge(
+            "model_info", "The model version being served (always 1).", ("version", "backend"),
+            callback=self._model_info
+        )
+        self.registry.gauge(
+            "model_load_seconds", "Time to load, trace and warm up the current model.", ("step",),
+            callback=self._model_load_seconds
+        )
+        self.registry.gauge(
+            "batch_queue_depth", "Requests waiting for the batch scheduler.",
+            callback=self._batch_queue_depth
+        )
+
+    def bind(self, model_holder, batch_scheduler=None):
+        """Attaches the model holder and batch scheduler read at scrape time."""
+        self._model_holder = model_holder
+        self._batch_scheduler = batch_scheduler
+
+    def _model_info(self) -> dict:
+        if self._model_holder is None or self._model_holder.version is None:
+            return {}
+        return {(self._model_holder.version, self._model_holder.config.backend): 1}
+
+    def _model_load_seconds(self) -> dict:
+        if self._model_holder is None:
+            return {}
+        return {(step,): seconds for step, seconds in self._model_holder.load_timings.items()}
+
+    def _batch_queue_depth(self) -> dict:
+        if self._batch_scheduler is None:
+            return {}
+        return {(): self._batch_scheduler.stats()["queue_depth"]}
+
+    def render(self) -> str:
+        return self.registry.render()
@@ -0,0 +1,213 @@
+import os
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import numpy as np
+import tensorflow as tf
+from kidneyDiseaseClassifier import logger
+from kidneyDiseaseClassifier.entity.config_entity import TensorCacheConfig
+from kidneyDiseaseClassifier.components.data_loader import augmentation_layers
+from kidneyDiseaseClassifier.components.dataset_manifest import load_manifest
+
+
+class TensorCache:
+    """Decoded, resized uint8 copies of the dataset images in a memory-mapped store.
+
+    Each store lives under `root_dir/<height>x<width>` and holds `images.npy`
+    (N x H x W x 3, uint8), `labels.npy` and `index.json`. The index records
+    every source file with its content hash, and a hash of the whole dataset,
+    both taken from the dataset manifest written at ingestion. Rows are ordered by class and then by file name, the order
+    `flow_from_directory` uses, so subsets can be derived from the index.
+    Updates only decode files that were added or changed.
+
+    Attributes:
+        config (TensorCacheConfig): The configuration for the tensor cache.
+    """
+
+    def __init__(self, config: TensorCacheConfig):
+        """Initializes the TensorCache.
+
+        Args:
+            config (TensorCacheConfig): The configuration for the tensor cache.
+        """
+        self.config = config
+        height, width = config.params_image_size[0], config.params_image_size[1]
+        self.store_dir = Path(config.root_dir) / f"{height}x{width}"
+        self.images_path = self.store_dir / "images.npy"
+        self.labels_path = self.store_dir / "labels.npy"
+        self.index_path = self.store_dir / "index.json"
+
+    def _read_index(self) -> dict:
+        if not self.index_path.exists():
+            return None
+        with open(self.index_path) as f:
+            return json.load(f)
+
+    def _decode(self, path: str) -> np.ndarray:
+        img = tf.keras.preprocessing.image.load_img(
+            path, target_size=self.config.params_image_size[:-1], interpolation="bilinear"
+        )
+        return np.asarray(img, dtype=np.uint8)
+
+    def update(self) -> bool:
+        """Brings the store in line with the source images.
+
+        Unchanged files (same path and content hash) are copied from the
+        previous store; new or changed files are decoded; removed files are
+        dropped.
+
+        Returns:
+            bool: True if the store was rewritten.
+        """
+        source = self.config.source_data
+        manifest = load_manifest(self.config.manifest_path, source)
+        class_indices = manifest.class_indices
+
+        old_index = self._read_index()
+        old_rows = {}
+        if old_index is not None and self.images_path.exists():
+            old_rows = {entry["path"]: (row, entry) for row, entry in enumerate(old_index["files"])}
+
+        columns = manifest.columns
+        entries = [
+            {"path": str(path), "label": int(label), "size": int(size), "sha1": str(sha1)}
+            for path, label, size, sha1 in zip(columns["path"], columns["label"], columns["size"], columns["sha1"])
+        ]
+        dataset_hash = manifest.dataset_hash
+
+        if old_index is not None and old_index.get("dataset_hash") == dataset_hash:
+            logger.info(f"Tensor cache {self.store_dir} is up to date ({len(entries)} images)")
+            return False
+
+        height, width, channels = self.config.params_image_size
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        tmp_images_path = self.store_dir / "images.tmp.npy"
+        images = np.lib.format.open_memmap(
+            tmp_images_path, mode="w+", dtype=np.uint8, shape=(len(entries), height, width, channels)
+        )
+        old_images = np.load(self.images_path, mmap_mode="r") if old_rows else None
+
+        to_decode = []
+        reused = 0
+        for row, entry in enumerate(entries):
+            previous = old_rows.get(entry["path"])
+            if previous and previous[1]["sha1"] == entry["sha1"]:
+                images[row] = old_images[previous[0]]
+                reused += 1
+            else:
+                to_decode.append(row)
+
+        # PIL releases the GIL while decoding, so threads keep all cores busy
+        with ThreadPoolExecutor() as executor:
+            decoded = executor.map(lambda row: self._decode(os.path.join(source, entries[row]["path"])), to_decode)
+            for row, array in zip(to_decode, decoded):
+                images[row] = array
+
+        images.flush()
+        del images, old_images
+
+        tmp_labels_path = self.store_dir / "labels.tmp.npy"
+        np.save(tmp_labels_path, np.asarray([e["label"] for e in entries], dtype=np.int32))
+        tmp_index_path = self.store_dir / "index.tmp.json"
+        with open(tmp_index_path, "w") as f:
+            json.dump({
+                "image_size": list(self.config.params_image_size),
+                "class_indices": class_indices,
+                "dataset_hash": dataset_hash,
+                "files": entries
+            }, f)
+
+        os.replace(tmp_images_path, self.images_path)
+        os.replace(tmp_labels_path, self.labels_path)
+        os.replace(tmp_index_path, self.index_path)
+
+        removed = len(set(old_rows) - {e["path"] for e in entries})
+        logger.info(
+            f"Tensor cache {self.store_dir} updated: {reused} reused, {len(to_decode)} decoded, {removed} removed"
+        )
+        return True
+
+    def sequence(self, subset: str, validation_split: float, batch_size: int,
+                 shuffle: bool, augment: bool = False, seed: int = None):
+        """Returns a Keras Sequence over one subset of the store.
+
+        Args:
+            subset (str): Either "training" or "validation".
+            validation_split (float): The fraction of each class held out for validation.
+            batch_size (int): The batch size.
+            shuffle (bool): Whether to reshuffle every epoch.
+            augment (bool, optional): Whether to apply random augmentation. Defaults to False.
+            seed (int, optional): The shuffle seed.
+
+        Returns:
+            CachedImageSequence: Batches of (images rescaled to [0, 1], one-hot labels).
+
+        Raises:
+            FileNotFoundError: If the store has not been built for this image size.
+        """
+        index = self._read_index()
+        if index is None:
+            raise FileNotFoundError(
+                f"No tensor cache at {self.store_dir}; run the tensor_cache stage first"
+            )
+
+        images = np.load(self.images_path, mmap_mode="r")
+        labels = np.load(self.labels_path, mmap_mode="r")
+
+        # Derive the flow_from_directory split: the first int(split * n) rows of each class
+        indices = []
+        for label in range(len(index["class_indices"])):
+            rows = np.flatnonzero(labels == label)
+            split_at = int(validation_split * len(rows))
+            indices.append(rows[:split_at] if subset == "validation" else rows[split_at:])
+        indices = np.concatenate(indices) if indices else np.empty(0, dtype=np.int64)
+
+        augmenter = augmentation_layers(self.config.params_image_size) if augment else None
+        logger.info(f"Found {len(indices)} images belonging to {len(index['class_indices'])} classes ({subset}, tensor cache)")
+        return CachedImageSequence(
+            images, labels, indices, len(index["class_indices"]), batch_size, shuffle, augmenter, seed
+        )
+
+
+class CachedImageSequence(tf.keras.utils.Sequence):
+    """Batches read from the memory-mapped tensor cache.
+
+    Contiguous batches are sliced straight out of the memory map without a copy
+    before rescaling; shuffled batches gather their rows in sorted order.
+    """
+
+    def __init__(self, images, labels, indices, num_classes, batch_size, shuffle, augmenter=None, seed=None):
+        self.images = images
+        self.labels = labels
+        self.indices = np.asarray(indices)
+        self.num_classes = num_classes
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.augmenter = augmenter
+        self.samples = len(self.indices)
+        self._rng = np.random.default_rng(seed)
+        self._order = self.indices.copy()
+        if shuffle:
+            self._rng.shuffle(self._order)
+
+    def __len__(self):
+        return math.ceil(self.samples / self.batch_size)
+
+    def __getitem__(self, i):
+        rows = self._order[i * self.batch_size:(i + 1) * self.batch_size]
+        if self.shuffle:
+            rows = np.sort(rows)
+        if len(rows) and rows[-1] - rows[0] + 1 == len(rows):
+            batch = self.images[rows[0]:rows[-1] + 1]
+        else:
+            batch = self.images[rows]
+        x = batch.astype(np.float32) / 255.0
+        if self.augmenter is not None:
+            x = self.augmenter(x, training=True).numpy()
+        y = np.eye(self.num_classes, dtype=np.float32)[self.labels[rows]]
+        return x, y
+
+    def on_epoch_end(self):
+        if self.shuffle:
+            self._rng.shuffle(self._order)
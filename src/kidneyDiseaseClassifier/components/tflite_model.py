@@ -0,0 +1,102 @@
+import json
+import threading
+from pathlib import Path
+import numpy as np
+import tensorflow as tf
+
+
+class TFLiteModel:
+    """A TFLite interpreter behind the `predict` interface of a Keras model.
+
+    The interpreter is not thread-safe, so calls are serialized; the input
+    tensor is resized whenever the batch size changes.
+
+    Attributes:
+        model_path (Path): The filepath of the .tflite model.
+    """
+
+    def __init__(self, model_path: Path, num_threads: int = None):
+        """Initializes the interpreter.
+
+        Args:
+            model_path (Path): The filepath of the .tflite model.
+            num_threads (int, optional): The number of interpreter threads. Defaults to TFLite's choice.
+        """
+        self.model_path = model_path
+        self.interpreter = tf.lite.Interpreter(model_path=str(model_path), num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._lock = threading.Lock()
+        self._refresh_details()
+
+    def _refresh_details(self):
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+
+    @property
+    def input_shape(self) -> tuple:
+        return (None,) + tuple(self._input["shape"][1:])
+
+    def predict(self, x, verbose=0) -> np.ndarray:
+        """Runs the model on a batch of images.
+
+        Args:
+            x (np.ndarray): Images shaped (n, height, width, channels).
+            verbose (int, optional): Accepted for Keras compatibility and ignored.
+
+        Returns:
+            np.ndarray: The model outputs, one row per image.
+        """
+        x = np.asarray(x, dtype=np.float32)
+        with self._lock:
+            if tuple(self._input["shape"]) != x.shape:
+                self.interpreter.resize_tensor_input(self._input["index"], x.shape)
+                self.interpreter.allocate_tensors()
+                self._refresh_details()
+
+            if self._input["dtype"] in (np.int8, np.uint8):
+                scale, zero_point = self._input["quantization"]
+                x = np.round(x / scale + zero_point).astype(self._input["dtype"])
+
+            self.interpreter.set_tensor(self._input["index"], x)
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self._output["index"]).copy()
+
+        if self._output["dtype"] in (np.int8, np.uint8):
+            scale, zero_point = self._output["quantization"]
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
+
+
+def load_checked_tflite_model(model_path: Path, variant: str, report_path: Path,
+                              max_accuracy_drop: float, num_threads: int = None) -> TFLiteModel:
+    """Loads a quantized model only if its measured accuracy drop is acceptable.
+
+    Args:
+        model_path (Path): The filepath of the .tflite model.
+        variant (str): The quantization variant in the report, "int8" or "float16".
+        report_path (Path): The accuracy report written by the quantization stage.
+        max_accuracy_drop (float): The largest accepted drop against the float model.
+        num_threads (int, optional): The number of interpreter threads.
+
+    Returns:
+        TFLiteModel: The loaded model.
+
+    Raises:
+        ValueError: If the report is missing the variant or its accuracy drop exceeds the threshold.
+    """
+    report = {}
+    if Path(report_path).exists():
+        with open(report_path) as f:
+            report = json.load(f)
+
+    if variant not in report:
+        raise ValueError(f"No {variant} accuracy in {report_path}; run the model quantization stage first")
+
+    accuracy_drop = report[variant]["accuracy_drop"]
+    if accuracy_drop > max_accuracy_drop:
+        raise ValueError(
+            f"Refusing {variant} model {model_path}: accuracy drop {accuracy_drop:.4f} "
+            f"exceeds the allowed {max_accuracy_drop:.4f}"
+        )
+
+    return TFLiteModel(model_path, num_threads=num_threads)
@@ -0,0 +1,171 @@
+import os
+import re
+import uuid
+import shlex
+import threading
+import subprocess
+from datetime import datetime, timezone
+from kidneyDiseaseClassifier import logger
+from kidneyDiseaseClassifier.entity.config_entity import TrainingJobsConfig
+
+
+STAGE_PATTERN = re.compile(r">>>>>> (.+?) started <<<<<<")
+EPOCH_PATTERN = re.compile(r"^Epoch (\d+)/(\d+)")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class TrainingJob:
+    """State of one background training run.
+
+    Attributes:
+        job_id (str): The identifier of the job.
+        log_path (Path): The file the job's output is written to.
+        status (str): One of queued, running, succeeded or failed.
+        stage (str): The pipeline stage currently running, as announced by the stage banners.
+        epoch (int): The current training epoch.
+        epochs (int): The total number of training epochs.
+    """
+
+    def __init__(self, job_id: str, log_path):
+        self.job_id = job_id
+        self.log_path = log_path
+        self.status = "queued"
+        self.stage = None
+        self.epoch = None
+        self.epochs = None
+        self.return_code = None
+        self.submitted_at = _now()
+        self.started_at = None
+        self.finished_at = None
+
+    def update_progress(self, line: str):
+        """Updates the stage and epoch from one line of pipeline output."""
+        stage = STAGE_PATTERN.search(line)
+        if stage:
+            self.stage = stage.group(1)
+            self.epoch = None
+            self.epochs = None
+            return
+        epoch = EPOCH_PATTERN.match(line)
+        if epoch:
+            self.epoch, self.epochs = int(epoch.group(1)), int(epoch.group(2))
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "stage": self.stage,
+            "epoch": self.epoch,
+            "epochs": self.epochs,
+            "return_code": self.return_code,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class TrainingJobManager:
+    """Runs the training pipeline as a background process, one job at a time.
+
+    The pipeline runs in a separate, lower-priority process so the serving
+    workers are never blocked by it. A single-flight lock guarantees that a
+    second submission while a job is running returns the running job instead
+    of starting another training.
+
+    Attributes:
+        config (TrainingJobsConfig): The configuration for training jobs.
+    """
+
+    def __init__(self, config: TrainingJobsConfig):
+        """Initializes the TrainingJobManager.
+
+        Args:
+            config (TrainingJobsConfig): The configuration for training jobs.
+        """
+        self.config = config
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._active = None
+
+    def submit(self):
+        """Starts a training job unless one is already running.
+
+        Returns:
+            tuple: The job and whether it was newly created.
+        """
+        with self._lock:
+            if self._active is not None and self._active.status in ("queued", "running"):
+                return self._active, False
+
+            job_id = uuid.uuid4().hex[:12]
+            os.makedirs(self.config.log_dir, exist_ok=True)
+            job = TrainingJob(job_id, os.path.join(self.config.log_dir, f"{job_id}.log"))
+            self.jobs[job_id] = job
+            self._active = job
+
+        threading.Thread(target=self._run, args=(job,), name=f"training-job-{job_id}", daemon=True).start()
+        logger.info(f"Submitted training job {job_id}: {self.config.command}")
+        return job, True
+
+    def get(self, job_id: str) -> TrainingJob:
+        """Returns the job with `job_id`, or None."""
+        return self.jobs.get(job_id)
+
+    def _run(self, job: TrainingJob):
+        command = shlex.split(self.config.command)
+        if self.config.niceness:
+            # nice(1) lowers the priority before the command starts; preexec_fn is unsafe in a threaded server
+            command = ["nice", "-n", str(self.config.niceness), *command]
+        env = dict(os.environ, PYTHONUNBUFFERED="1")
+        try:
+            with open(job.log_path, "w") as log_file:
+                process = subprocess.Popen(
+                    command,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    text=True,
+                    env=env
+                )
+                job.status = "running"
+                job.started_at = _now()
+                for line in process.stdout:
+                    log_file.write(line)
+                    log_file.flush()
+                    job.update_progress(line)
+                job.return_code = process.wait()
+            job.status = "succeeded" if job.return_code == 0 else "failed"
+        except Exception as e:
+            logger.exception(f"Training job {job.job_id} failed to run: {e}")
+            job.status = "failed"
+        finally:
+            job.finished_at = _now()
+            logger.info(f"Training job {job.job_id} {job.status}")
+
+    @staticmethod
+    def tail(path, lines: int = 100) -> str:
+        """Returns the last `lines` lines of a job log without reading the whole file.
+
+        Args:
+            path (Path): The log file.
+            lines (int, optional): The number of lines to return. Defaults to 100.
+
+        Returns:
+            str: The tail of the log.
+        """
+        if not os.path.exists(path):
+            return ""
+
+        block_size = 8192
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            data = b""
+            while position > 0 and data.count(b"\n") <= lines:
+                read_size = min(block_size, position)
+                position -= read_size
+                f.seek(position)
+                data = f.read(read_size) + data
+        return b"\n".join(data.splitlines()[-lines:]).decode(errors="replace")
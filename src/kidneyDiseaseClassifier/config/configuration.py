@@ -1,6 +1,6 @@
 from kidneyDiseaseClassifier.constants import *
 from kidneyDiseaseClassifier.utils.common import read_yaml, create_directories, save_json
-from kidneyDiseaseClassifier.entity.config_entity import DataIngestionConfig, EvaluationConfig, PrepareBaseModelConfig, TrainingConfig
+from kidneyDiseaseClassifier.entity.config_entity import DataIngestionConfig, EvaluationConfig, PrepareBaseModelConfig, TensorCacheConfig, TrainingConfig, QuantizationConfig, PredictionConfig, TrainingJobsConfig, ProfilingConfig, SweepConfig, MlflowConfig, ModelStoreConfig, DistributedConfig
 import os
 
 
@@ -43,7 +43,14 @@ class ConfigurationManager:
             root_dir=config.root_dir,
             source_URL=config.source_URL,
             local_data_file=config.local_data_file,
-            unzip_dir=config.unzip_dir
+            unzip_dir=config.unzip_dir,
+            mirror_URL=config.mirror_URL,
+            expected_size=config.expected_size,
+            expected_sha256=config.expected_sha256,
+            download_record=Path(config.download_record),
+            extract_workers=config.extract_workers,
+            extract_manifest=Path(config.extract_manifest),
+            manifest_path=Path(config.manifest_path)
         )
         return data_ingestion_config
 
@@ -62,11 +69,30 @@ class ConfigurationManager:
             params_image_size=self.params.IMAGE_SIZE,
             params_learning_rate=self.params.LEARNING_RATE,
             params_include_top=self.params.INCLUDE_TOP,
+            params_backbone=self.params.BACKBONE,
             params_weights=self.params.WEIGHTS,
             params_classes=self.params.CLASSES
         )
         return prepare_base_model_config
     
+    def get_tensor_cache_config(self) -> TensorCacheConfig:
+        """Retrieves the configuration for the preprocessed image tensor cache.
+
+        Returns:
+            TensorCacheConfig: The configuration for the tensor cache stage.
+        """
+        config = self.config.tensor_cache
+        create_directories([config.root_dir])
+
+        tensor_cache_config = TensorCacheConfig(
+            root_dir=Path(config.root_dir),
+            source_data=Path(os.path.join(self.config.data_ingestion.unzip_dir, "kidney-ct-scan-image")),
+            manifest_path=Path(self.config.data_ingestion.manifest_path),
+            params_image_size=self.params.IMAGE_SIZE
+        )
+
+        return tensor_cache_config
+
     def get_training_config(self) -> TrainingConfig:
         """
         Retrieves the training configuration parameters and constructs a TrainingConfig object.
@@ -94,23 +120,220 @@ class ConfigurationManager:
             trained_model_path=Path(training.trained_model_path),
             updated_base_model_path=Path(prepare_base_model.updated_base_model_path),
             training_data=Path(training_data),
+            manifest_path=Path(self.config.data_ingestion.manifest_path),
             params_epochs=params.EPOCHS,
             params_batch_size=params.BATCH_SIZE,
             params_image_size=params.IMAGE_SIZE,
             params_is_augmentation=params.AUGMENTATION,
+            params_data_loader=params.DATA_LOADER,
+            tensor_cache_dir=Path(self.config.tensor_cache.root_dir),
+            params_training_mode=params.TRAINING_MODE,
+            params_feature_noise_stddev=params.FEATURE_NOISE_STDDEV,
+            params_jit_compile=params.JIT_COMPILE,
+            params_steps_per_execution=params.STEPS_PER_EXECUTION,
+            params_step_time_benchmark_steps=params.STEP_TIME_BENCHMARK_STEPS,
+            checkpoint_dir=Path(training.checkpoint_dir),
+            params_checkpoint_every_epochs=params.CHECKPOINT_EVERY_EPOCHS,
+            params_checkpoints_to_keep=params.CHECKPOINTS_TO_KEEP,
+            params_monitor=params.MONITOR,
+            params_early_stopping_patience=params.EARLY_STOPPING_PATIENCE,
+            params_early_stopping_min_delta=params.EARLY_STOPPING_MIN_DELTA,
+            params_restore_best_weights=params.RESTORE_BEST_WEIGHTS,
         )
 
         return training_config
     
     def get_evaluation_config(self) -> EvaluationConfig:
-        
+        create_directories([self.config.evaluation.root_dir])
+
         evaluation_config = EvaluationConfig(
             path_of_model="artifacts/training/model.h5",
             training_data="artifacts/data_ingestion/kidney-ct-scan-image",
-            mlflow_uri="https://dagshub.com/kalema3502/Kidney-Disease-Classification-MLflow-DVC.mlflow",
+            manifest_path=Path(self.config.data_ingestion.manifest_path),
             all_params=self.params,
             params_image_size=self.params.IMAGE_SIZE,
-            params_batch_size=self.params.BATCH_SIZE
+            params_batch_size=self.params.BATCH_SIZE,
+            params_data_loader=self.params.DATA_LOADER,
+            tensor_cache_dir=Path(self.config.tensor_cache.root_dir),
+            quantization_report_path=Path(self.config.model_quantization.report_path),
+            cache_path=Path(self.config.evaluation.cache_path)
         )
 
         return evaluation_config
+
+    def get_quantization_config(self) -> QuantizationConfig:
+        """Retrieves the configuration for converting the trained model to TFLite.
+
+        Returns:
+            QuantizationConfig: The configuration for the model quantization stage.
+        """
+        config = self.config.model_quantization
+        create_directories([config.root_dir])
+
+        quantization_config = QuantizationConfig(
+            root_dir=Path(config.root_dir),
+            path_of_model=Path(self.config.training.trained_model_path),
+            int8_model_path=Path(config.int8_model_path),
+            float16_model_path=Path(config.float16_model_path),
+            report_path=Path(config.report_path),
+            params_calibration_samples=self.params.QUANTIZATION_CALIBRATION_SAMPLES
+        )
+
+        return quantization_config
+
+    def get_model_store_config(self) -> ModelStoreConfig:
+        """Retrieves the configuration for the content-addressed model store.
+
+        Returns:
+            ModelStoreConfig: The store location and retention policy.
+        """
+        config = self.config.model_store
+        create_directories([config.root_dir])
+
+        model_store_config = ModelStoreConfig(
+            root_dir=Path(config.root_dir),
+            keep_versions=int(config.keep_versions)
+        )
+
+        return model_store_config
+
+    def get_prediction_config(self) -> PredictionConfig:
+        """Retrieves the configuration for serving predictions.
+
+        The served model file follows the backend: the Keras model for "keras",
+        otherwise the matching TFLite model from the quantization stage.
+
+        Returns:
+            PredictionConfig: The configuration for the prediction pipeline.
+
+        Raises:
+            ValueError: If the backend is unknown.
+        """
+        config = self.config.prediction
+        quantization = self.config.model_quantization
+        model_paths = {
+            "keras": config.model_path,
+            "tflite_int8": quantization.int8_model_path,
+            "tflite_float16": quantization.float16_model_path,
+        }
+        if config.backend not in model_paths:
+            raise ValueError(f"Unknown prediction backend: {config.backend}")
+
+        prediction_config = PredictionConfig(
+            backend=config.backend,
+            tflite_threads=int(config.tflite_threads),
+            quantization_report_path=Path(quantization.report_path),
+            max_accuracy_drop=float(self.params.MAX_QUANTIZED_ACCURACY_DROP),
+            model_path=Path(model_paths[config.backend]),
+            model_store_dir=Path(self.config.model_store.root_dir),
+            # refs point at Keras models; the TFLite backends serve the quantization stage's files
+            model_ref=config.model_ref if config.backend == "keras" else None,
+            poll_interval=float(config.poll_interval),
+            cache_size=int(config.cache_size),
+            max_batch_size=int(config.max_batch_size),
+            max_wait_ms=float(config.max_wait_ms),
+            pretrace=bool(config.pretrace),
+            warmup_batch_sizes=list(config.warmup_batch_sizes)
+        )
+
+        return prediction_config
+
+    def get_training_jobs_config(self) -> TrainingJobsConfig:
+        """Retrieves the configuration for background training jobs.
+
+        Returns:
+            TrainingJobsConfig: The configuration for training jobs started from the serving app.
+        """
+        config = self.config.training_jobs
+        create_directories([config.log_dir])
+
+        training_jobs_config = TrainingJobsConfig(
+            command=config.command,
+            log_dir=Path(config.log_dir),
+            niceness=int(config.niceness)
+        )
+
+        return training_jobs_config
+
+    def get_profiling_config(self) -> ProfilingConfig:
+        """Retrieves the configuration for per-stage profiling.
+
+        Returns:
+            ProfilingConfig: The configuration for timelines and the training trace.
+        """
+        config = self.config.profiling
+        create_directories([config.root_dir])
+
+        profiling_config = ProfilingConfig(
+            root_dir=Path(config.root_dir),
+            trace_training=bool(config.trace_training),
+            trace_batches=list(config.trace_batches),
+            trace_dir=Path(config.root_dir) / "tf_trace"
+        )
+
+        return profiling_config
+
+    def get_sweep_config(self) -> SweepConfig:
+        """Retrieves the configuration for hyperparameter sweeps.
+
+        Unset worker and thread counts are derived from the number of CPUs so
+        the trials running at once never oversubscribe the machine.
+
+        Returns:
+            SweepConfig: The configuration for the sweep executor.
+        """
+        config = self.config.sweep
+        create_directories([config.root_dir])
+
+        cpus = os.cpu_count() or 1
+        workers = int(config.workers) if config.workers else max(1, cpus // 4)
+        threads_per_trial = int(config.threads_per_trial) if config.threads_per_trial else max(1, cpus // workers)
+
+        sweep_config = SweepConfig(
+            root_dir=Path(config.root_dir),
+            spec_path=Path(config.spec_path),
+            tracking_dir=Path(config.tracking_dir),
+            workers=workers,
+            threads_per_trial=threads_per_trial
+        )
+
+        return sweep_config
+
+    def get_mlflow_config(self) -> MlflowConfig:
+        """Retrieves the configuration for experiment tracking.
+
+        Returns:
+            MlflowConfig: The tracking server, local fallback store and batching settings.
+        """
+        config = self.config.mlflow
+
+        mlflow_config = MlflowConfig(
+            tracking_uri=config.tracking_uri,
+            fallback_dir=Path(config.fallback_dir),
+            experiment_name=config.experiment_name,
+            registered_model_name=config.registered_model_name or f"{self.params.BACKBONE}Model",
+            run_path=Path(config.run_path),
+            flush_interval=float(config.flush_interval),
+            connect_timeout=float(config.connect_timeout)
+        )
+
+        return mlflow_config
+
+    def get_distributed_config(self) -> DistributedConfig:
+        """Retrieves the configuration for multi-worker data-parallel training.
+
+        Returns:
+            DistributedConfig: The cluster, this node's task and the collective settings.
+        """
+        config = self.config.distributed
+        threads_per_worker = int(config.threads_per_worker) if config.threads_per_worker else None
+
+        distributed_config = DistributedConfig(
+            enabled=bool(config.enabled),
+            workers=list(config.workers or []),
+            task_index=int(config.task_index),
+            communication=config.communication,
+            threads_per_worker=threads_per_worker
+        )
+
+        return distributed_config
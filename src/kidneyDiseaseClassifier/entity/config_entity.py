@@ -11,11 +11,25 @@ class DataIngestionConfig:
         source_URL (str): The URL from which data will be fetched.
         local_data_file (Path): The local file path where the downloaded data will be stored.
         unzip_dir (Path): The directory where the downloaded data will be extracted or unzipped.
+        mirror_URL (str): An HTTP URL used instead of source_URL when set, downloaded with range requests.
+        expected_size (int): The expected size of the downloaded file in bytes, if pinned.
+        expected_sha256 (str): The expected SHA-256 of the downloaded file, if pinned.
+        download_record (Path): The file recording the size and hash of the last verified download.
+        extract_workers (int): The number of extraction processes, one per CPU if None.
+        extract_manifest (Path): The file recording the CRC and size of every extracted member.
+        manifest_path (Path): The dataset manifest indexing every extracted image.
     """
     root_dir: Path
     source_URL: str
     local_data_file: Path
     unzip_dir: Path
+    mirror_URL: str
+    expected_size: int
+    expected_sha256: str
+    download_record: Path
+    extract_workers: int
+    extract_manifest: Path
+    manifest_path: Path
 
 
 @dataclass(frozen=True)
@@ -29,7 +43,8 @@ class PrepareBaseModelConfig:
         params_image_size (list): A list representing the image size parameters.
         params_learning_rate (float): The learning rate parameter.
         params_include_top (bool): Whether to include the top layer in the model.
-        params_weights (str): The weights to be used in the model.
+        params_backbone (str): The pretrained model the classifier is built on, e.g. "MobileNetV2".
+        params_weights (str): "imagenet", None, or the path of a local weights file.
         params_classes (int): The number of classes in the model.
     """
     root_dir: Path
@@ -38,11 +53,29 @@ class PrepareBaseModelConfig:
     params_image_size: list
     params_learning_rate: float
     params_include_top: bool
+    params_backbone: str
     params_weights: str
     params_classes: int
 
 
 
+@dataclass(frozen=True)
+class TensorCacheConfig:
+    """
+    Configuration class for the preprocessed image tensor cache.
+
+    Attributes:
+        root_dir (Path): The directory holding one store per image size.
+        source_data (Path): The dataset directory with one sub-directory per class.
+        manifest_path (Path): The dataset manifest written by the data ingestion stage.
+        params_image_size (list): The dimensions images are resized to.
+    """
+    root_dir: Path
+    source_data: Path
+    manifest_path: Path
+    params_image_size: list
+
+
 @dataclass(frozen=True)
 class TrainingConfig:
     """
@@ -53,26 +86,222 @@ class TrainingConfig:
         trained_model_path (Path): The filepath where the trained model will be saved.
         updated_base_model_path (Path): The filepath of the updated base model (if applicable).
         training_data (Path): The directory or filepath where training data is located.
+        manifest_path (Path): The dataset manifest listing the training data.
         params_epochs (int): The number of epochs for training.
         params_batch_size (int): The batch size for training.
         params_is_augmentation (bool): Whether data augmentation is applied during training.
         params_image_size (list): The dimensions of input images for training.
+        params_data_loader (str): The input pipeline, one of "generator", "tf_data" or "tensor_cache".
+        tensor_cache_dir (Path): The root directory of the preprocessed image tensor cache.
+        params_training_mode (str): Either "full" or "cached_features" (train the head on cached backbone features).
+        params_feature_noise_stddev (float): Gaussian noise on cached features when augmentation is enabled.
+        params_jit_compile (bool): Whether the train and test steps are XLA-compiled.
+        params_steps_per_execution (int): The number of batches run per compiled function call.
+        params_step_time_benchmark_steps (int): Batches timed per variant in the step-time report, 0 to skip it.
+        checkpoint_dir (Path): The directory holding the checkpoints of an unfinished run.
+        params_checkpoint_every_epochs (int): Epochs between checkpoints, 0 to disable checkpointing.
+        params_checkpoints_to_keep (int): The number of most recent checkpoints kept.
+        params_monitor (str): The validation metric watched by early stopping and best-weights restore.
+        params_early_stopping_patience (int): Epochs without improvement before training stops, 0 to disable.
+        params_early_stopping_min_delta (float): The smallest change of the monitored metric counted as improvement.
+        params_restore_best_weights (bool): Whether the weights of the best epoch are kept instead of the last.
     """
     root_dir: Path
     trained_model_path: Path
     updated_base_model_path: Path
     training_data: Path
+    manifest_path: Path
     params_epochs: int
     params_batch_size: int
     params_is_augmentation: bool
     params_image_size: list
+    params_data_loader: str
+    tensor_cache_dir: Path
+    params_training_mode: str
+    params_feature_noise_stddev: float
+    params_jit_compile: bool
+    params_steps_per_execution: int
+    params_step_time_benchmark_steps: int
+    checkpoint_dir: Path
+    params_checkpoint_every_epochs: int
+    params_checkpoints_to_keep: int
+    params_monitor: str
+    params_early_stopping_patience: int
+    params_early_stopping_min_delta: float
+    params_restore_best_weights: bool
 
 
 @dataclass(frozen=True)
 class EvaluationConfig:
     path_of_model: Path
     training_data:Path
+    manifest_path: Path
     all_params: dict
-    mlflow_uri: str
     params_image_size: list
-    params_batch_size: int
\ No newline at end of file
+    params_batch_size: int
+    params_data_loader: str
+    tensor_cache_dir: Path
+    quantization_report_path: Path
+    cache_path: Path
+
+@dataclass(frozen=True)
+class QuantizationConfig:
+    """
+    Configuration class for converting the trained model to TFLite.
+
+    Attributes:
+        root_dir (Path): The directory where quantized models are stored.
+        path_of_model (Path): The filepath of the trained float model.
+        int8_model_path (Path): The filepath of the int8 TFLite model.
+        float16_model_path (Path): The filepath of the float16 TFLite model.
+        report_path (Path): The filepath of the accuracy report.
+        params_calibration_samples (int): The number of validation images used for int8 calibration.
+    """
+    root_dir: Path
+    path_of_model: Path
+    int8_model_path: Path
+    float16_model_path: Path
+    report_path: Path
+    params_calibration_samples: int
+
+
+@dataclass(frozen=True)
+class ModelStoreConfig:
+    """
+    Configuration class for the content-addressed model store.
+
+    Attributes:
+        root_dir (Path): The directory holding the stored models and the refs pointing at them.
+        keep_versions (int): The number of versions kept per ref, including the current one.
+    """
+    root_dir: Path
+    keep_versions: int
+
+
+@dataclass(frozen=True)
+class PredictionConfig:
+    """
+    Configuration class for serving predictions.
+
+    Attributes:
+        backend (str): The inference backend, one of "keras", "tflite_int8" or "tflite_float16".
+        tflite_threads (int): The number of threads the TFLite interpreter uses.
+        quantization_report_path (Path): The accuracy report written by the quantization stage.
+        max_accuracy_drop (float): The largest accuracy drop of a quantized model that is accepted.
+        model_path (Path): The filepath of the model served by the prediction pipeline.
+        model_store_dir (Path): The root directory of the model store.
+        model_ref (str): The model store ref served with the keras backend, None to serve model_path.
+        poll_interval (float): Seconds between checks of the model file for a newly trained model.
+        cache_size (int): The number of previously loaded model versions kept in memory.
+        max_batch_size (int): The largest number of images run in one forward pass.
+        max_wait_ms (float): How long the first request in a batch waits for others to join it.
+        pretrace (bool): Whether a Keras model's inference function is traced for the fixed input shape on load.
+        warmup_batch_sizes (list): Sizes of the synthetic batches run through each model before it is served.
+    """
+    backend: str
+    tflite_threads: int
+    quantization_report_path: Path
+    max_accuracy_drop: float
+    model_path: Path
+    model_store_dir: Path
+    model_ref: str
+    poll_interval: float
+    cache_size: int
+    max_batch_size: int
+    max_wait_ms: float
+    pretrace: bool
+    warmup_batch_sizes: list
+
+
+@dataclass(frozen=True)
+class TrainingJobsConfig:
+    """
+    Configuration class for background training jobs started from the serving app.
+
+    Attributes:
+        command (str): The shell command that runs the training pipeline.
+        log_dir (Path): The directory where each job's output is written.
+        niceness (int): The niceness added to the job process so serving keeps priority.
+    """
+    command: str
+    log_dir: Path
+    niceness: int
+
+
+@dataclass(frozen=True)
+class ProfilingConfig:
+    """
+    Configuration class for per-stage profiling.
+
+    Attributes:
+        root_dir (Path): The directory where each run's timeline file is written.
+        trace_training (bool): Whether a TensorFlow profiler trace of training is captured.
+        trace_batches (list): The first and last training batch of the trace.
+        trace_dir (Path): The directory the TensorFlow profiler trace is written to.
+    """
+    root_dir: Path
+    trace_training: bool
+    trace_batches: list
+    trace_dir: Path
+
+
+@dataclass(frozen=True)
+class SweepConfig:
+    """
+    Configuration class for hyperparameter sweeps.
+
+    Attributes:
+        root_dir (Path): The directory holding one sub-directory per sweep.
+        spec_path (Path): The YAML file with the search space, metric and pruning settings.
+        tracking_dir (Path): The local MLflow file store the trials are recorded in.
+        workers (int): The number of trials run at once.
+        threads_per_trial (int): The CPU threads each trial's TensorFlow runtime may use.
+    """
+    root_dir: Path
+    spec_path: Path
+    tracking_dir: Path
+    workers: int
+    threads_per_trial: int
+
+
+@dataclass(frozen=True)
+class MlflowConfig:
+    """
+    Configuration class for experiment tracking.
+
+    Attributes:
+        tracking_uri (str): The MLflow tracking server.
+        fallback_dir (Path): The local file store used when the tracking server is unreachable.
+        experiment_name (str): The experiment runs are created in.
+        registered_model_name (str): The registry name the evaluated model is published under.
+        run_path (Path): The file recording the training run, continued by evaluation.
+        flush_interval (float): Seconds between batched sends to the tracking server.
+        connect_timeout (float): Seconds to wait for the tracking server before falling back.
+    """
+    tracking_uri: str
+    fallback_dir: Path
+    experiment_name: str
+    registered_model_name: str
+    run_path: Path
+    flush_interval: float
+    connect_timeout: float
+
+
+@dataclass(frozen=True)
+class DistributedConfig:
+    """
+    Configuration class for multi-worker data-parallel training.
+
+    Attributes:
+        enabled (bool): Whether to train on the configured workers.
+        workers (list): host:port of every worker; the first one is the chief.
+        task_index (int): This node's position in `workers`.
+        communication (str): The collective implementation, "ring", "auto" or "nccl".
+        threads_per_worker (int): CPU threads of each worker process started by the local launcher;
+            None splits the CPUs evenly between them.
+    """
+    enabled: bool
+    workers: list
+    task_index: int
+    communication: str
+    threads_per_worker: int
@@ -0,0 +1,605 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import subprocess
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+import yaml
+from PIL import Image, ImageDraw
+from kidneyDiseaseClassifier import logger
+from kidneyDiseaseClassifier.constants import CONFIG_FILE_PATH, PARAMS_FILE_PATH
+
+
+STAGE_NAME = "Benchmark"
+CLASS_NAMES = ["Normal", "Tumor"]
+DEFAULT_BASELINE = Path("benchmarks/baseline.json")
+
+# Whether a larger value of each metric is better; metrics not listed are reported but not compared
+HIGHER_IS_BETTER = {
+    "mean_ms": False,
+    "p50_ms": False,
+    "p95_ms": False,
+    "images_per_sec": True,
+    "mean_step_ms": False,
+    "cold_seconds": False,
+    "cached_seconds": False,
+    "peak_rss_mb": False,
+}
+
+
+def make_synthetic_dataset(directory: Path, images_per_class: int, seed: int = 0):
+    """Writes CT-slice-like JPEGs, one sub-directory per class, with the original dataset's layout.
+
+    Each image is a noisy grey body outline with two kidney-shaped ellipses;
+    "Tumor" images carry an extra bright blob. Sizes vary around 512x512 so
+    every loader has to resize, as it does with the real scans.
+    """
+    rng = np.random.default_rng(seed)
+    for label, class_name in enumerate(CLASS_NAMES):
+        class_dir = Path(directory) / class_name
+        class_dir.mkdir(parents=True, exist_ok=True)
+        for i in range(images_per_class):
+            size = int(rng.integers(480, 544))
+            img = Image.new("L", (size, size), 0)
+            draw = ImageDraw.Draw(img)
+            margin = size // 10
+            draw.ellipse([margin, margin * 2, size - margin, size - margin * 2], fill=90)
+            for cx in (size * 0.35, size * 0.65):
+                draw.ellipse([cx - size * 0.08, size * 0.45, cx + size * 0.08, size * 0.65], fill=150)
+            if label == 1:
+                x, y = rng.uniform(0.3, 0.7) * size, rng.uniform(0.45, 0.6) * size
+                draw.ellipse([x - size * 0.03, y - size * 0.03, x + size * 0.03, y + size * 0.03], fill=230)
+            pixels = np.asarray(img, dtype=np.float32) + rng.normal(0, 12, (size, size))
+            Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).convert("RGB").save(
+                class_dir / f"{class_name.lower()}_{i:05d}.jpg", quality=90
+            )
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB (ru_maxrss is KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def latency_summary(seconds: list) -> dict:
+    milliseconds = np.asarray(seconds) * 1000
+    return {
+        "calls": len(milliseconds),
+        "mean_ms": float(np.mean(milliseconds)),
+        "p50_ms": float(np.percentile(milliseconds, 50)),
+        "p95_ms": float(np.percentile(milliseconds, 95)),
+    }
+
+
+def _sample_image() -> bytes:
+    source = Path("artifacts/data_ingestion/kidney-ct-scan-image") / CLASS_NAMES[1]
+    with open(sorted(source.iterdir())[0], "rb") as f:
+        return f.read()
+
+
+def bench_predict_single(settings: dict) -> dict:
+    """Latency of one image through PredictionPipeline, decode and preprocess included."""
+    from kidneyDiseaseClassifier.config.configuration import ConfigurationManager
+    from kidneyDiseaseClassifier.components.model_holder import ModelHolder
+    from kidneyDiseaseClassifier.pipeline.stage_05_prediction import PredictionPipeline
+
+    holder = ModelHolder(config=ConfigurationManager().get_prediction_config())
+    pipeline = PredictionPipeline(model_holder=holder)
+    image_bytes = _sample_image()
+
+    for _ in range(settings["warmup"]):
+        pipeline.predict_image(image_bytes)
+    timings = []
+    for _ in range(settings["repeats"]):
+        start = time.perf_counter()
+        pipeline.predict_image(image_bytes)
+        timings.append(time.perf_counter() - start)
+    return latency_summary(timings)
+
+
+def bench_predict_batched(settings: dict) -> dict:
+    """Per-request latency and throughput with concurrent clients sharing the BatchScheduler."""
+    from kidneyDiseaseClassifier.config.configuration import ConfigurationManager
+    from kidneyDiseaseClassifier.components.model_holder import ModelHolder
+    from kidneyDiseaseClassifier.components.batch_scheduler import BatchScheduler
+    from kidneyDiseaseClassifier.pipeline.stage_05_prediction import PredictionPipeline
+
+    config = ConfigurationManager().get_prediction_config()
+    holder = ModelHolder(config=config)
+    scheduler = BatchScheduler(holder, max_batch_size=config.max_batch_size, max_wait_ms=config.max_wait_ms)
+    scheduler.start()
+    pipeline = PredictionPipeline(model_holder=holder, batch_scheduler=scheduler)
+    image_bytes = _sample_image()
+
+    for _ in range(settings["warmup"]):
+        pipeline.predict_image(image_bytes)
+
+    timings = []
+    timings_lock = threading.Lock()
+
+    def client():
+        local = []
+        for _ in range(settings["repeats"]):
+            start = time.perf_counter()
+            pipeline.predict_image(image_bytes)
+            local.append(time.perf_counter() - start)
+        with timings_lock:
+            timings.extend(local)
+
+    clients = [threading.Thread(target=client) for _ in range(settings["concurrency"])]
+    start = time.perf_counter()
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stats = scheduler.stats()
+    scheduler.stop()
+
+    result = latency_summary(timings)
+    result.update({
+        "concurrency": settings["concurrency"],
+        "images_per_sec": len(timings) / elapsed,
+        "mean_batch_size": stats["mean_batch_size"],
+    })
+    return result
+
+
+def bench_input_pipeline(settings: dict) -> dict:
+    """Images/sec delivered by the training input pipeline selected by DATA_LOADER."""
+    from kidneyDiseaseClassifier.config.configuration import ConfigurationManager
+    from kidneyDiseaseClassifier.components.model_training import Training
+
+    training = Training(config=ConfigurationManager().get_training_config())
+    start = time.perf_counter()
+    training.train_valid_generator()
+    build_seconds = time.perf_counter() - start
+    steps = max(1, min(settings["steps"], training.train_samples // training.config.params_batch_size - 1))
+    return {
+        "data_loader": training.config.params_data_loader,
+        "build_seconds": build_seconds,
+        "steps": steps,
+        "images_per_sec": training.benchmark_input_pipeline(steps),
+    }
+
+
+def bench_train_step(settings: dict) -> dict:
+    """Mean training step time on fixed batches, after a warm-up epoch that pays for tracing."""
+    from kidneyDiseaseClassifier.config.configuration import ConfigurationManager
+    from kidneyDiseaseClassifier.components.model_training import Training
+
+    training = Training(config=ConfigurationManager().get_training_config())
+    training.get_base_model()
+    training.train_valid_generator()
+    steps = max(1, min(settings["steps"], training.train_samples // training.config.params_batch_size))
+
+    iterator = iter(training.train_generator)
+    batches = [next(iterator) for _ in range(steps)]
+    x = np.concatenate([np.asarray(batch[0]) for batch in batches])
+    y = np.concatenate([np.asarray(batch[1]) for batch in batches])
+    fit_kwargs = dict(batch_size=training.config.params_batch_size, epochs=1, shuffle=False, verbose=0)
+
+    start = time.perf_counter()
+    training.model.fit(x, y, **fit_kwargs)
+    first_epoch_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    training.model.fit(x, y, **fit_kwargs)
+    elapsed = time.perf_counter() - start
+    return {
+        "steps": steps,
+        "batch_size": training.config.params_batch_size,
+        "first_epoch_seconds": first_epoch_seconds,
+        "mean_step_ms": 1000 * elapsed / steps,
+    }
+
+
+def bench_evaluation(settings: dict) -> dict:
+    """Wall time of Evaluation.evaluation with an empty score cache and again with the cache warm."""
+    from kidneyDiseaseClassifier.config.configuration import ConfigurationManager
+    from kidneyDiseaseClassifier.components.model_evaluation_mlflow import Evaluation
+
+    config = ConfigurationManager().get_evaluation_config()
+    if config.cache_path.exists():
+        config.cache_path.unlink()
+
+    start = time.perf_counter()
+    Evaluation(config).evaluation()
+    cold_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    Evaluation(config).evaluation()
+    cached_seconds = time.perf_counter() - start
+    return {"cold_seconds": cold_seconds, "cached_seconds": cached_seconds}
+
+
+def bench_model_size(settings: dict) -> dict:
+    """Size on disk and parameter count of the served model."""
+    from kidneyDiseaseClassifier.config.configuration import ConfigurationManager
+    from kidneyDiseaseClassifier.components.backbones import load_keras_model
+
+    config = ConfigurationManager()
+    model_path = config.get_prediction_config().model_path
+    model = load_keras_model(model_path)
+    return {
+        "backbone": config.params.BACKBONE,
+        "size_mb": os.path.getsize(model_path) / 1e6,
+        "parameters": int(model.count_params()),
+    }
+
+
+def bench_train_accuracy(settings: dict) -> dict:
+    """Validation accuracy after training the prepared model for EPOCHS, and the time it took."""
+    from dataclasses import replace
+    from kidneyDiseaseClassifier.config.configuration import ConfigurationManager
+    from kidneyDiseaseClassifier.components.model_training import Training
+
+    config = ConfigurationManager().get_training_config()
+    training = Training(config=replace(config, params_checkpoint_every_epochs=0))
+    training.get_base_model()
+    training.train_valid_generator()
+    start = time.perf_counter()
+    history = training.fit()
+    train_seconds = time.perf_counter() - start
+    val_accuracy = history.history["val_accuracy"]
+    return {
+        "epochs": len(val_accuracy),
+        "train_seconds": train_seconds,
+        "val_accuracy": float(val_accuracy[-1]),
+        "best_val_accuracy": float(max(val_accuracy)),
+    }
+
+
+BENCHMARKS = {
+    "predict_single": bench_predict_single,
+    "predict_batched": bench_predict_batched,
+    "input_pipeline": bench_input_pipeline,
+    "train_step": bench_train_step,
+    "evaluation": bench_evaluation,
+}
+
+# Run for every backbone by `kidney-benchmark backbones`, not by default
+BACKBONE_BENCHMARKS = {
+    "model_size": bench_model_size,
+    "predict_single": bench_predict_single,
+    "train_accuracy": bench_train_accuracy,
+}
+
+
+def workdir_params(params_overrides: dict) -> dict:
+    """The params.yaml of a benchmark workdir: the repository's, with WEIGHTS null unless overridden."""
+    with open(PARAMS_FILE_PATH) as f:
+        params = yaml.safe_load(f)
+    params.update({"WEIGHTS": None, **params_overrides})
+    return params
+
+
+def prepare_workdir(workdir: Path, images_per_class: int, params_overrides: dict, source_data: Path = None):
+    """Builds a self-contained project directory the benchmarks run in.
+
+    The repository's config.yaml is copied unchanged; every path in it is
+    relative, so the artifacts land inside `workdir`. params.yaml is copied with
+    WEIGHTS set to null so nothing is downloaded, plus any overrides. The base
+    model is prepared with the regular stage, and its untrained copy stands in
+    for the trained and served model. The images are synthetic unless
+    `source_data`, a directory with one sub-directory per class, is given; it is
+    linked in, not copied.
+    """
+    workdir.mkdir(parents=True, exist_ok=True)
+    (workdir / "config").mkdir(exist_ok=True)
+    shutil.copy(CONFIG_FILE_PATH, workdir / "config" / "config.yaml")
+
+    params = workdir_params(params_overrides)
+    with open(workdir / "params.yaml", "w") as f:
+        yaml.safe_dump(params, f)
+
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        from kidneyDiseaseClassifier.config.configuration import ConfigurationManager
+        from kidneyDiseaseClassifier.components.data_ingestion import DataIngestion
+        from kidneyDiseaseClassifier.pipeline.stage_02_prepare_base_model import PrepareBaseModelTrainingPipeline
+        from kidneyDiseaseClassifier.pipeline.stage_06_tensor_cache import TensorCachePipeline
+
+        config = ConfigurationManager()
+        ingestion_config = config.get_data_ingestion_config()
+        image_dir = Path(ingestion_config.unzip_dir) / "kidney-ct-scan-image"
+        if source_data is not None:
+            image_dir.parent.mkdir(parents=True, exist_ok=True)
+            image_dir.symlink_to(source_data, target_is_directory=True)
+        else:
+            make_synthetic_dataset(image_dir, images_per_class)
+        DataIngestion(config=ingestion_config).write_manifest()
+        if params["DATA_LOADER"] == "tensor_cache":
+            TensorCachePipeline().main()
+
+        PrepareBaseModelTrainingPipeline().main()
+        model_path = config.get_prepare_base_model_config().updated_base_model_path
+        for target in (Path(config.config.training.trained_model_path), Path(config.config.prediction.model_path)):
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy(model_path, target)
+    finally:
+        os.chdir(cwd)
+
+
+def _run_child(name: str, settings_path: Path, result_path: Path):
+    with open(settings_path) as f:
+        settings = json.load(f)
+    result = {**BENCHMARKS, **BACKBONE_BENCHMARKS}[name](settings)
+    result["peak_rss_mb"] = peak_rss_mb()
+    with open(result_path, "w") as f:
+        json.dump(result, f)
+
+
+def _environment() -> dict:
+    environment = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+    try:
+        environment["git_commit"] = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    return environment
+
+
+def run(names: list, workdir: Path, output: Path, settings: dict, params_overrides: dict,
+        source_data: Path = None) -> dict:
+    """Runs each benchmark in its own process, so peak RSS is measured per benchmark.
+
+    Returns:
+        dict: The results, also written to `output`.
+    """
+    # the workdir is reused only if it was built from the same params and images
+    spec = {
+        "images_per_class": settings["images_per_class"],
+        "params": workdir_params(params_overrides),
+        "source_data": str(source_data) if source_data else None,
+    }
+    spec_path = workdir / "workdir.json"
+    built_spec = None
+    if spec_path.exists():
+        with open(spec_path) as f:
+            built_spec = json.load(f)
+    if built_spec != spec:
+        if workdir.exists():
+            logger.info(f"Benchmark settings changed, rebuilding workdir {workdir}")
+            shutil.rmtree(workdir)
+        logger.info(f"Preparing benchmark workdir {workdir}")
+        prepare_workdir(workdir, settings["images_per_class"], params_overrides, source_data)
+        with open(spec_path, "w") as f:
+            json.dump(spec, f)
+
+    settings_path = workdir / "benchmark_settings.json"
+    with open(settings_path, "w") as f:
+        json.dump(settings, f)
+
+    results = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": _environment(),
+        "settings": settings,
+        "params_overrides": params_overrides,
+        "benchmarks": {},
+    }
+    for name in names:
+        logger.info(f"Running benchmark {name}")
+        result_path = workdir / f"{name}.result.json"
+        subprocess.run(
+            [sys.executable, "-m", "kidneyDiseaseClassifier.pipeline.benchmark", "_child",
+             name, str(settings_path.resolve()), str(result_path.resolve())],
+            cwd=workdir, check=True
+        )
+        with open(result_path) as f:
+            results["benchmarks"][name] = json.load(f)
+        logger.info(f"{name}: {results['benchmarks'][name]}")
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=4)
+    logger.info(f"Benchmark results written to {output}")
+    return results
+
+
+def compare_backbones(backbones: list, workdir: Path, output: Path, settings: dict, params_overrides: dict,
+                      source_data: Path = None) -> list:
+    """Measures size, single-image latency and accuracy of the model built on each backbone.
+
+    Each backbone gets its own workdir under `workdir`, where its base model is
+    prepared and trained for EPOCHS on the same images. With WEIGHTS null the
+    frozen backbones are random, so their accuracy says nothing about them and
+    is not measured.
+
+    Returns:
+        list: One row per backbone, also written to `output` with the full results.
+    """
+    names = list(BACKBONE_BENCHMARKS)
+    if workdir_params(params_overrides)["WEIGHTS"] is None:
+        logger.warning("WEIGHTS is null, so the backbones are randomly initialized; accuracy is not reported")
+        names.remove("train_accuracy")
+
+    report = {"created": datetime.now(timezone.utc).isoformat(timespec="seconds"), "backbones": {}, "rows": []}
+    for backbone in backbones:
+        backbone_dir = workdir / backbone
+        results = run(
+            names, backbone_dir, backbone_dir / "results.json", settings,
+            {**params_overrides, "BACKBONE": backbone}, source_data
+        )
+        report["backbones"][backbone] = results
+        benchmarks = results["benchmarks"]
+        accuracy = benchmarks.get("train_accuracy", {})
+        report["rows"].append({
+            "backbone": backbone,
+            "size_mb": benchmarks["model_size"]["size_mb"],
+            "parameters": benchmarks["model_size"]["parameters"],
+            "p50_ms": benchmarks["predict_single"]["p50_ms"],
+            "p95_ms": benchmarks["predict_single"]["p95_ms"],
+            "val_accuracy": accuracy.get("val_accuracy"),
+            "train_seconds": accuracy.get("train_seconds"),
+        })
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=4)
+    logger.info(f"Backbone comparison written to {output}")
+    return report["rows"]
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Compares every metric present in both result files.
+
+    Args:
+        current (dict): The results of the run being checked.
+        baseline (dict): The stored baseline results.
+        tolerance (float): The relative change in the bad direction that counts as a regression.
+
+    Returns:
+        list: One row per metric: benchmark, metric, baseline, current, relative change and regression flag.
+    """
+    rows = []
+    for name, metrics in current["benchmarks"].items():
+        base_metrics = baseline["benchmarks"].get(name, {})
+        for metric, higher_is_better in HIGHER_IS_BETTER.items():
+            if metric not in metrics or not base_metrics.get(metric):
+                continue
+            change = (metrics[metric] - base_metrics[metric]) / base_metrics[metric]
+            regression = -change > tolerance if higher_is_better else change > tolerance
+            rows.append((name, metric, base_metrics[metric], metrics[metric], change, regression))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="kidney-benchmark",
+        description="Benchmark prediction, the input pipeline, training steps and evaluation on synthetic data."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run benchmarks and write a results file.")
+    run_parser.add_argument("benchmarks", nargs="*", metavar="BENCHMARK",
+                            help=f"Benchmarks to run, from {', '.join(BENCHMARKS)}. Defaults to all.")
+    run_parser.add_argument("-o", "--output", type=Path, default=Path("artifacts/benchmarks/results.json"))
+    run_parser.add_argument("--workdir", type=Path, default=Path("artifacts/benchmarks/workdir"),
+                            help="Synthetic project directory, rebuilt whenever the params or dataset settings change.")
+    run_parser.add_argument("--images-per-class", type=int, default=64)
+    run_parser.add_argument("--repeats", type=int, default=50, help="Timed predictions per client.")
+    run_parser.add_argument("--warmup", type=int, default=5, help="Untimed predictions before timing.")
+    run_parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients in predict_batched.")
+    run_parser.add_argument("--steps", type=int, default=5, help="Batches timed by input_pipeline and train_step.")
+    run_parser.add_argument("--set", action="append", default=[], metavar="PARAM=VALUE",
+                            help="Override a params.yaml value in the workdir, e.g. --set DATA_LOADER=tf_data.")
+
+    backbones_parser = commands.add_parser(
+        "backbones", help="Compare model size, prediction latency and accuracy across BACKBONE choices."
+    )
+    backbones_parser.add_argument("backbones", nargs="*", metavar="BACKBONE",
+                                  help="Backbones to compare. Defaults to all.")
+    backbones_parser.add_argument("-o", "--output", type=Path, default=Path("artifacts/benchmarks/backbones.json"))
+    backbones_parser.add_argument("--workdir", type=Path, default=Path("artifacts/benchmarks/backbones"),
+                                  help="Parent of the per-backbone project directories, rebuilt when the settings change.")
+    backbones_parser.add_argument("--source-data", type=Path, default=None,
+                                  help="Train and score on these images (one folder per class) instead of synthetic ones.")
+    backbones_parser.add_argument("--images-per-class", type=int, default=64)
+    backbones_parser.add_argument("--epochs", type=int, default=2)
+    backbones_parser.add_argument("--repeats", type=int, default=50, help="Timed single-image predictions.")
+    backbones_parser.add_argument("--warmup", type=int, default=5, help="Untimed predictions before timing.")
+    backbones_parser.add_argument("--set", action="append", default=[], metavar="PARAM=VALUE",
+                                  help="Override a params.yaml value, e.g. --set WEIGHTS=/path/to/weights_notop.h5. "
+                                       "WEIGHTS defaults to imagenet here.")
+
+    compare_parser = commands.add_parser("compare", help="Compare a results file with a stored baseline.")
+    compare_parser.add_argument("results", type=Path, nargs="?", default=Path("artifacts/benchmarks/results.json"))
+    compare_parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    compare_parser.add_argument("--tolerance", type=float, default=0.10,
+                                help="Relative slowdown (or memory growth) reported as a regression.")
+
+    child_parser = commands.add_parser("_child")
+    child_parser.add_argument("name", choices=list({**BENCHMARKS, **BACKBONE_BENCHMARKS}))
+    child_parser.add_argument("settings_path", type=Path)
+    child_parser.add_argument("result_path", type=Path)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "_child":
+        _run_child(args.name, args.settings_path, args.result_path)
+        return
+
+    params_overrides = {}
+    for item in getattr(args, "set", []):
+        key, _, value = item.partition("=")
+        params_overrides[key] = yaml.safe_load(value)
+
+    if args.command == "backbones":
+        from kidneyDiseaseClassifier.components.backbones import BACKBONES
+
+        unknown = set(args.backbones) - set(BACKBONES)
+        if unknown:
+            parser.error(f"unknown backbones: {', '.join(sorted(unknown))}")
+        settings = {
+            "images_per_class": args.images_per_class,
+            "repeats": args.repeats,
+            "warmup": args.warmup,
+        }
+        source_data = args.source_data.resolve() if args.source_data else None
+        try:
+            logger.info(f">>>>>> {STAGE_NAME} started <<<<<<")
+            rows = compare_backbones(args.backbones or list(BACKBONES), args.workdir, args.output, settings,
+                                     {"WEIGHTS": "imagenet", **params_overrides, "EPOCHS": args.epochs}, source_data)
+            logger.info(f">>>>>> {STAGE_NAME} completed <<<<<<<")
+        except Exception as e:
+            logger.exception(e)
+            raise e
+        print(f"{'backbone':<16} {'size_mb':>10} {'params':>12} {'p50_ms':>8} {'p95_ms':>8} {'val_acc':>8} {'train_s':>8}")
+        for row in rows:
+            accuracy = "-" if row["val_accuracy"] is None else f"{row['val_accuracy']:.3f}"
+            train_seconds = "-" if row["train_seconds"] is None else f"{row['train_seconds']:.1f}"
+            print(f"{row['backbone']:<16} {row['size_mb']:>10.1f} {row['parameters']:>12,} {row['p50_ms']:>8.1f} "
+                  f"{row['p95_ms']:>8.1f} {accuracy:>8} {train_seconds:>8}")
+        return
+
+    if args.command == "run":
+        unknown = set(args.benchmarks) - set(BENCHMARKS)
+        if unknown:
+            parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+        settings = {
+            "images_per_class": args.images_per_class,
+            "repeats": args.repeats,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "steps": args.steps,
+        }
+        try:
+            logger.info(f">>>>>> {STAGE_NAME} started <<<<<<")
+            run(args.benchmarks or list(BENCHMARKS), args.workdir, args.output, settings, params_overrides)
+            logger.info(f">>>>>> {STAGE_NAME} completed <<<<<<<")
+        except Exception as e:
+            logger.exception(e)
+            raise e
+        return
+
+    with open(args.results) as f:
+        current = json.load(f)
+    if not args.baseline.exists():
+        sys.exit(f"No baseline at {args.baseline}; record one with: kidney-benchmark run -o {args.baseline}")
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    rows = compare(current, baseline, args.tolerance)
+    print(f"{'benchmark':<16} {'metric':<16} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, metric, base_value, value, change, regression in rows:
+        flag = "  REGRESSION" if regression else ""
+        print(f"{name:<16} {metric:<16} {base_value:>12.3f} {value:>12.3f} {change:>+8.1%}{flag}")
+    regressions = sum(row[-1] for row in rows)
+    if regressions:
+        sys.exit(f"{regressions} metric(s) regressed by more than {args.tolerance:.0%}")
+
+
+if __name__ == '__main__':
+    main()
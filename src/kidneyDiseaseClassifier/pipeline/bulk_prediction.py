@@ -0,0 +1,248 @@
+import os
+import csv
+import json
+import time
+import argparse
+import dataclasses
+import functools
+import multiprocessing
+from collections import deque
+from pathlib import Path
+import numpy as np
+from kidneyDiseaseClassifier import logger
+from kidneyDiseaseClassifier.config.configuration import ConfigurationManager
+from kidneyDiseaseClassifier.components.model_holder import ModelHolder
+from kidneyDiseaseClassifier.pipeline.stage_05_prediction import PredictionPipeline
+
+
+STAGE_NAME = "Bulk Prediction"
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp"}
+PROB_FIELDS = [f"prob_{name}" for name in PredictionPipeline.CLASS_NAMES]
+FIELDS = ["path", "prediction"] + PROB_FIELDS + ["error"]
+
+
+def list_images(source: Path) -> list:
+    """List the images to score.
+
+    Args:
+        source (Path): A directory searched recursively for images, or a text file with one path per line.
+
+    Returns:
+        list: Image paths in a stable order.
+    """
+    if source.is_dir():
+        return sorted(
+            str(Path(root) / name)
+            for root, _, files in os.walk(source)
+            for name in files
+            if Path(name).suffix.lower() in IMAGE_EXTENSIONS
+        )
+    with open(source) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def drop_partial_row(output: Path) -> bool:
+    """Truncate the output back to its last complete line.
+
+    A run killed mid-write leaves a partial last row. Dropping it means the
+    image is scored again, and the next row does not get appended to it.
+
+    Returns:
+        bool: Whether a partial row was dropped.
+    """
+    if not output.exists():
+        return False
+
+    block_size = 8192
+    with open(output, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        if end == 0:
+            return False
+        f.seek(end - 1)
+        if f.read(1) == b"\n":
+            return False
+        while end > 0:
+            start = max(0, end - block_size)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline != -1:
+                f.truncate(start + newline + 1)
+                break
+            end = start
+        else:
+            f.truncate(0)
+    logger.warning(f"Dropped a partial row left in {output} by an interrupted run")
+    return True
+
+
+def _is_scored(row: dict) -> bool:
+    """Whether a row holds a prediction, every class probability and no error."""
+    if any(row.get(field) is None for field in FIELDS) or row["error"]:
+        return False
+    return all(row[field] != "" for field in ["prediction"] + PROB_FIELDS)
+
+
+def _json_rows(f):
+    for line in f:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            # a row cut off by an interrupted run; it is scored again
+            continue
+
+
+def read_completed(output: Path, output_format: str) -> set:
+    """Collect the paths already scored in a previous, possibly interrupted, run.
+
+    Rows that recorded an error, or are missing the prediction or any class
+    probability, are not counted so they are retried.
+    """
+    if not output.exists() or output.stat().st_size == 0:
+        return set()
+
+    with open(output, newline="") as f:
+        rows = csv.DictReader(f) if output_format == "csv" else _json_rows(f)
+        return {row["path"] for row in rows if _is_scored(row)}
+
+
+def _load_image(path: str, target_size: tuple):
+    """Decode and preprocess one image in a worker process."""
+    try:
+        return path, PredictionPipeline.preprocess(path, target_size), None
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}"
+
+
+class ResultWriter:
+    """Appends prediction rows to a CSV or NDJSON file, flushing after every batch."""
+
+    def __init__(self, output: Path, output_format: str):
+        self.output_format = output_format
+        output.parent.mkdir(parents=True, exist_ok=True)
+        is_new = not output.exists() or output.stat().st_size == 0
+        self.file = open(output, "a", newline="")
+        if output_format == "csv":
+            self.writer = csv.DictWriter(self.file, fieldnames=FIELDS)
+            if is_new:
+                self.writer.writeheader()
+
+    def write(self, rows: list):
+        for row in rows:
+            if self.output_format == "csv":
+                self.writer.writerow(row)
+            else:
+                self.file.write(json.dumps(row) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+class BulkPredictionPipeline:
+    def __init__(self, batch_size: int = 32, workers: int = None, prefetch: int = 2,
+                 model_path: str = None):
+        self.batch_size = batch_size
+        self.workers = workers or os.cpu_count()
+        self.prefetch = max(prefetch, 1)
+        self.model_path = model_path
+
+    def _load_model(self):
+        config = ConfigurationManager().get_prediction_config()
+        if self.model_path:
+            config = dataclasses.replace(config, model_path=Path(self.model_path), model_ref=None)
+        _, model = ModelHolder(config=config).get()
+        return model
+
+    def _score(self, model, decoded: list) -> list:
+        rows = []
+        loaded = [(path, array) for path, array, error in decoded if error is None]
+        if loaded:
+            probabilities = model.predict(np.concatenate([array for _, array in loaded]), verbose=0)
+            for (path, _), probs in zip(loaded, probabilities):
+                row = {"path": path, "prediction": PredictionPipeline.CLASS_NAMES[int(np.argmax(probs))], "error": ""}
+                row.update({f"prob_{name}": float(p) for name, p in zip(PredictionPipeline.CLASS_NAMES, probs)})
+                rows.append(row)
+        for path, _, error in decoded:
+            if error is not None:
+                rows.append({"path": path, "prediction": "", "error": error})
+        return rows
+
+    def main(self, source: Path, output: Path, output_format: str):
+        paths = list_images(source)
+        drop_partial_row(output)
+        completed = read_completed(output, output_format)
+        remaining = [path for path in paths if path not in completed]
+        logger.info(f"{len(paths)} images found, {len(completed)} already scored, {len(remaining)} to score")
+        if not remaining:
+            return
+
+        batches = iter([remaining[i:i + self.batch_size] for i in range(0, len(remaining), self.batch_size)])
+        writer = ResultWriter(output, output_format)
+        scored = 0
+        start = time.perf_counter()
+
+        # Spawned decode workers start up while the model loads and share none of TensorFlow's state or threads
+        with multiprocessing.get_context("spawn").Pool(processes=self.workers) as pool:
+            model = self._load_model()
+            load_image = functools.partial(_load_image, target_size=PredictionPipeline.input_size(model))
+
+            # Keep `prefetch` batches decoding while the model scores the current one
+            pending = deque()
+            for batch in batches:
+                pending.append(pool.map_async(load_image, batch))
+                if len(pending) >= self.prefetch:
+                    break
+
+            try:
+                while pending:
+                    decoded = pending.popleft().get()
+                    next_batch = next(batches, None)
+                    if next_batch is not None:
+                        pending.append(pool.map_async(load_image, next_batch))
+
+                    writer.write(self._score(model, decoded))
+                    scored += len(decoded)
+                    elapsed = time.perf_counter() - start
+                    logger.info(f"Scored {scored}/{len(remaining)} images ({scored / elapsed:.1f} images/sec)")
+            finally:
+                writer.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="kidney-predict",
+        description="Score a directory or file list of kidney CT scans."
+    )
+    parser.add_argument("source", type=Path, help="Directory of images or a text file with one image path per line.")
+    parser.add_argument("-o", "--output", type=Path, default=Path("predictions.csv"),
+                        help="CSV or NDJSON file to append results to. Existing rows are skipped on resume.")
+    parser.add_argument("--format", choices=["csv", "ndjson"], default=None,
+                        help="Output format. Defaults to the output file extension.")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=None, help="Decode processes. Defaults to all cores.")
+    parser.add_argument("--prefetch", type=int, default=2, help="Batches decoded ahead of the model.")
+    parser.add_argument("--model", default=None, help="Model file. Defaults to prediction.model_path in config.yaml.")
+    args = parser.parse_args(argv)
+
+    output_format = args.format or ("ndjson" if args.output.suffix.lower() in {".ndjson", ".jsonl"} else "csv")
+
+    try:
+        logger.info(f">>>>>> {STAGE_NAME} started <<<<<<")
+        obj = BulkPredictionPipeline(
+            batch_size=args.batch_size,
+            workers=args.workers,
+            prefetch=args.prefetch,
+            model_path=args.model
+        )
+        obj.main(source=args.source, output=args.output, output_format=output_format)
+        logger.info(f">>>>>> {STAGE_NAME} completed <<<<<<<")
+    except Exception as e:
+        logger.exception(e)
+        raise e
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+import os
+import ast
+import json
+import hashlib
+import importlib
+import inspect
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+import yaml
+import kidneyDiseaseClassifier
+from kidneyDiseaseClassifier import logger
+from kidneyDiseaseClassifier.utils.profiling import profile
+
+
+PACKAGE_NAME = "kidneyDiseaseClassifier"
+PACKAGE_DIR = Path(kidneyDiseaseClassifier.__file__).parent
+
+
+def _entry_path(entry) -> str:
+    """dvc.yaml lists deps and outs either as a path or as {path: options}."""
+    return next(iter(entry)) if isinstance(entry, dict) else entry
+
+
+def _is_within(path: str, parent: str) -> bool:
+    path, parent = os.path.normpath(path), os.path.normpath(parent)
+    return path == parent or path.startswith(parent + os.sep)
+
+
+class Stage:
+    """One stage of dvc.yaml.
+
+    Attributes:
+        name (str): The stage name.
+        cmd (str): The command DVC would run.
+        deps (list): Dependency paths.
+        params (list): params.yaml keys the stage depends on.
+        outs (list): Output paths, including metrics files.
+        module (str): The pipeline module the command runs.
+    """
+
+    def __init__(self, name: str, definition: dict):
+        self.name = name
+        self.cmd = definition["cmd"]
+        self.deps = [_entry_path(dep) for dep in definition.get("deps", [])]
+        self.params = []
+        for param in definition.get("params", []):
+            if isinstance(param, dict):
+                # {params_file: [keys]}; only params.yaml is used in this project
+                for keys in param.values():
+                    self.params.extend(keys)
+            else:
+                self.params.append(param)
+        self.outs = [_entry_path(out) for out in definition.get("outs", []) + definition.get("metrics", [])]
+        script = self.cmd.split()[-1]
+        self.module = os.path.splitext(os.path.relpath(script, "src"))[0].replace(os.sep, ".")
+
+    def pipeline(self):
+        """Returns an instance of the pipeline class defined in the stage's module."""
+        module = importlib.import_module(self.module)
+        for _, cls in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ == module.__name__ and cls.__name__.endswith("Pipeline"):
+                return cls()
+        raise ValueError(f"No pipeline class in {self.module}")
+
+
+def module_files(module: str, seen: set = None) -> set:
+    """Source files of a package module and every package module it imports, transitively.
+
+    Imports are read from the source with `ast`, including imports inside
+    functions, so nothing is executed.
+    """
+    seen = set() if seen is None else seen
+    relative = module.split(".")[1:]
+    candidates = [PACKAGE_DIR.joinpath(*relative).with_suffix(".py"), PACKAGE_DIR.joinpath(*relative, "__init__.py")]
+    path = next((candidate for candidate in candidates if candidate.exists()), None)
+    if path is None or path in seen:
+        return seen
+    seen.add(path)
+
+    tree = ast.parse(path.read_text(), filename=str(path))
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            # `from package import module` imports the module, so try both
+            names = [node.module] + [f"{node.module}.{alias.name}" for alias in node.names]
+        else:
+            continue
+        for name in names:
+            if name == PACKAGE_NAME or name.startswith(PACKAGE_NAME + "."):
+                module_files(name, seen)
+    return seen
+
+
+class DagRunner:
+    """Runs the dvc.yaml stages in-process, in dependency order, without the DVC CLI.
+
+    A stage depends on every stage with an output at or above one of its
+    dependency paths. Stages whose upstream stages are done run concurrently
+    in a thread pool. A stage is skipped when its outputs exist and a hash of
+    its command, dependency contents, params subset and code (the stage module
+    and every package module it imports) matches its last successful run.
+    File hashes are cached by size and mtime, so unchanged dataset images are
+    not re-read.
+
+    Attributes:
+        stages (dict): The stages keyed by name, in dvc.yaml order.
+        upstream (dict): For each stage, the names of the stages it depends on.
+        state_path (Path): The file recording the hash of each stage's last successful run.
+    """
+
+    def __init__(self, dvc_file: Path = Path("dvc.yaml"), params_file: Path = Path("params.yaml"),
+                 state_path: Path = Path("artifacts/dag_state.json"), max_workers: int = None):
+        with open(dvc_file) as f:
+            definitions = yaml.safe_load(f)["stages"]
+        self.stages = {name: Stage(name, definition) for name, definition in definitions.items()}
+        self.params_file = Path(params_file)
+        self.state_path = Path(state_path)
+        self.max_workers = max_workers
+        self.upstream = {
+            name: {
+                other.name for other in self.stages.values() if other.name != name
+                and any(_is_within(dep, out) or _is_within(out, dep) for dep in stage.deps for out in other.outs)
+            }
+            for name, stage in self.stages.items()
+        }
+        self._state_lock = threading.Lock()
+        self.state = self._read_state()
+
+    def _read_state(self) -> dict:
+        if not self.state_path.exists():
+            return {"stages": {}, "files": {}}
+        with open(self.state_path) as f:
+            return json.load(f)
+
+    def _write_state(self):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_name(f".{self.state_path.name}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _file_hash(self, path: str) -> str:
+        stat = os.stat(path)
+        with self._state_lock:
+            cached = self.state["files"].get(path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        with self._state_lock:
+            self.state["files"][path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def _path_hash(self, path: str) -> str:
+        if os.path.isfile(path):
+            return self._file_hash(path)
+        if not os.path.isdir(path):
+            return "missing"
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                file_path = os.path.join(root, name)
+                digest.update(f"{os.path.relpath(file_path, path)}:{self._file_hash(file_path)}\n".encode())
+        return digest.hexdigest()
+
+    def stage_hash(self, stage: Stage) -> str:
+        """Hashes everything a stage's outputs depend on."""
+        with open(self.params_file) as f:
+            params = yaml.safe_load(f)
+        key = {
+            "cmd": stage.cmd,
+            "deps": {dep: self._path_hash(dep) for dep in stage.deps},
+            "params": {name: params.get(name) for name in stage.params},
+            "code": {
+                str(path.relative_to(PACKAGE_DIR)): self._file_hash(str(path))
+                for path in sorted(module_files(stage.module))
+            },
+        }
+        return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _is_up_to_date(self, stage: Stage, stage_hash: str) -> bool:
+        with self._state_lock:
+            previous = self.state["stages"].get(stage.name)
+        return previous == stage_hash and all(os.path.exists(out) for out in stage.outs)
+
+    def _run_stage(self, stage: Stage, force: bool) -> str:
+        stage_hash = self.stage_hash(stage)
+        if not force and self._is_up_to_date(stage, stage_hash):
+            logger.info(f">>>>>> {stage.name} skipped, inputs unchanged <<<<<<")
+            return "skipped"
+
+        logger.info("*********************************\n")
+        logger.info(f">>>>>> {stage.name} started <<<<<<")
+        with profile(stage.name):
+            stage.pipeline().main()
+        logger.info(f">>>>>> {stage.name} completed <<<<<<<\n **********************************")
+
+        with self._state_lock:
+            self.state["stages"][stage.name] = stage_hash
+            self._write_state()
+        return "ran"
+
+    def selected(self, targets: list = None) -> list:
+        """The target stages and everything upstream of them, all stages by default."""
+        if not targets:
+            return list(self.stages)
+        unknown = set(targets) - set(self.stages)
+        if unknown:
+            raise ValueError(f"Unknown stages: {', '.join(sorted(unknown))}")
+        selected, pending = set(), list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in selected:
+                selected.add(name)
+                pending.extend(self.upstream[name])
+        return [name for name in self.stages if name in selected]
+
+    def run(self, targets: list = None, force: bool = False, dry_run: bool = False) -> dict:
+        """Runs the selected stages, each as soon as its upstream stages are done.
+
+        Args:
+            targets (list, optional): Stages to bring up to date, with their upstream stages. Defaults to all.
+            force (bool, optional): Run every selected stage even if it is up to date. Defaults to False.
+            dry_run (bool, optional): Only report which stages would run. Defaults to False.
+
+        Returns:
+            dict: "ran", "skipped", "failed" or "blocked" for each selected stage.
+
+        Raises:
+            RuntimeError: If any stage failed.
+        """
+        names = self.selected(targets)
+        if dry_run:
+            plan = {}
+            for name in names:
+                # a stage below one that would run sees outputs that are about to change
+                stale_upstream = any(plan.get(up) == "would run" for up in self.upstream[name])
+                up_to_date = not force and not stale_upstream and self._is_up_to_date(
+                    self.stages[name], self.stage_hash(self.stages[name])
+                )
+                plan[name] = "up to date" if up_to_date else "would run"
+            return plan
+
+        results = {}
+        remaining = set(names)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while remaining or running:
+                for name in [n for n in names if n in remaining]:
+                    upstream = self.upstream[name] & set(names)
+                    if any(results.get(up) in ("failed", "blocked") for up in upstream):
+                        results[name] = "blocked"
+                        remaining.discard(name)
+                    elif all(up in results for up in upstream):
+                        running[executor.submit(self._run_stage, self.stages[name], force)] = name
+                        remaining.discard(name)
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        logger.exception(e)
+                        results[name] = "failed"
+
+        # keep the file hashes computed for skipped stages too
+        with self._state_lock:
+            self._write_state()
+
+        for name in names:
+            logger.info(f"{name}: {results.get(name)}")
+        failed = [name for name in names if results.get(name) == "failed"]
+        if failed:
+            raise RuntimeError(f"Stages failed: {', '.join(failed)}")
+        return results
@@ -0,0 +1,111 @@
+import os
+import sys
+import time
+import socket
+import argparse
+import subprocess
+from kidneyDiseaseClassifier import logger
+from kidneyDiseaseClassifier.config.configuration import ConfigurationManager
+from kidneyDiseaseClassifier.components.distributed import tf_config
+
+
+STAGE_NAME = "Distributed Training"
+TRAINING_MODULE = "kidneyDiseaseClassifier.pipeline.stage_03_model_training"
+
+
+def free_ports(count: int) -> list:
+    """Ports on localhost that are free right now, one per worker."""
+    sockets = []
+    try:
+        for _ in range(count):
+            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            s.bind(("localhost", 0))
+            sockets.append(s)
+        return [s.getsockname()[1] for s in sockets]
+    finally:
+        for s in sockets:
+            s.close()
+
+
+def worker_env(workers: list, index: int, threads: int) -> dict:
+    """The environment of worker `index`: its TF_CONFIG and a share of the CPU threads."""
+    env = dict(os.environ)
+    env["TF_CONFIG"] = tf_config(workers, index)
+    for name in ("OMP_NUM_THREADS", "TF_NUM_INTRAOP_THREADS"):
+        env[name] = str(threads)
+    env["TF_NUM_INTEROP_THREADS"] = str(min(2, threads))
+    return env
+
+
+def launch(num_workers: int, threads_per_worker: int = None, poll_interval: float = 1.0) -> int:
+    """Runs the training stage as a cluster of local worker processes and waits for them.
+
+    Worker 0 is the chief: it saves the model to the model store and logs the
+    run to MLflow, exactly as a single-process training stage would. If any
+    worker fails, the others are stopped, since they would otherwise wait on
+    it forever.
+
+    Args:
+        num_workers (int): The number of worker processes, at least 2.
+        threads_per_worker (int, optional): CPU threads per worker. Defaults to
+            distributed.threads_per_worker, or the CPUs split evenly between the workers.
+        poll_interval (float, optional): Seconds between checks on the workers. Defaults to 1.
+
+    Returns:
+        int: 0 if every worker succeeded, otherwise the first failing worker's exit code.
+    """
+    if num_workers < 2:
+        raise ValueError("Distributed training needs at least 2 workers")
+    config = ConfigurationManager().get_distributed_config()
+    threads = threads_per_worker or config.threads_per_worker or max(1, (os.cpu_count() or 1) // num_workers)
+    workers = [f"localhost:{port}" for port in free_ports(num_workers)]
+    logger.info(f"Starting {num_workers} training workers at {', '.join(workers)}, {threads} threads each")
+
+    processes = [
+        subprocess.Popen([sys.executable, "-m", TRAINING_MODULE], env=worker_env(workers, index, threads))
+        for index in range(num_workers)
+    ]
+    try:
+        while True:
+            codes = [process.poll() for process in processes]
+            failed = [(index, code) for index, code in enumerate(codes) if code not in (None, 0)]
+            if failed:
+                index, code = failed[0]
+                logger.error(f"Training worker {index} exited with code {code}, stopping the others")
+                return code
+            if all(code == 0 for code in codes):
+                return 0
+            time.sleep(poll_interval)
+    finally:
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="kidney-train-distributed",
+        description="Run the training stage data-parallel across several local worker processes."
+    )
+    parser.add_argument("--workers", type=int, default=2, help="Worker processes. Defaults to 2.")
+    parser.add_argument("--threads-per-worker", type=int, default=None, help="CPU threads per worker.")
+    args = parser.parse_args(argv)
+
+    try:
+        logger.info(f">>>>>> {STAGE_NAME} started <<<<<<")
+        code = launch(args.workers, args.threads_per_worker)
+        if code:
+            raise RuntimeError(f"Distributed training failed with exit code {code}")
+        logger.info(f">>>>>> {STAGE_NAME} completed <<<<<<<")
+    except Exception as e:
+        logger.exception(e)
+        raise e
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 from kidneyDiseaseClassifier.config.configuration import ConfigurationManager
 from kidneyDiseaseClassifier.components.data_ingestion import DataIngestion
 from kidneyDiseaseClassifier import logger
+from kidneyDiseaseClassifier.utils.profiling import profile, save_timeline
 
 STAGE_NAME = "Data Ingestion Stage"
 
@@ -13,17 +14,24 @@ class DataIngestionTrainingPipeline:
         config = ConfigurationManager()
         data_ingestion_config = config.get_data_ingestion_config()
         data_ingestion = DataIngestion(config=data_ingestion_config)
-        data_ingestion.download_file()
-        data_ingestion.extract_zip_file()
+        with profile("download"):
+            data_ingestion.download_file()
+        with profile("extract"):
+            data_ingestion.extract_zip_file()
+        with profile("manifest"):
+            data_ingestion.write_manifest()
 
 
 if __name__ == '__main__':
     try:
         logger.info(f">>>>>> {STAGE_NAME} started <<<<<<")
         obj = DataIngestionTrainingPipeline()
-        obj.main()
+        with profile(STAGE_NAME):
+            obj.main()
         logger.info(
             f">>>>>> {STAGE_NAME} completed <<<<<<<\n\nx========================x")
     except Exception as e:
         logger.exception(e)
         raise e
+    finally:
+        save_timeline()
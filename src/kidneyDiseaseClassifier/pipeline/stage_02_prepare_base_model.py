@@ -1,6 +1,8 @@
 from kidneyDiseaseClassifier.config.configuration import ConfigurationManager
 from kidneyDiseaseClassifier.components.prepare_base_model import PrepareBaseModel
+from kidneyDiseaseClassifier.components.model_store import ModelStore
 from kidneyDiseaseClassifier import logger
+from kidneyDiseaseClassifier.utils.profiling import profile, save_timeline
 
 
 STAGE_NAME = "Prepare Base Model"
@@ -13,7 +15,10 @@ class PrepareBaseModelTrainingPipeline:
     def main(self):
         config = ConfigurationManager()
         prepare_base_model_config = config.get_prepare_base_model_config()
-        prepare_base_model = PrepareBaseModel(config=prepare_base_model_config)
+        prepare_base_model = PrepareBaseModel(
+            config=prepare_base_model_config,
+            model_store=ModelStore(config=config.get_model_store_config())
+        )
         prepare_base_model.get_base_model()
         prepare_base_model.update_base_model()
 
@@ -23,9 +28,12 @@ if __name__ == '__main__':
         logger.info("*********************************\n")
         logger.info(f">>>>>> {STAGE_NAME} started <<<<<<")
         obj = PrepareBaseModelTrainingPipeline()
-        obj.main()
+        with profile(STAGE_NAME):
+            obj.main()
         logger.info(
             f">>>>>> {STAGE_NAME} completed <<<<<<<\n **********************************")
     except Exception as e:
         logger.exception(e)
         raise e
+    finally:
+        save_timeline()
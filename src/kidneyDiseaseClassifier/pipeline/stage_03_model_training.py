@@ -1,6 +1,11 @@
+import tensorflow as tf
 from kidneyDiseaseClassifier.config.configuration import ConfigurationManager
 from kidneyDiseaseClassifier.components.model_training import Training
+from kidneyDiseaseClassifier.components.model_store import ModelStore
+from kidneyDiseaseClassifier.components.mlflow_tracker import MlflowTracker
+from kidneyDiseaseClassifier.components.distributed import get_strategy, is_chief, is_multi_worker
 from kidneyDiseaseClassifier import logger
+from kidneyDiseaseClassifier.utils.profiling import profile, get_profiler, save_timeline
 
 
 STAGE_NAME = "Training"
@@ -13,10 +18,45 @@ class ModelTrainingPipeline:
     def main(self):
         config = ConfigurationManager()
         model_training_config = config.get_training_config()
-        model_training = Training(config=model_training_config)
-        model_training.get_base_model()
-        model_training.train_valid_generator()
-        model_training.train()
+        # joins the cluster when started with TF_CONFIG or with distributed.enabled
+        strategy = get_strategy(config.get_distributed_config())
+        chief = is_chief(strategy)
+        model_training = Training(
+            config=model_training_config,
+            model_store=ModelStore(config=config.get_model_store_config()) if chief else None,
+            strategy=strategy
+        )
+        with profile("load_base_model"):
+            model_training.get_base_model()
+        with profile("train_valid_generator"):
+            model_training.train_valid_generator()
+        if model_training.config.params_step_time_benchmark_steps > 0 and not is_multi_worker(strategy):
+            with profile("step_time_benchmark"):
+                model_training.benchmark_step_time()
+
+        callback_list = []
+        profiling_config = config.get_profiling_config()
+        if profiling_config.trace_training:
+            # TensorBoard's profiler captures a TensorFlow trace of the configured batches
+            callback_list.append(tf.keras.callbacks.TensorBoard(
+                log_dir=str(profiling_config.trace_dir / get_profiler().run_id),
+                profile_batch=tuple(profiling_config.trace_batches)
+            ))
+
+        if not chief:
+            # the workers' metrics are reduced across the cluster, so the chief's run holds them all
+            model_training.train(callback_list=callback_list)
+            return
+
+        tracker = MlflowTracker(config=config.get_mlflow_config()).start(run_name="training")
+        tracker.log_params(config.params)
+        callback_list.append(tracker.keras_callback())
+        try:
+            model_training.train(callback_list=callback_list)
+        except Exception:
+            tracker.finish(status="FAILED")
+            raise
+        tracker.finish()
 
 
 if __name__ == '__main__':
@@ -24,9 +64,12 @@ if __name__ == '__main__':
         logger.info("*********************************\n")
         logger.info(f">>>>>> {STAGE_NAME} started <<<<<<")
         obj = ModelTrainingPipeline()
-        obj.main()
+        with profile(STAGE_NAME):
+            obj.main()
         logger.info(
             f">>>>>> {STAGE_NAME} completed <<<<<<<\n **********************************")
     except Exception as e:
         logger.exception(e)
-        raise e
\ No newline at end of file
+        raise e
+    finally:
+        save_timeline()
@@ -1,6 +1,8 @@
 from kidneyDiseaseClassifier.config.configuration import ConfigurationManager
 from kidneyDiseaseClassifier.components.model_evaluation_mlflow import Evaluation
+from kidneyDiseaseClassifier.components.mlflow_tracker import MlflowTracker
 from kidneyDiseaseClassifier import logger
+from kidneyDiseaseClassifier.utils.profiling import profile, save_timeline
 
 
 STAGE_NAME = "Model Evaluation"
@@ -14,8 +16,16 @@ class ModelEvaluationPipeline:
         config = ConfigurationManager()
         evaluation_config = config.get_evaluation_config()
         evaluation = Evaluation(config=evaluation_config)
-        evaluation.evaluation()
-        # evaluation.log_into_mlflow()
+        # continue the training run so its epochs and the scores sit together
+        tracker = MlflowTracker(config=config.get_mlflow_config()).start(run_name="evaluation", resume=True)
+        try:
+            with profile("evaluate"):
+                evaluation.evaluation()
+            evaluation.log_into_mlflow(tracker)
+        except Exception:
+            tracker.finish(status="FAILED")
+            raise
+        tracker.finish()
 
 
 if __name__ == '__main__':
@@ -23,9 +33,12 @@ if __name__ == '__main__':
         logger.info("*********************************\n")
         logger.info(f">>>>>> {STAGE_NAME} started <<<<<<")
         obj = ModelEvaluationPipeline()
-        obj.main()
+        with profile(STAGE_NAME):
+            obj.main()
         logger.info(
             f">>>>>> {STAGE_NAME} completed <<<<<<<\n **********************************")
     except Exception as e:
         logger.exception(e)
-        raise e
\ No newline at end of file
+        raise e
+    finally:
+        save_timeline()
@@ -1,29 +1,78 @@
+import io
 import numpy as np
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing import image
-import os 
+from PIL import Image
+from kidneyDiseaseClassifier.config.configuration import ConfigurationManager
+from kidneyDiseaseClassifier.components.model_holder import ModelHolder
+from kidneyDiseaseClassifier.components.batch_scheduler import BatchScheduler
 
 # Encapsulates the prediction process.
 class PredictionPipeline:
-    def __init__(self, filename) -> None:
+    CLASS_NAMES = ['Normal', 'Tumor']
+
+    def __init__(self, filename=None, model_holder: ModelHolder = None,
+                 batch_scheduler: BatchScheduler = None) -> None:
         self.filename = filename
+        if model_holder is None:
+            model_holder = ModelHolder(config=ConfigurationManager().get_prediction_config())
+        self.model_holder = model_holder
+        self.batch_scheduler = batch_scheduler
+
+    @staticmethod
+    def input_size(model) -> tuple:
+        """The (height, width) a Keras or TFLite model takes its images at, from its input shape."""
+        return tuple(int(size) for size in model.input_shape[1:3])
+
+    def target_size(self, version: str = None) -> tuple:
+        """The (height, width) of the served model, or of a pinned version of it.
+
+        Raises:
+            KeyError: If the requested version is not held in memory.
+        """
+        _, model = self.model_holder.get(version)
+        return self.input_size(model)
+
+    @staticmethod
+    def preprocess(source, target_size: tuple) -> np.ndarray:
+        """Load an image into a (1, height, width, 3) float array in [0, 1].
 
+        The image is resized and scaled exactly as the training input pipelines
+        do; the backbone's own preprocessing is part of the model.
 
-    def predict(self):
-        model = load_model(os.path.join('model', 'model.h5'))
+        Args:
+            source (str | bytes): A path to an image file or the raw encoded image bytes.
+            target_size (tuple): The model's input (height, width), see `input_size`.
 
-        imagename = self.filename
-        test_image = image.load_img(imagename, target_size= (224,224))  
-        test_image = image.img_to_array(test_image)
+        Returns:
+            np.ndarray: The preprocessed image batch.
+        """
+        if isinstance(source, (bytes, bytearray)):
+            # decode straight from memory, no temp file
+            source = io.BytesIO(source)
+        # same steps as keras load_img/img_to_array, without importing TensorFlow
+        with Image.open(source) as img:
+            if img.mode != 'RGB':
+                img = img.convert('RGB')
+            width_height = (target_size[1], target_size[0])
+            if img.size != width_height:
+                img = img.resize(width_height, Image.BILINEAR)
+            test_image = np.asarray(img, dtype=np.float32) / 255.0
         # convert array to row vector
-        test_image = np.expand_dims(test_image, axis=0)
-        # return index of maximum value along each row
-        result = np.argmax(model.predict(test_image), axis=1)
-        print(result)
+        return np.expand_dims(test_image, axis=0)
 
-        if result[0] == 1:
-            prediction = 'Tumor'
-            return [{"image": prediction}]
+    def predict_array(self, test_image: np.ndarray, version: str = None):
+        if self.batch_scheduler is not None:
+            # joins concurrent requests into one forward pass
+            probabilities = self.batch_scheduler.predict(test_image, version=version)
         else:
-            prediction = 'Normal'
-            return [{"image": prediction}]
\ No newline at end of file
+            # the holder keeps the model in memory, so no per-request load
+            _, model = self.model_holder.get(version)
+            probabilities = model.predict(test_image, verbose=0)
+        # return index of maximum value along each row
+        result = np.argmax(probabilities, axis=1)
+        return [{"image": self.CLASS_NAMES[result[0]]}]
+
+    def predict_image(self, image_bytes: bytes, version: str = None):
+        return self.predict_array(self.preprocess(image_bytes, self.target_size(version)), version=version)
+
+    def predict(self, version: str = None):
+        return self.predict_array(self.preprocess(self.filename, self.target_size(version)), version=version)
@@ -0,0 +1,39 @@
+from kidneyDiseaseClassifier.config.configuration import ConfigurationManager
+from kidneyDiseaseClassifier.components.tensor_cache import TensorCache
+from kidneyDiseaseClassifier import logger
+from kidneyDiseaseClassifier.utils.profiling import profile, save_timeline
+
+
+STAGE_NAME = "Tensor Cache"
+
+
+class TensorCachePipeline:
+    def __init__(self):
+        pass
+
+    def main(self):
+        config = ConfigurationManager()
+        tensor_cache_config = config.get_tensor_cache_config()
+        if config.params.DATA_LOADER != "tensor_cache":
+            # the other loaders read the images directly; only the (empty) output directory is left
+            logger.info(f"DATA_LOADER is {config.params.DATA_LOADER}, not building the tensor cache")
+            return
+        tensor_cache = TensorCache(config=tensor_cache_config)
+        with profile("update"):
+            tensor_cache.update()
+
+
+if __name__ == '__main__':
+    try:
+        logger.info("*********************************\n")
+        logger.info(f">>>>>> {STAGE_NAME} started <<<<<<")
+        obj = TensorCachePipeline()
+        with profile(STAGE_NAME):
+            obj.main()
+        logger.info(
+            f">>>>>> {STAGE_NAME} completed <<<<<<<\n **********************************")
+    except Exception as e:
+        logger.exception(e)
+        raise e
+    finally:
+        save_timeline()
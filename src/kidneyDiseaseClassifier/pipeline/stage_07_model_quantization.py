@@ -0,0 +1,39 @@
+from kidneyDiseaseClassifier.config.configuration import ConfigurationManager
+from kidneyDiseaseClassifier.components.model_evaluation_mlflow import Evaluation
+from kidneyDiseaseClassifier.components.model_quantization import ModelQuantization
+from kidneyDiseaseClassifier import logger
+from kidneyDiseaseClassifier.utils.profiling import profile, save_timeline
+
+
+STAGE_NAME = "Model Quantization"
+
+
+class ModelQuantizationPipeline:
+    def __init__(self):
+        pass
+
+    def main(self):
+        config = ConfigurationManager()
+        evaluation = Evaluation(config=config.get_evaluation_config())
+        with profile("valid_generator"):
+            evaluation.valid_generator()
+        quantization_config = config.get_quantization_config()
+        model_quantization = ModelQuantization(config=quantization_config)
+        with profile("quantize"):
+            model_quantization.quantize(evaluation.validation_data)
+
+
+if __name__ == '__main__':
+    try:
+        logger.info("*********************************\n")
+        logger.info(f">>>>>> {STAGE_NAME} started <<<<<<")
+        obj = ModelQuantizationPipeline()
+        with profile(STAGE_NAME):
+            obj.main()
+        logger.info(
+            f">>>>>> {STAGE_NAME} completed <<<<<<<\n **********************************")
+    except Exception as e:
+        logger.exception(e)
+        raise e
+    finally:
+        save_timeline()
@@ -0,0 +1,352 @@
+import os
+import time
+import random
+import argparse
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import replace
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import yaml
+from kidneyDiseaseClassifier import logger
+from kidneyDiseaseClassifier.config.configuration import ConfigurationManager
+
+
+STAGE_NAME = "Hyperparameter Sweep"
+
+# params.yaml keys a trial can override, and the TrainingConfig field each one sets.
+# LEARNING_RATE is applied by recompiling the prepared base model's optimizer.
+TRAINING_PARAMS = {
+    "EPOCHS": "params_epochs",
+    "BATCH_SIZE": "params_batch_size",
+    "AUGMENTATION": "params_is_augmentation",
+    "DATA_LOADER": "params_data_loader",
+    "TRAINING_MODE": "params_training_mode",
+    "FEATURE_NOISE_STDDEV": "params_feature_noise_stddev",
+    "JIT_COMPILE": "params_jit_compile",
+    "STEPS_PER_EXECUTION": "params_steps_per_execution",
+    "EARLY_STOPPING_PATIENCE": "params_early_stopping_patience",
+}
+SWEEP_PARAMS = set(TRAINING_PARAMS) | {"LEARNING_RATE"}
+
+
+def load_spec(spec_path: Path) -> dict:
+    """Reads and checks a sweep spec (see config/sweep.yaml)."""
+    with open(spec_path) as f:
+        spec = yaml.safe_load(f)
+    spec.setdefault("method", "grid")
+    spec.setdefault("metric", "val_accuracy")
+    spec.setdefault("mode", "max")
+    spec.setdefault("pruning", {})
+    if spec["method"] not in ("grid", "random"):
+        raise ValueError(f"Unknown sweep method: {spec['method']}")
+    if spec["mode"] not in ("max", "min"):
+        raise ValueError(f"Unknown sweep mode: {spec['mode']}")
+    unknown = set(spec.get("parameters", {})) - SWEEP_PARAMS
+    if unknown:
+        raise ValueError(f"Parameters that cannot be swept: {', '.join(sorted(unknown))}")
+    return spec
+
+
+def _sample(space, rng: random.Random):
+    if isinstance(space, dict):
+        low, high = float(space["min"]), float(space["max"])
+        if space.get("log"):
+            return float(np.exp(rng.uniform(np.log(low), np.log(high))))
+        return rng.uniform(low, high)
+    return rng.choice(space)
+
+
+def trial_params(spec: dict) -> list:
+    """Expands a spec into the params.yaml overrides of each trial.
+
+    Returns:
+        list: One dict of overrides per trial.
+    """
+    parameters = spec.get("parameters", {})
+    if spec["method"] == "grid":
+        for name, values in parameters.items():
+            if not isinstance(values, list):
+                raise ValueError(f"Grid search needs a list of values for {name}")
+        names = list(parameters)
+        return [dict(zip(names, values)) for values in itertools.product(*parameters.values())]
+
+    rng = random.Random(spec.get("seed"))
+    return [
+        {name: _sample(space, rng) for name, space in parameters.items()}
+        for _ in range(int(spec["num_trials"]))
+    ]
+
+
+class MedianPruner:
+    """Stops trials that are clearly losing, shared by every trial of a sweep.
+
+    Each trial reports its metric after every epoch. After `warmup_epochs`, a
+    trial is pruned when its value is worse than the median of the values the
+    other trials reported at the same epoch, provided at least `min_trials`
+    of them got that far. Reports live in a dict shared across processes, so
+    trials running concurrently prune each other as well as later trials.
+
+    Attributes:
+        history (dict): Per-epoch metric values of each trial, keyed by trial number.
+        metric (str): The Keras log compared across trials.
+        mode (str): "max" if higher values are better, otherwise "min".
+    """
+
+    def __init__(self, history, metric: str, mode: str, enabled: bool = True,
+                 warmup_epochs: int = 1, min_trials: int = 2):
+        self.history = history
+        self.metric = metric
+        self.mode = mode
+        self.enabled = enabled
+        self.warmup_epochs = warmup_epochs
+        self.min_trials = min_trials
+
+    def report(self, trial: int, epoch: int, value: float) -> bool:
+        """Records a trial's value at an epoch.
+
+        Returns:
+            bool: Whether the trial should stop.
+        """
+        # only the trial itself writes its entry, so read-modify-write is safe
+        self.history[trial] = list(self.history.get(trial, [])) + [value]
+        if not self.enabled or epoch < self.warmup_epochs:
+            return False
+        others = [
+            values[epoch] for other, values in self.history.items()
+            if other != trial and len(values) > epoch
+        ]
+        if len(others) < self.min_trials:
+            return False
+        median = float(np.median(others))
+        return value < median if self.mode == "max" else value > median
+
+
+def _pruning_callback(pruner: MedianPruner, trial: int):
+    import tensorflow as tf
+
+    class PruningCallback(tf.keras.callbacks.Callback):
+        def __init__(self):
+            super().__init__()
+            self.pruned_at = None
+
+        def on_epoch_end(self, epoch, logs=None):
+            value = (logs or {}).get(pruner.metric)
+            if value is not None and pruner.report(trial, epoch, float(value)):
+                logger.info(f"Trial {trial} pruned after epoch {epoch + 1}: {pruner.metric}={value:.4f}")
+                self.pruned_at = epoch + 1
+                self.model.stop_training = True
+
+    return PruningCallback()
+
+
+def _init_worker(threads: int):
+    """Limits the CPU threads of a trial process before TensorFlow starts its thread pools."""
+    for name in ("OMP_NUM_THREADS", "TF_NUM_INTRAOP_THREADS"):
+        os.environ[name] = str(threads)
+    os.environ["TF_NUM_INTEROP_THREADS"] = str(min(2, threads))
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(min(2, threads))
+
+
+def _training(params: dict):
+    """A Training object for the prepared base model with a trial's params applied."""
+    from kidneyDiseaseClassifier.components.model_training import Training
+
+    config = ConfigurationManager().get_training_config()
+    config = replace(config, **{TRAINING_PARAMS[name]: value for name, value in params.items() if name in TRAINING_PARAMS})
+    # concurrent trials must not resume from, or overwrite, each other's checkpoints
+    config = replace(config, params_checkpoint_every_epochs=0)
+    training = Training(config=config)
+    training.get_base_model()
+    if "LEARNING_RATE" in params:
+        optimizer_config = {**training.model.optimizer.get_config(), "learning_rate": float(params["LEARNING_RATE"])}
+        Training._compile(
+            training.model,
+            jit_compile=config.params_jit_compile,
+            steps_per_execution=config.params_steps_per_execution,
+            optimizer=training.model.optimizer.__class__.from_config(optimizer_config)
+        )
+    training.train_valid_generator()
+    return training
+
+
+def _warm_feature_cache(params: dict):
+    """Computes the cached backbone features once, before trials that train on them start."""
+    from kidneyDiseaseClassifier.components.feature_cache import split_backbone_head
+
+    training = _training(params)
+    backbone, _ = split_backbone_head(training.model)
+    training.cached_features(backbone)
+
+
+def _logged_params(config, params: dict) -> dict:
+    """The training params a trial ran with, including the swept ones."""
+    logged = {name: getattr(config, field) for name, field in TRAINING_PARAMS.items()}
+    logged.update(params)
+    return logged
+
+
+def _run_trial(trial: int, params: dict, pruner: MedianPruner, tracking_uri: str, experiment_id: str) -> dict:
+    """Trains one trial without saving the model and records it in MLflow.
+
+    Returns:
+        dict: The trial's params, status, best and last metric values, epochs run and duration.
+    """
+    from mlflow.entities import Metric, Param, RunTag
+    from mlflow.tracking import MlflowClient
+
+    client = MlflowClient(tracking_uri=tracking_uri)
+    run = client.create_run(experiment_id, run_name=f"trial-{trial:03d}", tags={"trial": str(trial)})
+    run_id = run.info.run_id
+    result = {"trial": trial, **params, "status": "failed", "best": None, "last": None,
+              "epochs": 0, "seconds": 0.0, "run_id": run_id}
+    start = time.perf_counter()
+    try:
+        training = _training(params)
+        callback = _pruning_callback(pruner, trial)
+        history = training.fit(callback_list=[callback])
+
+        values = history.history.get(pruner.metric, [])
+        best = (max if pruner.mode == "max" else min)(values) if values else None
+        result.update(
+            status="pruned" if callback.pruned_at else "completed",
+            best=best,
+            last=values[-1] if values else None,
+            epochs=len(history.epoch)
+        )
+        timestamp = int(time.time() * 1000)
+        client.log_batch(
+            run_id,
+            metrics=[
+                Metric(name, float(value), timestamp, step)
+                for name, epoch_values in history.history.items()
+                for step, value in enumerate(epoch_values)
+            ] + ([Metric(f"best_{pruner.metric}", float(best), timestamp, 0)] if best is not None else []),
+            params=[Param(name, str(value)) for name, value in _logged_params(training.config, params).items()],
+            tags=[RunTag("status", result["status"])]
+        )
+    except Exception as e:
+        logger.exception(e)
+        result["error"] = str(e)
+    result["seconds"] = time.perf_counter() - start
+    client.set_terminated(run_id, status="FAILED" if result["status"] == "failed" else "FINISHED")
+    return result
+
+
+def summarize(results: list, spec: dict) -> pd.DataFrame:
+    """Orders the trials best first; failed trials come last."""
+    table = pd.DataFrame(results).drop(columns=["run_id", "error"], errors="ignore")
+    return table.sort_values(
+        "best", ascending=spec["mode"] == "min", na_position="last"
+    ).reset_index(drop=True)
+
+
+def run_sweep(spec_path: Path = None, workers: int = None, threads_per_trial: int = None, top: int = 5) -> pd.DataFrame:
+    """Runs every trial of a sweep in a process pool and writes the summary.
+
+    Trials start from the base model prepared by stage 02 and read the
+    dataset through the ingestion manifest; the tensor and feature caches are
+    shared, so no trial re-prepares the model or re-reads images the caches
+    already hold. Each worker process limits TensorFlow to its share of the
+    CPUs, and workers are spawned rather than forked, since TensorFlow's
+    runtime does not survive a fork.
+
+    Args:
+        spec_path (Path, optional): The sweep spec. Defaults to `spec_path` in config.yaml.
+        workers (int, optional): Trials run at once. Defaults to the configured value.
+        threads_per_trial (int, optional): CPU threads per trial. Defaults to the configured value.
+        top (int, optional): The number of trials shown in the logged summary. Defaults to 5.
+
+    Returns:
+        pd.DataFrame: The trials ordered best first, also written to the sweep directory as CSV.
+    """
+    from mlflow.tracking import MlflowClient
+
+    config_manager = ConfigurationManager()
+    config = config_manager.get_sweep_config()
+    spec = load_spec(spec_path or config.spec_path)
+    workers = workers or config.workers
+    threads_per_trial = threads_per_trial or config.threads_per_trial
+    trials = trial_params(spec)
+
+    sweep_id = f"{datetime.now():%Y%m%d-%H%M%S}"
+    sweep_dir = config.root_dir / sweep_id
+    sweep_dir.mkdir(parents=True, exist_ok=True)
+    with open(sweep_dir / "spec.yaml", "w") as f:
+        yaml.safe_dump(spec, f)
+
+    config.tracking_dir.mkdir(parents=True, exist_ok=True)
+    tracking_uri = config.tracking_dir.resolve().as_uri()
+    # created here so concurrent trials never race to create it
+    experiment_id = MlflowClient(tracking_uri=tracking_uri).create_experiment(f"sweep-{sweep_id}")
+    logger.info(
+        f"Sweep {sweep_id}: {len(trials)} trials, {workers} at a time with {threads_per_trial} threads each, "
+        f"tracked in {tracking_uri}"
+    )
+
+    context = multiprocessing.get_context("spawn")
+    with context.Manager() as manager, ProcessPoolExecutor(
+        max_workers=workers, mp_context=context, initializer=_init_worker, initargs=(threads_per_trial,)
+    ) as executor:
+        pruning = spec["pruning"]
+        pruner = MedianPruner(
+            manager.dict(), spec["metric"], spec["mode"],
+            enabled=pruning.get("enabled", True),
+            warmup_epochs=int(pruning.get("warmup_epochs", 1)),
+            min_trials=int(pruning.get("min_trials", 2))
+        )
+
+        default_mode = config_manager.params.TRAINING_MODE
+        cached = [trial for trial in trials if trial.get("TRAINING_MODE", default_mode) == "cached_features"]
+        if cached:
+            # one process fills the feature cache; the trials then only read it
+            executor.submit(_warm_feature_cache, cached[0]).result()
+
+        futures = [
+            executor.submit(_run_trial, trial, overrides, pruner, tracking_uri, experiment_id)
+            for trial, overrides in enumerate(trials)
+        ]
+        results = []
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            logger.info(
+                f"Trial {result['trial']} {result['status']} after {result['epochs']} epochs "
+                f"in {result['seconds']:.1f}s: best {spec['metric']}={result['best']}"
+            )
+
+    table = summarize(results, spec)
+    table.to_csv(sweep_dir / "summary.csv", index=False)
+    logger.info(f"Best {min(top, len(table))} of {len(table)} trials by {spec['metric']}:\n"
+                f"{table.head(top).to_string(index=False)}")
+    logger.info(f"Sweep summary written to {sweep_dir / 'summary.csv'}")
+    return table
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="kidney-sweep",
+        description="Run a grid or random hyperparameter search over params.yaml training params."
+    )
+    parser.add_argument("--spec", type=Path, default=None, help="Sweep spec. Defaults to sweep.spec_path in config.yaml.")
+    parser.add_argument("--workers", type=int, default=None, help="Trials run at once.")
+    parser.add_argument("--threads-per-trial", type=int, default=None, help="CPU threads per trial.")
+    parser.add_argument("--top", type=int, default=5, help="Trials shown in the summary table.")
+    args = parser.parse_args(argv)
+
+    try:
+        logger.info(f">>>>>> {STAGE_NAME} started <<<<<<")
+        run_sweep(args.spec, args.workers, args.threads_per_trial, args.top)
+        logger.info(f">>>>>> {STAGE_NAME} completed <<<<<<<")
+    except Exception as e:
+        logger.exception(e)
+        raise e
+
+
+if __name__ == "__main__":
+    main()
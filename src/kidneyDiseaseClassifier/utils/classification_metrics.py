@@ -0,0 +1,69 @@
+import numpy as np
+
+
+def roc_auc(scores: np.ndarray, positives: np.ndarray):
+    """Compute the one-vs-rest ROC-AUC from the rank-sum (Mann-Whitney U) statistic.
+
+    Args:
+        scores (np.ndarray): The predicted probability of the positive class for each sample.
+        positives (np.ndarray): Boolean mask of the samples that belong to the positive class.
+
+    Returns:
+        float: The area under the ROC curve, or None when only one class is present.
+    """
+    n_pos = int(positives.sum())
+    n_neg = len(scores) - n_pos
+    if n_pos == 0 or n_neg == 0:
+        return None
+
+    # Average ranks over ties so equal scores count as half a win
+    order = np.argsort(scores, kind="mergesort")
+    _, inverse, counts = np.unique(scores[order], return_inverse=True, return_counts=True)
+    average_ranks = np.cumsum(counts) - (counts - 1) / 2
+    ranks = np.empty(len(scores), dtype=np.float64)
+    ranks[order] = average_ranks[inverse]
+
+    return float((ranks[positives].sum() - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg))
+
+
+def classification_metrics(probabilities: np.ndarray, labels: np.ndarray, class_names: list) -> dict:
+    """Compute every evaluation metric from one pass of predictions.
+
+    Args:
+        probabilities (np.ndarray): Softmax outputs shaped (n_samples, n_classes).
+        labels (np.ndarray): One-hot labels shaped (n_samples, n_classes).
+        class_names (list): The class name for each column.
+
+    Returns:
+        dict: Loss, accuracy, confusion matrix (rows are true classes), and per-class
+            precision, recall and ROC-AUC.
+    """
+    num_classes = probabilities.shape[1]
+    y_true = np.argmax(labels, axis=1)
+    y_pred = np.argmax(probabilities, axis=1)
+
+    # Same clipping as tf.keras.losses.CategoricalCrossentropy
+    clipped = np.clip(probabilities, 1e-7, 1 - 1e-7)
+    loss = float(np.mean(-np.sum(labels * np.log(clipped), axis=1)))
+    accuracy = float(np.mean(y_true == y_pred))
+
+    confusion = np.bincount(y_true * num_classes + y_pred, minlength=num_classes ** 2)
+    confusion = confusion.reshape(num_classes, num_classes)
+    true_positives = np.diag(confusion)
+    predicted = confusion.sum(axis=0)
+    actual = confusion.sum(axis=1)
+    precision = np.divide(true_positives, predicted, out=np.zeros(num_classes), where=predicted > 0)
+    recall = np.divide(true_positives, actual, out=np.zeros(num_classes), where=actual > 0)
+
+    aucs = {name: roc_auc(probabilities[:, i], y_true == i) for i, name in enumerate(class_names)}
+    valid_aucs = [auc for auc in aucs.values() if auc is not None]
+
+    return {
+        "loss": loss,
+        "accuracy": accuracy,
+        "confusion_matrix": confusion.tolist(),
+        "precision": dict(zip(class_names, precision.tolist())),
+        "recall": dict(zip(class_names, recall.tolist())),
+        "roc_auc": aucs,
+        "macro_roc_auc": float(np.mean(valid_aucs)) if valid_aucs else None,
+    }
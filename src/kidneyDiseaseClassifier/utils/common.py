@@ -3,12 +3,12 @@ from box.exceptions import BoxValueError
 import yaml
 from kidneyDiseaseClassifier import logger
 import json
-import joblib
 from ensure import ensure_annotations
 from box import ConfigBox
 from pathlib import Path
 from typing import Any
 import base64
+import hashlib
 
 
 @ensure_annotations
@@ -107,6 +107,7 @@ def save_bin(data: Any, path: Path):
         data (Any): data to be saved as binary
         path (Path): path where the binary file will be saved.
     """
+    import joblib
     joblib.dump(value=data, filename=path)
     logger.info(f"Binary file saved at: {path}")
 
@@ -131,6 +132,7 @@ def load_bin(path: Path) -> Any:
     if not path.exists():
         raise FileNotFoundError(f"File not found at: {path}")
 
+    import joblib
     try:
         data = joblib.load(path)
         logger.info(f"Binary file loaded from: {path}")
@@ -153,6 +155,24 @@ def get_size(path: Path) -> str:
     return f"~{size_in_kb} KB"
 
 
+@ensure_annotations
+def get_file_hash(path: Path, algorithm: str = "sha256") -> str:
+    """Compute the hex digest of a file's content, reading it in chunks.
+
+    Args:
+        path (Path): The path to the file.
+        algorithm (str, optional): A hashlib algorithm name. Defaults to "sha256".
+
+    Returns:
+        str: The hex digest of the file.
+    """
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 def decodeImage(imageString, fileName):
     """
     Decode a base64-encoded image string and save it to a file.
@@ -170,6 +190,19 @@ def decodeImage(imageString, fileName):
         f.close()
 
 
+def decodeImageToBytes(imageString):
+    """
+    Decode a base64-encoded image string into raw image bytes in memory.
+
+    Parameters:
+        imageString (str): A base64-encoded image string.
+
+    Returns:
+        bytes: The decoded image data.
+    """
+    return base64.b64decode(imageString)
+
+
 def encodeImageIntoBase64(imagePath):
     """Encode an image file into base64 format.
 
@@ -0,0 +1,191 @@
+import os
+import sys
+import json
+import time
+import resource
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from kidneyDiseaseClassifier import logger
+
+
+def _io_counters() -> tuple:
+    """Bytes this process read from and wrote to storage so far.
+
+    Uses /proc/self/io where available and falls back to the block counts of
+    getrusage, which count 512-byte blocks.
+    """
+    try:
+        with open("/proc/self/io") as f:
+            counters = dict(line.split(": ") for line in f.read().splitlines())
+        return int(counters["read_bytes"]), int(counters["write_bytes"])
+    except (OSError, KeyError, ValueError):
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return usage.ru_inblock * 512, usage.ru_oublock * 512
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _sample() -> dict:
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    read_bytes, write_bytes = _io_counters()
+    return {
+        "wall": time.perf_counter(),
+        "cpu": time.process_time(),
+        "child_cpu": children.ru_utime + children.ru_stime,
+        "peak_rss_mb": _peak_rss_mb(),
+        "read_bytes": read_bytes,
+        "write_bytes": write_bytes,
+    }
+
+
+class Profiler:
+    """Records wall time, CPU time, peak RSS and storage I/O of nested named sections.
+
+    Sections nest per thread, so "Training" > "fit" > "epoch 1" is recorded
+    with its path. CPU time covers every thread of the process, plus child
+    processes that finished during the section (e.g. the extraction pool).
+    Peak RSS is the process high-water mark when the section ends, and
+    `peak_rss_growth_mb` is how far the section raised it.
+
+    Attributes:
+        run_id (str): Identifies the run in the timeline file name.
+        sections (list): The finished sections, in the order they ended.
+    """
+
+    def __init__(self, run_id: str = None):
+        self.run_id = run_id or f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}"
+        self.sections = []
+        self._origin = time.perf_counter()
+        self._started = datetime.now().isoformat(timespec="seconds")
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self) -> list:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def section(self, name: str):
+        """Times the enclosed block as a section nested under any open section of this thread."""
+        stack = self._stack()
+        stack.append(name)
+        start = _sample()
+        try:
+            yield
+        finally:
+            end = _sample()
+            path = "/".join(stack)
+            stack.pop()
+            record = {
+                "name": name,
+                "path": path,
+                "depth": len(stack),
+                "thread": threading.get_ident(),
+                "start_seconds": start["wall"] - self._origin,
+                "wall_seconds": end["wall"] - start["wall"],
+                "cpu_seconds": end["cpu"] - start["cpu"],
+                "child_cpu_seconds": end["child_cpu"] - start["child_cpu"],
+                "peak_rss_mb": end["peak_rss_mb"],
+                "peak_rss_growth_mb": end["peak_rss_mb"] - start["peak_rss_mb"],
+                "read_bytes": end["read_bytes"] - start["read_bytes"],
+                "write_bytes": end["write_bytes"] - start["write_bytes"],
+            }
+            with self._lock:
+                self.sections.append(record)
+            logger.info(
+                f"[profile] {path}: {record['wall_seconds']:.2f}s wall, {record['cpu_seconds']:.2f}s cpu, "
+                f"peak RSS {record['peak_rss_mb']:.0f} MB, read {record['read_bytes'] / 1e6:.1f} MB, "
+                f"wrote {record['write_bytes'] / 1e6:.1f} MB"
+            )
+
+    def timeline(self) -> dict:
+        """The sections as a Chrome trace, viewable in chrome://tracing or Perfetto."""
+        with self._lock:
+            sections = sorted(self.sections, key=lambda s: s["start_seconds"])
+        events = [
+            {
+                "name": section["name"],
+                "ph": "X",
+                "ts": section["start_seconds"] * 1e6,
+                "dur": section["wall_seconds"] * 1e6,
+                "pid": os.getpid(),
+                "tid": section["thread"],
+                "args": {key: value for key, value in section.items() if key not in ("name", "thread")},
+            }
+            for section in sections
+        ]
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"run_id": self.run_id, "started": self._started, "argv": sys.argv},
+        }
+
+    def save(self, root_dir: Path) -> Path:
+        """Writes the timeline to `root_dir/<run_id>.json`.
+
+        Returns:
+            Path: The timeline file.
+        """
+        root_dir = Path(root_dir)
+        root_dir.mkdir(parents=True, exist_ok=True)
+        path = root_dir / f"{self.run_id}.json"
+        tmp_path = root_dir / f".{self.run_id}.json.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.timeline(), f, indent=1)
+        os.replace(tmp_path, path)
+        logger.info(f"Profiling timeline written to {path}")
+        return path
+
+
+_profiler = Profiler()
+
+
+def get_profiler() -> Profiler:
+    """Returns the profiler shared by every stage in this process."""
+    return _profiler
+
+
+def profile(name: str):
+    """Records the enclosed block as a section of the process-wide profiler.
+
+    Example:
+        with profile("download"):
+            data_ingestion.download_file()
+    """
+    return _profiler.section(name)
+
+
+def save_timeline() -> Path:
+    """Writes this process's timeline to the directory configured under `profiling` in config.yaml."""
+    from kidneyDiseaseClassifier.config.configuration import ConfigurationManager
+    return _profiler.save(ConfigurationManager().get_profiling_config().root_dir)
+
+
+def epoch_profiler_callback():
+    """A Keras callback recording each training epoch as a profiler section."""
+    import tensorflow as tf
+
+    state = {}
+
+    def on_epoch_begin(epoch, logs=None):
+        state["section"] = profile(f"epoch {epoch + 1}")
+        state["section"].__enter__()
+
+    def on_epoch_end(epoch, logs=None):
+        state.pop("section").__exit__(None, None, None)
+
+    def on_train_end(logs=None):
+        # close an epoch cut short by an exception or a callback stopping training
+        if "section" in state:
+            state.pop("section").__exit__(None, None, None)
+
+    return tf.keras.callbacks.LambdaCallback(
+        on_epoch_begin=on_epoch_begin, on_epoch_end=on_epoch_end, on_train_end=on_train_end
+    )
@@ -0,0 +1,120 @@
+import time
+import numpy as np
+import pytest
+from kidneyDiseaseClassifier.components.batch_scheduler import BatchScheduler
+
+
+class FakeModel:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.batch_sizes = []
+
+    def predict(self, batch, verbose=0):
+        self.batch_sizes.append(len(batch))
+        if self.fail:
+            raise RuntimeError("model failed")
+        return batch * 10
+
+
+class FakeHolder:
+    def __init__(self, **models):
+        self.models = models
+
+    def get(self, version=None):
+        version = version or "current"
+        return version, self.models[version]
+
+
+def images(*values):
+    return np.array(values, dtype=np.float32).reshape(-1, 1)
+
+
+def queued(scheduler, *requests):
+    """Submits requests before the worker starts, so they are batched in a known order."""
+    return [scheduler.submit(images(*values), version=version) for values, version in requests]
+
+
+def test_request_that_would_overflow_starts_the_next_batch():
+    model = FakeModel()
+    scheduler = BatchScheduler(FakeHolder(current=model), max_batch_size=4, max_wait_ms=50)
+    futures = queued(scheduler, ((1, 2, 3), None), ((4, 5), None), ((6,), None))
+    scheduler.start()
+    results = [future.result(timeout=5) for future in futures]
+    scheduler.stop()
+
+    assert model.batch_sizes == [3, 3]
+    assert [result.ravel().tolist() for result in results] == [[10, 20, 30], [40, 50], [60]]
+
+
+def test_oversized_request_runs_on_its_own():
+    model = FakeModel()
+    scheduler = BatchScheduler(FakeHolder(current=model), max_batch_size=2, max_wait_ms=50)
+    futures = queued(scheduler, ((1,), None), ((2, 3, 4), None))
+    scheduler.start()
+    results = [future.result(timeout=5) for future in futures]
+    scheduler.stop()
+
+    assert model.batch_sizes == [1, 3]
+    assert results[1].ravel().tolist() == [20, 30, 40]
+
+
+def test_max_wait_flushes_a_partial_batch():
+    model = FakeModel()
+    scheduler = BatchScheduler(FakeHolder(current=model), max_batch_size=8, max_wait_ms=20)
+    scheduler.start()
+    start = time.monotonic()
+    result = scheduler.predict(images(1))
+    waited = time.monotonic() - start
+    scheduler.stop()
+
+    assert result.ravel().tolist() == [10]
+    assert model.batch_sizes == [1]
+    assert 0.015 <= waited < 2
+
+
+def test_requests_are_grouped_per_model_version():
+    current, pinned = FakeModel(), FakeModel()
+    scheduler = BatchScheduler(FakeHolder(current=current, pinned=pinned), max_batch_size=8, max_wait_ms=20)
+    futures = queued(scheduler, ((1,), None), ((2, 3), "pinned"), ((4,), None))
+    scheduler.start()
+    results = [future.result(timeout=5) for future in futures]
+    scheduler.stop()
+
+    assert current.batch_sizes == [2]
+    assert pinned.batch_sizes == [2]
+    assert [result.ravel().tolist() for result in results] == [[10], [20, 30], [40]]
+    assert scheduler.stats()["batch_size_histogram"] == {2: 2}
+
+
+def test_model_error_reaches_every_request_in_its_group():
+    scheduler = BatchScheduler(FakeHolder(current=FakeModel(), broken=FakeModel(fail=True)),
+                               max_batch_size=8, max_wait_ms=20)
+    futures = queued(scheduler, ((1,), "broken"), ((2,), None), ((3,), "broken"))
+    scheduler.start()
+    for index in (0, 2):
+        with pytest.raises(RuntimeError, match="model failed"):
+            futures[index].result(timeout=5)
+    assert futures[1].result(timeout=5).ravel().tolist() == [20]
+    scheduler.stop()
+
+
+def test_unknown_version_fails_only_its_requests():
+    scheduler = BatchScheduler(FakeHolder(current=FakeModel()), max_batch_size=8, max_wait_ms=20)
+    futures = queued(scheduler, ((1,), "evicted"), ((2,), None))
+    scheduler.start()
+    with pytest.raises(KeyError):
+        futures[0].result(timeout=5)
+    assert futures[1].result(timeout=5).ravel().tolist() == [20]
+    scheduler.stop()
+
+
+def test_stop_serves_requests_already_queued():
+    model = FakeModel()
+    scheduler = BatchScheduler(FakeHolder(current=model), max_batch_size=4, max_wait_ms=1000)
+    futures = queued(scheduler, ((1, 2, 3), None), ((4, 5), None))
+    scheduler.start()
+    scheduler.stop()
+
+    assert all(future.done() for future in futures)
+    assert [future.result().ravel().tolist() for future in futures] == [[10, 20, 30], [40, 50]]
+    assert model.batch_sizes == [3, 2]
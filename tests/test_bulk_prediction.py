@@ -0,0 +1,67 @@
+import csv
+import json
+import pytest
+from kidneyDiseaseClassifier.pipeline.bulk_prediction import (
+    PROB_FIELDS, ResultWriter, drop_partial_row, read_completed
+)
+
+
+def row(path: str) -> dict:
+    return {"path": path, "prediction": "Tumor", "error": "", **{field: 0.25 for field in PROB_FIELDS}}
+
+
+def read_rows(output, output_format) -> list:
+    with open(output, newline="") as f:
+        if output_format == "csv":
+            return list(csv.DictReader(f))
+        return [json.loads(line) for line in f]
+
+
+@pytest.mark.parametrize("output_format", ["csv", "ndjson"])
+@pytest.mark.parametrize("cut", [1, 8, 18])
+def test_resume_after_a_run_killed_mid_row(tmp_path, output_format, cut):
+    output = tmp_path / f"predictions.{output_format}"
+    writer = ResultWriter(output, output_format)
+    writer.write([row("a.jpg"), row("b.jpg"), row("c.jpg")])
+    writer.close()
+
+    # the run was killed while writing c.jpg's row
+    data = output.read_bytes()
+    last_row = data.rstrip(b"\n").rfind(b"\n") + 1
+    output.write_bytes(data[:last_row + cut])
+
+    assert drop_partial_row(output)
+    assert not drop_partial_row(output)
+    assert read_completed(output, output_format) == {"a.jpg", "b.jpg"}
+
+    writer = ResultWriter(output, output_format)
+    writer.write([row("c.jpg")])
+    writer.close()
+    assert [r["path"] for r in read_rows(output, output_format)] == ["a.jpg", "b.jpg", "c.jpg"]
+    assert read_completed(output, output_format) == {"a.jpg", "b.jpg", "c.jpg"}
+
+
+def test_torn_csv_rows_are_not_counted_as_scored(tmp_path):
+    output = tmp_path / "predictions.csv"
+    writer = ResultWriter(output, "csv")
+    writer.write([row("a.jpg"), {"path": "b.jpg", "prediction": "", "error": "OSError: truncated"}])
+    writer.close()
+    with open(output, "a") as f:
+        f.write("c.jpg,Tum\n")
+        f.write("d.jpg,Tumor," + ",".join("0.25" for _ in PROB_FIELDS) + "\n")
+
+    assert read_completed(output, "csv") == {"a.jpg"}
+
+
+def test_unparsable_json_lines_are_retried(tmp_path):
+    output = tmp_path / "predictions.ndjson"
+    output.write_text(json.dumps(row("a.jpg")) + "\n" + '{"path": "b.jpg", "predic\n')
+    assert read_completed(output, "ndjson") == {"a.jpg"}
+
+
+def test_a_cut_header_leaves_an_empty_file(tmp_path):
+    output = tmp_path / "predictions.csv"
+    output.write_text("path,predic")
+    assert drop_partial_row(output)
+    assert output.read_text() == ""
+    assert read_completed(output, "csv") == set()
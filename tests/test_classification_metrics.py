@@ -0,0 +1,76 @@
+import math
+import numpy as np
+import pytest
+from kidneyDiseaseClassifier.utils.classification_metrics import roc_auc, classification_metrics
+
+
+def one_hot(classes, num_classes):
+    return np.eye(num_classes)[classes]
+
+
+def test_roc_auc_counts_tied_scores_as_half_a_win():
+    scores = np.array([0.1, 0.4, 0.4, 0.8])
+    positives = np.array([False, True, False, True])
+    # positive 0.4 beats 0.1 and ties 0.4, positive 0.8 beats both: (1 + 0.5 + 1 + 1) / 4
+    assert roc_auc(scores, positives) == pytest.approx(0.875)
+    assert roc_auc(np.full(4, 0.3), positives) == pytest.approx(0.5)
+
+
+def test_roc_auc_of_perfect_and_inverted_rankings():
+    scores = np.array([0.9, 0.8, 0.2, 0.1])
+    assert roc_auc(scores, np.array([True, True, False, False])) == pytest.approx(1.0)
+    assert roc_auc(scores, np.array([False, False, True, True])) == pytest.approx(0.0)
+
+
+def test_roc_auc_needs_both_classes():
+    scores = np.array([0.2, 0.7])
+    assert roc_auc(scores, np.array([True, True])) is None
+    assert roc_auc(scores, np.array([False, False])) is None
+
+
+def test_confusion_matrix_rows_are_true_classes():
+    labels = one_hot([0, 0, 0, 1], 2)
+    probabilities = np.array([[0.9, 0.1], [0.4, 0.6], [0.3, 0.7], [0.2, 0.8]])
+    metrics = classification_metrics(probabilities, labels, ["Normal", "Tumor"])
+
+    assert metrics["confusion_matrix"] == [[1, 2], [0, 1]]
+    assert metrics["accuracy"] == pytest.approx(0.5)
+    assert metrics["precision"] == pytest.approx({"Normal": 1.0, "Tumor": 1 / 3})
+    assert metrics["recall"] == pytest.approx({"Normal": 1 / 3, "Tumor": 1.0})
+    # the Tumor sample has a higher Tumor probability than every Normal sample, though two are misclassified
+    assert metrics["roc_auc"]["Tumor"] == pytest.approx(1.0)
+
+
+def test_a_class_never_predicted_has_zero_precision():
+    labels = one_hot([0, 0, 1, 1, 2], 3)
+    probabilities = np.array([
+        [0.6, 0.3, 0.1],
+        [0.3, 0.6, 0.1],
+        [0.2, 0.7, 0.1],
+        [0.5, 0.4, 0.1],
+        [0.5, 0.2, 0.3],
+    ])
+    metrics = classification_metrics(probabilities, labels, ["a", "b", "c"])
+
+    assert metrics["confusion_matrix"] == [[1, 1, 0], [1, 1, 0], [1, 0, 0]]
+    assert metrics["precision"] == pytest.approx({"a": 1 / 3, "b": 1 / 2, "c": 0.0})
+    assert metrics["recall"] == pytest.approx({"a": 1 / 2, "b": 1 / 2, "c": 0.0})
+    assert metrics["accuracy"] == pytest.approx(0.4)
+    # c's only sample has the highest c probability
+    assert metrics["roc_auc"]["c"] == pytest.approx(1.0)
+
+
+def test_loss_is_the_mean_categorical_crossentropy():
+    labels = one_hot([0, 1], 2)
+    probabilities = np.array([[0.5, 0.5], [0.25, 0.75]])
+    metrics = classification_metrics(probabilities, labels, ["Normal", "Tumor"])
+    assert metrics["loss"] == pytest.approx((-math.log(0.5) - math.log(0.75)) / 2)
+
+
+def test_single_class_has_no_roc_auc():
+    labels = one_hot([1, 1, 1], 2)
+    probabilities = np.array([[0.2, 0.8], [0.6, 0.4], [0.1, 0.9]])
+    metrics = classification_metrics(probabilities, labels, ["Normal", "Tumor"])
+    assert metrics["roc_auc"] == {"Normal": None, "Tumor": None}
+    assert metrics["macro_roc_auc"] is None
+    assert metrics["precision"]["Normal"] == 0.0
@@ -0,0 +1,118 @@
+import yaml
+import pytest
+from kidneyDiseaseClassifier.pipeline.dag_runner import DagRunner
+
+
+PIPELINE = "python src/kidneyDiseaseClassifier/pipeline"
+STAGES = {
+    "data_ingestion": {
+        "cmd": f"{PIPELINE}/stage_01_data_ingestion.py",
+        "deps": ["raw.txt"],
+        "params": ["IMAGE_SIZE"],
+        "outs": ["data"],
+    },
+    "training": {
+        "cmd": f"{PIPELINE}/stage_03_model_training.py",
+        "deps": ["data/images", "config.yaml"],
+        "params": ["EPOCHS"],
+        "outs": ["model.h5"],
+    },
+    "evaluation": {
+        "cmd": f"{PIPELINE}/stage_04_model_evaluation.py",
+        "deps": ["model.h5"],
+        "metrics": [{"scores.json": {"cache": False}}],
+    },
+    "tensor_cache": {
+        "cmd": f"{PIPELINE}/stage_06_tensor_cache.py",
+        "deps": ["raw.txt"],
+        "outs": ["cache"],
+    },
+}
+
+
+class FakePipeline:
+    """Stands in for a stage's pipeline class and writes the stage's outputs."""
+
+    runs = []
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def main(self):
+        FakePipeline.runs.append(self.stage.name)
+        for out in self.stage.outs:
+            with open(out, "w") as f:
+                f.write(self.stage.name)
+
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "dvc.yaml").write_text(yaml.safe_dump({"stages": STAGES}, sort_keys=False))
+    (tmp_path / "params.yaml").write_text(yaml.safe_dump({"IMAGE_SIZE": [224, 224, 3], "EPOCHS": 1, "BATCH_SIZE": 16}))
+    (tmp_path / "raw.txt").write_text("raw")
+    (tmp_path / "config.yaml").write_text("config")
+    monkeypatch.setattr("kidneyDiseaseClassifier.pipeline.dag_runner.Stage.pipeline", lambda stage: FakePipeline(stage))
+    FakePipeline.runs = []
+    return DagRunner()
+
+
+def test_upstream_follows_outputs_into_dependencies(runner):
+    assert runner.upstream == {
+        "data_ingestion": set(),
+        "training": {"data_ingestion"},
+        "evaluation": {"training"},
+        "tensor_cache": set(),
+    }
+
+
+def test_selected_adds_upstream_stages_in_dvc_order(runner):
+    assert runner.selected() == list(STAGES)
+    assert runner.selected(["evaluation"]) == ["data_ingestion", "training", "evaluation"]
+    assert runner.selected(["tensor_cache", "data_ingestion"]) == ["data_ingestion", "tensor_cache"]
+    with pytest.raises(ValueError):
+        runner.selected(["deployment"])
+
+
+def test_stage_hash_covers_deps_and_own_params_only(runner, tmp_path):
+    stage = runner.stages["data_ingestion"]
+    before = runner.stage_hash(stage)
+
+    (tmp_path / "params.yaml").write_text(yaml.safe_dump({"IMAGE_SIZE": [224, 224, 3], "EPOCHS": 5, "BATCH_SIZE": 32}))
+    assert runner.stage_hash(stage) == before
+
+    (tmp_path / "params.yaml").write_text(yaml.safe_dump({"IMAGE_SIZE": [128, 128, 3], "EPOCHS": 5}))
+    assert runner.stage_hash(stage) != before
+
+    (tmp_path / "params.yaml").write_text(yaml.safe_dump({"IMAGE_SIZE": [224, 224, 3]}))
+    (tmp_path / "raw.txt").write_text("new raw data")
+    assert runner.stage_hash(stage) != before
+
+
+def test_unchanged_stages_are_skipped(runner, tmp_path):
+    assert runner.run(targets=["training"]) == {"data_ingestion": "ran", "training": "ran"}
+    assert FakePipeline.runs == ["data_ingestion", "training"]
+
+    # a new runner reads the recorded hashes back
+    runner = DagRunner()
+    assert runner.run(targets=["training"]) == {"data_ingestion": "skipped", "training": "skipped"}
+    assert runner.run(targets=["training"], force=True) == {"data_ingestion": "ran", "training": "ran"}
+
+
+def test_dry_run_marks_everything_below_a_changed_stage(runner, tmp_path):
+    runner.run()
+    assert set(runner.run(dry_run=True).values()) == {"up to date"}
+
+    (tmp_path / "config.yaml").write_text("changed")
+    assert runner.run(dry_run=True) == {
+        "data_ingestion": "up to date",
+        "training": "would run",
+        "evaluation": "would run",
+        "tensor_cache": "up to date",
+    }
+
+
+def test_missing_output_reruns_the_stage(runner, tmp_path):
+    runner.run(targets=["tensor_cache"])
+    (tmp_path / "cache").unlink()
+    assert runner.run(targets=["tensor_cache"]) == {"tensor_cache": "ran"}
@@ -0,0 +1,133 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from kidneyDiseaseClassifier.components.data_ingestion import DataIngestion
+
+
+CONTENT = bytes(range(256)) * 64
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Serves `server.content` with Range and If-Range support, as a file server would."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        content = server.content
+        start = 0
+        byte_range = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if byte_range and server.honor_range and (if_range is None or if_range == server.etag):
+            start = int(byte_range[len("bytes="):].split("-")[0]) + server.range_skew
+            if start >= len(content):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(content)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(content) - 1}/{len(content)}")
+        else:
+            self.send_response(200)
+        body = content[start:]
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", server.etag)
+        self.end_headers()
+        if server.drop_after is not None:
+            # the connection drops mid-body, once
+            drop_after, server.drop_after = server.drop_after, None
+            self.wfile.write(body[:drop_after])
+            self.wfile.flush()
+            self.close_connection = True
+            self.connection.shutdown(2)
+            return
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    server.content = CONTENT
+    server.etag = '"v1"'
+    server.honor_range = True
+    server.range_skew = 0
+    server.drop_after = None
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/data.zip"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def part_path(tmp_path):
+    return tmp_path / "data.zip.part"
+
+
+def partial(part_path, content=CONTENT, size=1000, etag='"v1"'):
+    """A download left behind by an earlier run."""
+    part_path.write_bytes(content[:size])
+    DataIngestion._validator_path(part_path).write_text(etag)
+
+
+def test_full_download(server, part_path):
+    DataIngestion._download_with_resume(server.url, part_path)
+    assert part_path.read_bytes() == CONTENT
+    assert DataIngestion._validator_path(part_path).read_text() == '"v1"'
+    assert "Range" not in server.requests[0]
+
+
+def test_dropped_connection_is_resumed(server, part_path):
+    server.drop_after = 5000
+    DataIngestion._download_with_resume(server.url, part_path)
+    assert part_path.read_bytes() == CONTENT
+    assert [request.get("Range") for request in server.requests] == [None, "bytes=5000-"]
+    assert server.requests[1]["If-Range"] == '"v1"'
+
+
+def test_partial_file_from_an_earlier_run_is_resumed(server, part_path):
+    partial(part_path)
+    DataIngestion._download_with_resume(server.url, part_path)
+    assert part_path.read_bytes() == CONTENT
+    assert server.requests[0]["Range"] == "bytes=1000-"
+
+
+def test_complete_partial_file_gets_416(server, part_path):
+    partial(part_path, size=len(CONTENT))
+    DataIngestion._download_with_resume(server.url, part_path)
+    assert part_path.read_bytes() == CONTENT
+    assert len(server.requests) == 1
+
+
+def test_server_ignoring_the_range_restarts(server, part_path):
+    server.honor_range = False
+    partial(part_path)
+    DataIngestion._download_with_resume(server.url, part_path)
+    assert part_path.read_bytes() == CONTENT
+
+
+def test_changed_remote_file_is_not_spliced(server, part_path):
+    partial(part_path, content=b"x" * len(CONTENT), etag='"v0"')
+    DataIngestion._download_with_resume(server.url, part_path)
+    assert part_path.read_bytes() == CONTENT
+    assert DataIngestion._validator_path(part_path).read_text() == '"v1"'
+
+
+def test_range_starting_elsewhere_restarts(server, part_path):
+    server.range_skew = 10
+    partial(part_path)
+    DataIngestion._download_with_resume(server.url, part_path)
+    assert part_path.read_bytes() == CONTENT
+    assert "Range" not in server.requests[-1]
+
+
+def test_partial_file_without_a_validator_restarts(server, part_path):
+    part_path.write_bytes(b"x" * 1000)
+    DataIngestion._download_with_resume(server.url, part_path)
+    assert part_path.read_bytes() == CONTENT
+    assert "Range" not in server.requests[0]
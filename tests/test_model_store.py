@@ -0,0 +1,89 @@
+import os
+import json
+import stat
+import pytest
+from kidneyDiseaseClassifier.entity.config_entity import ModelStoreConfig
+from kidneyDiseaseClassifier.components.model_store import ModelStore
+
+
+class FakeModel:
+    """The parts of a Keras model the store uses."""
+
+    def __init__(self, architecture: str):
+        self.architecture = architecture
+        self.saves = 0
+
+    def to_json(self):
+        return json.dumps({"architecture": self.architecture})
+
+    def get_weights(self):
+        return []
+
+    def save(self, path):
+        self.saves += 1
+        with open(path, "w") as f:
+            f.write(self.architecture)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ModelStore(config=ModelStoreConfig(root_dir=tmp_path / "store", keep_versions=2))
+
+
+def age(path, seconds=3600):
+    """Backdates a stored object past the prune grace period."""
+    old = path.stat().st_mtime - seconds
+    os.utime(path, (old, old))
+
+
+def test_put_saves_an_identical_model_once(store):
+    model = FakeModel("a")
+    digest = store.put(model)
+    assert store.put(FakeModel("a")) == digest
+    assert model.saves == 1
+    assert store.object_path(digest).read_text() == "a"
+    assert stat.S_IMODE(store.object_path(digest).stat().st_mode) & 0o222 == 0
+    assert store.put(FakeModel("b")) != digest
+
+
+def test_publish_links_the_object_and_moves_the_ref(store, tmp_path):
+    link = tmp_path / "training" / "model.h5"
+    first = store.put(FakeModel("a"))
+    second = store.put(FakeModel("b"))
+
+    store.publish("model", first, links=[link])
+    assert store.resolve("model")["digest"] == first
+    assert os.path.samefile(link, store.object_path(first))
+
+    store.publish("model", second, links=[link])
+    assert store.resolve("model")["digest"] == second
+    assert link.read_text() == "b"
+    assert [record["digest"] for record in store.history("model")] == [first, second]
+
+
+def test_publish_refuses_a_model_not_in_the_store(store):
+    with pytest.raises(FileNotFoundError):
+        store.publish("model", "0" * 64)
+    assert store.resolve("model") is None
+
+
+def test_prune_keeps_recent_versions_of_each_ref(store):
+    digests = [store.save(FakeModel(name), "model") for name in "abc"]
+    store.publish("best", digests[0])
+    unpublished = store.put(FakeModel("d"))
+    for digest in digests + [unpublished]:
+        age(store.object_path(digest))
+
+    # "a" is still the current "best", "b" and "c" are the last two versions of "model"
+    assert store.prune() == 1
+    assert not store.object_path(unpublished).exists()
+    assert all(store.object_path(digest).exists() for digest in digests)
+
+    assert store.prune(keep=1) == 1
+    assert not store.object_path(digests[1]).exists()
+
+
+def test_prune_spares_objects_within_the_grace_period(store):
+    digest = store.put(FakeModel("a"))
+    assert store.prune() == 0
+    assert store.object_path(digest).exists()
@@ -0,0 +1,35 @@
+from kidneyDiseaseClassifier.components.distributed import whole_batches, in_shard
+
+
+def shard(num_samples, batch_size, num_shards, shard_index):
+    """The sample indices one shard reads, as `build_tf_dataset` selects them."""
+    kept = whole_batches(num_samples, batch_size, num_shards)
+    return [index for index in range(kept) if in_shard(index, batch_size, num_shards, shard_index)]
+
+
+def test_whole_batches_drops_the_partial_global_batch():
+    assert whole_batches(100, 8) == 96
+    assert whole_batches(100, 8, num_shards=3) == 96
+    assert whole_batches(100, 8, num_shards=4) == 96
+    assert whole_batches(20, 8, num_shards=3) == 0
+
+
+def test_shards_are_disjoint_and_cover_the_kept_samples():
+    shards = [shard(103, 4, 3, index) for index in range(3)]
+    assert sorted(sum(shards, [])) == list(range(whole_batches(103, 4, 3)))
+    assert len({len(indices) for indices in shards}) == 1
+
+
+def test_shards_take_consecutive_slices_of_each_global_batch():
+    batch_size, num_shards = 2, 3
+    shards = [shard(12, batch_size, num_shards, index) for index in range(num_shards)]
+    assert shards == [[0, 1, 6, 7], [2, 3, 8, 9], [4, 5, 10, 11]]
+
+    # each step, the shards' batches together form one global batch of the unsharded order
+    for step in range(2):
+        global_batch = sum((indices[step * batch_size:(step + 1) * batch_size] for indices in shards), [])
+        assert global_batch == list(range(step * batch_size * num_shards, (step + 1) * batch_size * num_shards))
+
+
+def test_a_single_shard_reads_everything_kept():
+    assert shard(10, 4, 1, 0) == list(range(8))
@@ -0,0 +1,59 @@
+import pytest
+from kidneyDiseaseClassifier.pipeline.sweep import MedianPruner, trial_params
+
+
+def test_grid_is_the_product_of_the_values():
+    spec = {"method": "grid", "parameters": {"BATCH_SIZE": [8, 16], "AUGMENTATION": [True, False]}}
+    assert trial_params(spec) == [
+        {"BATCH_SIZE": 8, "AUGMENTATION": True},
+        {"BATCH_SIZE": 8, "AUGMENTATION": False},
+        {"BATCH_SIZE": 16, "AUGMENTATION": True},
+        {"BATCH_SIZE": 16, "AUGMENTATION": False},
+    ]
+
+
+def test_grid_needs_lists():
+    with pytest.raises(ValueError):
+        trial_params({"method": "grid", "parameters": {"LEARNING_RATE": {"min": 0.001, "max": 0.1}}})
+
+
+def test_random_search_is_seeded_and_stays_in_range():
+    spec = {
+        "method": "random",
+        "num_trials": 5,
+        "seed": 7,
+        "parameters": {"LEARNING_RATE": {"min": 1e-4, "max": 1e-1, "log": True}, "BATCH_SIZE": [8, 16]},
+    }
+    trials = trial_params(spec)
+    assert trials == trial_params(spec)
+    assert len(trials) == 5
+    for trial in trials:
+        assert 1e-4 <= trial["LEARNING_RATE"] <= 1e-1
+        assert trial["BATCH_SIZE"] in (8, 16)
+
+
+def test_pruner_waits_for_warmup_and_enough_trials():
+    pruner = MedianPruner({}, metric="val_accuracy", mode="max", warmup_epochs=1, min_trials=2)
+    assert not pruner.report(0, 0, 0.9)
+    assert not pruner.report(1, 0, 0.1)
+    assert not pruner.report(0, 1, 0.9)
+    # only one other trial reached epoch 1
+    assert not pruner.report(1, 1, 0.1)
+
+
+def test_pruner_stops_trials_below_the_median():
+    history = {0: [0.5, 0.8], 1: [0.5, 0.6], 2: [0.5, 0.7]}
+    pruner = MedianPruner(history, metric="val_accuracy", mode="max", min_trials=2)
+    assert pruner.report(3, 0, 0.5) is False
+    assert pruner.report(3, 1, 0.65) is True
+    assert history[3] == [0.5, 0.65]
+
+    pruner = MedianPruner({0: [0.3], 1: [0.5]}, metric="val_loss", mode="min", warmup_epochs=0)
+    assert pruner.report(2, 0, 0.45) is True
+    assert pruner.report(3, 0, 0.35) is False
+
+
+def test_disabled_pruner_only_records():
+    pruner = MedianPruner({0: [0.9], 1: [0.9]}, metric="val_accuracy", mode="max", enabled=False, warmup_epochs=0)
+    assert not pruner.report(2, 0, 0.1)
+    assert pruner.history[2] == [0.1]
@@ -0,0 +1,64 @@
+import logging
+import kidneyDiseaseClassifier
+from kidneyDiseaseClassifier.components.training_jobs import TrainingJob, TrainingJobManager
+
+
+def log_line(message: str, module: str) -> str:
+    """A line as the package logger writes it to a job's output."""
+    record = logging.LogRecord("kidneyDiseaseClassifierLogger", logging.INFO, f"{module}.py", 1, message, None, None)
+    record.module = module
+    return logging.Formatter(kidneyDiseaseClassifier.logging_str).format(record) + "\n"
+
+
+# `python main.py` output: DAG runner banners named after the dvc.yaml stages, and Keras's epoch lines
+MAIN_OUTPUT = [
+    log_line(">>>>>> data_ingestion skipped, inputs unchanged <<<<<<", "dag_runner"),
+    log_line("*********************************\n", "dag_runner"),
+    log_line(">>>>>> training started <<<<<<", "dag_runner"),
+    "Epoch 1/3\n",
+    "20/20 [==============================] - 41s 2s/step - loss: 0.61 - accuracy: 0.70\n",
+    "Epoch 2/3\n",
+    log_line(">>>>>> training completed <<<<<<<\n **********************************", "dag_runner"),
+]
+
+
+def run(lines) -> TrainingJob:
+    job = TrainingJob("job", "job.log")
+    for line in lines:
+        job.update_progress(line)
+    return job
+
+
+def test_progress_from_dag_runner_output():
+    job = run(MAIN_OUTPUT)
+    assert (job.stage, job.epoch, job.epochs) == ("training", 2, 3)
+
+
+def test_progress_from_stage_script_banners():
+    # `dvc repro` runs the stage scripts, which announce their STAGE_NAME
+    job = run([
+        log_line(">>>>>> Training started <<<<<<", "stage_03_model_training"),
+        "Epoch 3/10\n",
+        log_line(">>>>>> Model Evaluation started <<<<<<", "stage_04_model_evaluation"),
+    ])
+    assert (job.stage, job.epoch, job.epochs) == ("Model Evaluation", None, None)
+
+
+def test_epoch_counts_are_not_read_from_other_lines():
+    job = run([log_line("Epoch 4/10 of the previous run was checkpointed", "model_training")])
+    assert job.epoch is None
+
+
+def test_tail_returns_the_last_lines(tmp_path):
+    path = tmp_path / "job.log"
+    # longer than one read block, so tail has to step backwards more than once
+    path.write_text("".join(f"line {i} {'x' * 100}\n" for i in range(500)))
+    assert TrainingJobManager.tail(path, lines=3).splitlines() == [f"line {i} {'x' * 100}" for i in (497, 498, 499)]
+    assert len(TrainingJobManager.tail(path, lines=1000).splitlines()) == 500
+
+
+def test_tail_of_a_short_or_missing_log(tmp_path):
+    path = tmp_path / "job.log"
+    assert TrainingJobManager.tail(path) == ""
+    path.write_text("".join(MAIN_OUTPUT))
+    assert TrainingJobManager.tail(path, lines=2).splitlines() == MAIN_OUTPUT[-1].splitlines()